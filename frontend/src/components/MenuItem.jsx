@@ -11,6 +11,12 @@ const MenuItem = ({ item, quantity, onAdd, onRemove }) => {
         return `${API_BASE_URL}${imagePath}`;
     };
 
+    // Resized copies, once the server has made them: "url 160w, url 480w, ..."
+    const variants = Object.values(item.image_variants || {});
+    const getSrcSet = (format) => variants
+        .map((variant) => `${getImageUrl(variant[format])} ${variant.width}w`)
+        .join(', ');
+
     return (
         <div className="bg-[#0A0A0A] p-5 rounded-3xl border border-[#2F3336] flex justify-between items-center gap-6 transition-all duration-300 hover:border-[#FF5A1F]/30 group">
             <div className="flex-1 min-w-0">
@@ -50,11 +56,21 @@ const MenuItem = ({ item, quantity, onAdd, onRemove }) => {
                 {/* Image if available */}
                 {item.image && (
                     <div className="w-24 h-24 flex-shrink-0 rounded-2xl overflow-hidden bg-[#16181C] border border-[#2F3336] group-hover:border-[#FF5A1F]/30 transition-all">
-                        <img
-                            src={getImageUrl(item.image)}
-                            alt={item.name}
-                            className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500"
-                        />
+                        <picture className="block w-full h-full">
+                            {variants.length > 0 && (
+                                <source type="image/webp" srcSet={getSrcSet('webp')} sizes="96px" />
+                            )}
+                            <img
+                                src={getImageUrl(item.image_variants?.medium?.jpeg || item.image)}
+                                srcSet={variants.length > 0 ? getSrcSet('jpeg') : undefined}
+                                sizes="96px"
+                                width={item.image_variants?.medium?.width}
+                                height={item.image_variants?.medium?.height}
+                                loading="lazy"
+                                alt={item.name}
+                                className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500"
+                            />
+                        </picture>
                     </div>
                 )}
 
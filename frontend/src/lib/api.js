@@ -86,22 +86,62 @@ export const fetchMenu = async (restaurantId) => {
     return response.json();
 };
 
-export const placeOrder = async (restaurantId, orderData) => {
-    const response = await fetch(`${API_BASE_URL}/api/restaurants/${restaurantId}/orders/`, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(orderData),
-    });
-    if (!response.ok) {
+// Restaurant, theme and menu in one request; a 404 means the scanned table
+// (or restaurant) doesn't exist
+export const fetchBootstrap = async (restaurantId, table) => {
+    const response = await fetch(`${API_BASE_URL}/api/restaurants/${restaurantId}/tables/${table}/bootstrap/`);
+    if (response.status === 404) {
         const errorData = await response.json().catch(() => ({}));
-        const errorMessage = errorData.error || errorData.detail || JSON.stringify(errorData) || 'Failed to place order';
-        throw new Error(errorMessage);
+        const error = new Error(errorData.error || 'Restaurant not found');
+        error.notFound = true;
+        throw error;
+    }
+    if (!response.ok) {
+        throw new Error('Failed to fetch menu');
     }
     return response.json();
 };
 
+// One key per cart: every attempt at placing the same cart sends it, so a
+// retry gets the order that was already placed instead of a duplicate
+export const newIdempotencyKey = () =>
+    globalThis.crypto?.randomUUID?.() ?? `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+const ORDER_ATTEMPTS = 3;
+const wait = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+export const placeOrder = async (restaurantId, orderData, idempotencyKey) => {
+    // Retried when the network drops the request and while an earlier
+    // attempt is still being placed (409); the key makes both safe
+    for (let attempt = 1; ; attempt++) {
+        let response;
+        try {
+            response = await fetch(`${API_BASE_URL}/api/restaurants/${restaurantId}/orders/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey,
+                },
+                body: JSON.stringify(orderData),
+            });
+        } catch (err) {
+            if (attempt >= ORDER_ATTEMPTS) throw err;
+            await wait(500 * attempt);
+            continue;
+        }
+        if (response.status === 409 && attempt < ORDER_ATTEMPTS) {
+            await wait(1000 * attempt);
+            continue;
+        }
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            const errorMessage = errorData.error || errorData.detail || JSON.stringify(errorData) || 'Failed to place order';
+            throw new Error(errorMessage);
+        }
+        return response.json();
+    }
+};
+
 export const fetchOrderStatus = async (restaurantId, orderId) => {
     const response = await fetch(`${API_BASE_URL}/api/restaurants/${restaurantId}/orders/${orderId}/`);
     if (!response.ok) {
@@ -110,9 +150,21 @@ export const fetchOrderStatus = async (restaurantId, orderId) => {
     return response.json();
 };
 
+// Live order status via Server-Sent Events. Returns the EventSource so the
+// caller can close it; onError lets the caller fall back to polling.
+export const subscribeOrderStatus = (restaurantId, orderId, onUpdate, onError) => {
+    const source = new EventSource(`${API_BASE_URL}/api/restaurants/${restaurantId}/orders/${orderId}/events/`);
+    source.addEventListener('order', (event) => onUpdate(JSON.parse(event.data)));
+    source.onerror = () => {
+        source.close();
+        if (onError) onError();
+    };
+    return source;
+};
+
 export const fetchRestaurantSettings = async () => {
-    // Public endpoint, no auth needed for GET
-    const response = await fetch(`${API_BASE_URL}/admin/settings/`);
+    // Staff get their own restaurant's settings; guests get the theme from fetchBootstrap
+    const response = await fetchWithAuth(`${API_BASE_URL}/admin/settings/`);
     if (!response.ok) throw new Error('Failed to fetch settings');
     return response.json();
 };
@@ -155,6 +207,32 @@ export const addTable = async (number) => {
     return response.json();
 };
 
+// Printable sheets of every table's QR card, as a PDF or a zip of PNG pages
+export const downloadQRSheets = async (output = 'pdf') => {
+    const response = await fetchWithAuth(`${API_BASE_URL}/admin/tables/qr-sheet/?output=${output}`);
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || errorData.detail || 'Failed to generate QR sheets');
+    }
+    return response.blob();
+};
+
+// Create tables start..end (inclusive); QR codes render in the background
+export const addTablesRange = async (start, end) => {
+    const response = await fetchWithAuth(`${API_BASE_URL}/admin/tables/bulk/`, {
+        method: 'POST',
+        body: JSON.stringify({ start: Number(start), end: Number(end) }),
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        const errorMessage = errorData.error || errorData.detail || JSON.stringify(errorData) || 'Failed to add tables';
+        throw new Error(errorMessage);
+    }
+    return response.json();
+};
+
 export const deleteTable = async (tableId) => {
     const response = await fetchWithAuth(`${API_BASE_URL}/admin/tables/${tableId}/`, {
         method: 'DELETE',
@@ -177,9 +255,29 @@ export const loginAdmin = async (username, password) => {
     return data;
 };
 
-export const fetchAdminOrders = async () => {
+// Completed orders with server-side totals, newest first: { results, next, daily }
+export const fetchAdminBills = async (before = null) => {
+    const params = new URLSearchParams({ limit: '50' });
+    if (before) params.set('before', before);
+    const response = await fetchWithAuth(`${API_BASE_URL}/admin/bills/?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch bills');
+    return response.json();
+};
+
+// Full order list plus the change cursor to poll from
+export const fetchAdminOrdersSnapshot = async () => {
     const response = await fetchWithAuth(`${API_BASE_URL}/admin/orders/`);
     if (!response.ok) throw new Error('Failed to fetch orders');
+    const orders = await response.json();
+    return { orders, cursor: response.headers.get('X-Orders-Cursor') };
+};
+
+// Orders changed since the cursor: { cursor, orders, deleted }, or null
+// once the cursor has expired and the full list must be reloaded
+export const fetchAdminOrderChanges = async (since) => {
+    const response = await fetchWithAuth(`${API_BASE_URL}/admin/orders/?since=${since}`);
+    if (response.status === 410) return null;
+    if (!response.ok) throw new Error('Failed to fetch order changes');
     return response.json();
 };
 
@@ -7,7 +7,7 @@ export const generateReceiptText = (order) => {
         return `${name} x${item.quantity} | ${total}`;
     }).join('\n');
 
-    const totalPrice = order.items.reduce((sum, item) => {
+    const totalPrice = order.total_amount || order.items.reduce((sum, item) => {
         const price = parseFloat(item.menu_item?.price || item.price || 0);
         return sum + (price * item.quantity);
     }, 0).toFixed(2);
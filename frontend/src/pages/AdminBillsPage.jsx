@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { fetchAdminOrders } from '../lib/api';
+import { fetchAdminBills } from '../lib/api';
 import { FileText, Download, Printer, Search, Calendar, CreditCard } from 'lucide-react';
 import { generateReceiptText } from '../lib/receipt';
 
@@ -9,20 +9,33 @@ const AdminBillsPage = () => {
     const [error, setError] = useState('');
     const [searchTerm, setSearchTerm] = useState('');
     const [selectedOrder, setSelectedOrder] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [daily, setDaily] = useState([]);
+    const [loadingMore, setLoadingMore] = useState(false);
 
-    const loadOrders = async () => {
+    // Completed orders come a page at a time with their totals already summed
+    const loadOrders = async (before = null) => {
         try {
-            const token = localStorage.getItem('adminToken');
-            const data = await fetchAdminOrders(token);
-            // Only show completed orders for bills
-            setOrders(data.filter(o => o.status === 'completed'));
+            const data = await fetchAdminBills(before);
+            setOrders(prev => before ? [...prev, ...data.results] : data.results);
+            setNextCursor(data.next);
+            setDaily(data.daily);
         } catch (err) {
             setError('Failed to load completed orders');
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
+    const loadMore = () => {
+        setLoadingMore(true);
+        loadOrders(nextCursor);
+    };
+
+    const todayKey = new Date().toISOString().slice(0, 10);
+    const today = daily.find(d => d.date === todayKey);
+
     useEffect(() => {
         loadOrders();
     }, []);
@@ -116,6 +129,10 @@ const AdminBillsPage = () => {
                 <div>
                     <h1 className="text-4xl font-bold text-[#FFFFFF] mb-2 tracking-tighter">Bills & Payments</h1>
                     <p className="text-[#A0A0A0] font-medium">Track payments and generate receipts for completed orders</p>
+                    <p className="text-[#FFFFFF] font-bold mt-3 flex items-center gap-2">
+                        <Calendar size={18} className="text-[#FF5A1F]" />
+                        Today: ₹{today ? today.total : '0.00'} across {today ? today.orders : 0} bills
+                    </p>
                 </div>
 
                 <div className="relative w-full md:w-96">
@@ -156,12 +173,22 @@ const AdminBillsPage = () => {
                                     </div>
                                 </div>
                                 <div className="text-right">
-                                    <p className="text-2xl font-bold text-[#FF5A1F]">₹{order.total_price || order.items.reduce((s, i) => s + (i.quantity * (i.menu_item?.price || i.price || 0)), 0).toFixed(2)}</p>
+                                    <p className="text-2xl font-bold text-[#FF5A1F]">₹{order.total_amount}</p>
                                     <p className="text-[#A0A0A0] text-xs font-bold uppercase tracking-widest mt-1">Paid</p>
                                 </div>
                             </div>
                         ))
                     )}
+
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="w-full py-4 bg-[#16181C] text-[#FFFFFF] rounded-full font-bold border border-[#2F3336] hover:bg-[#2F3336] disabled:opacity-50 transition-all"
+                        >
+                            {loadingMore ? 'Loading...' : 'Load older bills'}
+                        </button>
+                    )}
                 </div>
 
                 {/* Bill Preview */}
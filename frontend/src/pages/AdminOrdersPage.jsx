@@ -1,5 +1,5 @@
-import React, { useEffect, useState } from 'react';
-import { fetchAdminOrders, updateOrderStatus, clearOrders } from '../lib/api';
+import React, { useEffect, useRef, useState } from 'react';
+import { fetchAdminOrdersSnapshot, fetchAdminOrderChanges, updateOrderStatus, clearOrders } from '../lib/api';
 import { Clock, CheckCircle, AlertCircle, Trash2, ShoppingBag } from 'lucide-react';
 
 const AdminOrdersPage = () => {
@@ -8,11 +8,13 @@ const AdminOrdersPage = () => {
     const [error, setError] = useState('');
     const [filter, setFilter] = useState('all');
 
+    const cursorRef = useRef(null);
+
     const loadOrders = async () => {
         try {
-            const token = localStorage.getItem('adminToken');
-            const data = await fetchAdminOrders(token);
-            setOrders(data);
+            const { orders, cursor } = await fetchAdminOrdersSnapshot();
+            cursorRef.current = cursor;
+            setOrders(orders);
         } catch (err) {
             setError('Failed to load orders');
         } finally {
@@ -20,9 +22,26 @@ const AdminOrdersPage = () => {
         }
     };
 
+    // Merge only what changed since the last poll
+    const loadChanges = async () => {
+        if (cursorRef.current === null) return loadOrders();
+        try {
+            const changes = await fetchAdminOrderChanges(cursorRef.current);
+            if (changes === null) return loadOrders();
+            cursorRef.current = changes.cursor;
+            if (changes.orders.length === 0 && changes.deleted.length === 0) return;
+
+            const changedIds = new Set([...changes.deleted, ...changes.orders.map(o => o.id)]);
+            setOrders(prev => [...changes.orders, ...prev.filter(o => !changedIds.has(o.id))]
+                .sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+        } catch (err) {
+            setError('Failed to load orders');
+        }
+    };
+
     useEffect(() => {
         loadOrders();
-        const interval = setInterval(loadOrders, 30000); // Poll every 30s
+        const interval = setInterval(loadChanges, 10000); // Cheap incremental poll
         return () => clearInterval(interval);
     }, []);
 
@@ -30,17 +49,17 @@ const AdminOrdersPage = () => {
         try {
             const token = localStorage.getItem('adminToken');
             await updateOrderStatus(token, orderId, newStatus);
-            loadOrders(); // Refresh
+            loadChanges(); // Refresh
         } catch (err) {
             alert('Failed to update status');
         }
     };
 
     const handleClearOrders = async () => {
-        if (!window.confirm('Are you sure you want to clear all completed and cancelled orders?')) return;
+        if (!window.confirm('Move all completed and cancelled orders to the archive?')) return;
         try {
             await clearOrders();
-            loadOrders();
+            loadChanges();
         } catch (err) {
             alert('Failed to clear orders');
         }
@@ -116,7 +135,7 @@ const AdminOrdersPage = () => {
                     <button
                         onClick={handleClearOrders}
                         className="flex items-center gap-2 px-6 py-3 bg-red-500/10 text-red-500 border border-red-500/20 rounded-full hover:bg-red-500/20 transition-all text-sm font-bold active:scale-95"
-                        title="Clear Completed & Cancelled Orders"
+                        title="Archive Completed & Cancelled Orders"
                     >
                         <Trash2 size={18} />
                         Clear History
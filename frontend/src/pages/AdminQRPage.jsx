@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
-import { fetchTables, addTable, deleteTable, API_BASE_URL } from '../lib/api';
-import { QrCode, Plus, Trash2, Download, Printer, AlertCircle } from 'lucide-react';
+import { fetchTables, addTable, addTablesRange, deleteTable, downloadQRSheets, API_BASE_URL } from '../lib/api';
+import { QrCode, Plus, Trash2, Download, Printer, AlertCircle, Loader2 } from 'lucide-react';
 
 const AdminQRPage = () => {
     const [tables, setTables] = useState([]);
@@ -8,11 +8,21 @@ const AdminQRPage = () => {
     const [newTableNumber, setNewTableNumber] = useState('');
     const [adding, setAdding] = useState(false);
     const [error, setError] = useState('');
+    const [rangeStart, setRangeStart] = useState('');
+    const [rangeEnd, setRangeEnd] = useState('');
+    const [downloading, setDownloading] = useState(false);
 
     useEffect(() => {
         loadTables();
     }, []);
 
+    // QR codes render in the background; refresh until none are pending
+    useEffect(() => {
+        if (!tables.some(t => t.qr_status === 'pending')) return;
+        const timeout = setTimeout(loadTables, 2000);
+        return () => clearTimeout(timeout);
+    }, [tables]);
+
     const loadTables = async () => {
         try {
             const data = await fetchTables();
@@ -41,6 +51,42 @@ const AdminQRPage = () => {
         }
     };
 
+    const handleAddRange = async (e) => {
+        e.preventDefault();
+        if (!rangeStart || !rangeEnd) return;
+
+        setAdding(true);
+        setError('');
+        try {
+            await addTablesRange(rangeStart, rangeEnd);
+            setRangeStart('');
+            setRangeEnd('');
+            loadTables();
+        } catch (err) {
+            setError(err.message);
+        } finally {
+            setAdding(false);
+        }
+    };
+
+    const handleDownloadSheets = async () => {
+        setDownloading(true);
+        setError('');
+        try {
+            const blob = await downloadQRSheets('pdf');
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = 'table-qr-codes.pdf';
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (err) {
+            setError(err.message);
+        } finally {
+            setDownloading(false);
+        }
+    };
+
     const handleDeleteTable = async (id) => {
         if (!window.confirm('Are you sure you want to delete this table?')) return;
         try {
@@ -114,6 +160,45 @@ const AdminQRPage = () => {
                 </form>
             </div>
 
+            <form onSubmit={handleAddRange} className="flex flex-wrap items-center gap-3 mb-10">
+                <span className="text-[#A0A0A0] font-medium text-sm">Add a range:</span>
+                <input
+                    type="number"
+                    placeholder="From"
+                    className="bg-black border border-[#2F3336] rounded-2xl px-6 py-3 w-28 text-[#FFFFFF] focus:border-[#FF5A1F] focus:ring-1 focus:ring-[#FF5A1F] outline-none transition-all font-medium placeholder-[#A0A0A0]/30"
+                    value={rangeStart}
+                    onChange={(e) => setRangeStart(e.target.value)}
+                    required
+                    min="1"
+                />
+                <input
+                    type="number"
+                    placeholder="To"
+                    className="bg-black border border-[#2F3336] rounded-2xl px-6 py-3 w-28 text-[#FFFFFF] focus:border-[#FF5A1F] focus:ring-1 focus:ring-[#FF5A1F] outline-none transition-all font-medium placeholder-[#A0A0A0]/30"
+                    value={rangeEnd}
+                    onChange={(e) => setRangeEnd(e.target.value)}
+                    required
+                    min="1"
+                />
+                <button
+                    type="submit"
+                    disabled={adding}
+                    className="bg-[#16181C] text-[#FFFFFF] px-8 py-3 rounded-full font-bold hover:bg-[#2F3336] disabled:opacity-50 flex items-center gap-2 transition-all active:scale-95 border border-[#2F3336]"
+                >
+                    <Plus size={18} />
+                    Add Tables
+                </button>
+                <button
+                    type="button"
+                    onClick={handleDownloadSheets}
+                    disabled={downloading || tables.length === 0}
+                    className="md:ml-auto bg-[#16181C] text-[#FFFFFF] px-8 py-3 rounded-full font-bold hover:bg-[#2F3336] disabled:opacity-50 flex items-center gap-2 transition-all active:scale-95 border border-[#2F3336]"
+                >
+                    {downloading ? <Loader2 size={18} className="animate-spin" /> : <Printer size={18} />}
+                    {downloading ? 'Preparing...' : 'Print All'}
+                </button>
+            </form>
+
             {error && (
                 <div className="bg-red-500/10 border border-red-500/20 text-red-500 p-5 rounded-2xl mb-10 font-bold text-sm flex items-center gap-4">
                     <AlertCircle size={24} />
@@ -130,11 +215,18 @@ const AdminQRPage = () => {
                         <div className="text-3xl font-bold text-[#FFFFFF] mb-8 tracking-tighter">Table {table.number}</div>
 
                         <div className="bg-white p-6 rounded-[32px] mb-10 group-hover:scale-[1.02] transition-transform duration-500 shadow-2xl shadow-black/50">
-                            <img
-                                src={getQrUrl(table.qr_code)}
-                                alt={`QR for Table ${table.number}`}
-                                className="w-48 h-48 object-contain"
-                            />
+                            {table.qr_status === 'ready' ? (
+                                <img
+                                    src={getQrUrl(table.qr_code)}
+                                    alt={`QR for Table ${table.number}`}
+                                    className="w-48 h-48 object-contain"
+                                />
+                            ) : (
+                                <div className="w-48 h-48 flex flex-col items-center justify-center gap-3 text-[#A0A0A0] text-sm font-medium">
+                                    {table.qr_status === 'pending' ? <Loader2 size={32} className="animate-spin" /> : <AlertCircle size={32} />}
+                                    {table.qr_status === 'pending' ? 'Generating QR…' : 'QR generation failed'}
+                                </div>
+                            )}
                         </div>
 
                         <div className="flex flex-col gap-4 w-full">
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom';
-import { placeOrder } from '../lib/api';
+import { placeOrder, newIdempotencyKey } from '../lib/api';
 import { ArrowLeft, Phone, CheckCircle, ShoppingBag, AlertCircle } from 'lucide-react';
 
 const CheckoutPage = ({ cart, clearCart }) => {
@@ -12,6 +12,8 @@ const CheckoutPage = ({ cart, clearCart }) => {
     const [phone, setPhone] = useState('');
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(null);
+    // Kept across taps and retries of this cart, so it is only ordered once
+    const [idempotencyKey] = useState(newIdempotencyKey);
 
     const cartItemsList = Object.values(cart);
     const totalPrice = cartItemsList.reduce((sum, item) => sum + (parseFloat(item.item.price) * item.quantity), 0);
@@ -50,7 +52,7 @@ const CheckoutPage = ({ cart, clearCart }) => {
         };
 
         try {
-            const response = await placeOrder(restaurantId, orderData);
+            const response = await placeOrder(restaurantId, orderData, idempotencyKey);
             clearCart();
             navigate(`/order-confirmed`, { state: { order: response } });
         } catch (err) {
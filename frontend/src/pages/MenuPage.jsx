@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { fetchMenu } from '../lib/api';
+import { fetchBootstrap } from '../lib/api';
 import MenuItem from '../components/MenuItem';
 import CartSummary from '../components/CartSummary';
 import { UtensilsCrossed, AlertCircle, RefreshCw } from 'lucide-react';
@@ -10,30 +10,33 @@ const MenuPage = ({ cart, addToCart, removeFromCart }) => {
     const restaurantId = searchParams.get('restaurant_id');
     const table = searchParams.get('table');
 
+    const [restaurant, setRestaurant] = useState(null);
     const [menu, setMenu] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
     useEffect(() => {
-        if (!restaurantId) {
-            setError('Missing restaurant ID');
+        if (!restaurantId || !table) {
+            setError('Missing restaurant or table. Please scan the QR code on your table again.');
             setLoading(false);
             return;
         }
 
         const loadMenu = async () => {
             try {
-                const data = await fetchMenu(restaurantId);
-                setMenu(data);
+                // One request for everything the page needs
+                const data = await fetchBootstrap(restaurantId, table);
+                setRestaurant(data.restaurant);
+                setMenu(data.menu);
             } catch (err) {
-                setError('Failed to load menu. Please try again.');
+                setError(err.notFound ? err.message : 'Failed to load menu. Please try again.');
             } finally {
                 setLoading(false);
             }
         };
 
         loadMenu();
-    }, [restaurantId]);
+    }, [restaurantId, table]);
 
     if (loading) {
         return (
@@ -81,7 +84,7 @@ const MenuPage = ({ cart, addToCart, removeFromCart }) => {
                         <UtensilsCrossed className="text-[#FF5A1F]" size={32} />
                     </div>
                     <div>
-                        <h1 className="font-bold text-3xl text-[#FFFFFF] tracking-tighter">Menu</h1>
+                        <h1 className="font-bold text-3xl text-[#FFFFFF] tracking-tighter">{restaurant?.name || 'Menu'}</h1>
                         <p className="text-sm text-[#A0A0A0] font-bold uppercase tracking-widest">Table {table}</p>
                     </div>
                 </div>
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useLocation, Link } from 'react-router-dom';
 import { CheckCircle, Clock, Home, Loader2, ChefHat, FileText, Printer, X, Download } from 'lucide-react';
-import { fetchOrderStatus } from '../lib/api';
+import { fetchOrderStatus, subscribeOrderStatus } from '../lib/api';
 import { generateReceiptText } from '../lib/receipt';
 
 const OrderConfirmationPage = () => {
@@ -13,21 +13,41 @@ const OrderConfirmationPage = () => {
     useEffect(() => {
         if (!initialOrder) return;
 
-        const pollInterval = setInterval(async () => {
-            try {
-                const updatedOrder = await fetchOrderStatus(initialOrder.restaurant, initialOrder.id);
-                setOrder(updatedOrder);
-
-                // Stop polling if completed or cancelled
-                if (updatedOrder.status === 'completed' || updatedOrder.status === 'cancelled') {
-                    clearInterval(pollInterval);
+        const isFinal = (status) => status === 'completed' || status === 'cancelled';
+        let pollInterval = null;
+
+        // Fallback: poll the order endpoint every 5 seconds
+        const startPolling = () => {
+            pollInterval = setInterval(async () => {
+                try {
+                    const updatedOrder = await fetchOrderStatus(initialOrder.restaurant, initialOrder.id);
+                    setOrder(updatedOrder);
+
+                    // Stop polling if completed or cancelled
+                    if (isFinal(updatedOrder.status)) {
+                        clearInterval(pollInterval);
+                    }
+                } catch (err) {
+                    console.error('Failed to poll order status:', err);
                 }
-            } catch (err) {
-                console.error('Failed to poll order status:', err);
-            }
-        }, 5000);
+            }, 5000);
+        };
 
-        return () => clearInterval(pollInterval);
+        // Prefer the live stream; it only carries the fields that change
+        const source = subscribeOrderStatus(
+            initialOrder.restaurant,
+            initialOrder.id,
+            (update) => {
+                setOrder((prev) => ({ ...prev, ...update }));
+                if (isFinal(update.status)) source.close();
+            },
+            startPolling
+        );
+
+        return () => {
+            source.close();
+            clearInterval(pollInterval);
+        };
     }, [initialOrder]);
 
     if (!order) {
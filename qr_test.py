@@ -33,16 +33,16 @@ def make_table_qr(data, table_no,
     # --- 2. prepare label (Table X) ---
     label = f"Table {table_no}"
 
-    # Try to load a TTF font; fallback to default (smaller) if not found
+    # Load the given TTF font; otherwise use Pillow's bundled scalable font,
+    # which renders at the requested size on every platform
     try:
         if label_font_path:
             font = ImageFont.truetype(label_font_path, label_font_size)
         else:
-            # Common Windows font path example: "C:\\Windows\\Fonts\\arial.ttf"
-            font = ImageFont.truetype("C:\\Users\\Aarya's Legion 5\\AppData\\Local\\Microsoft\\Windows\\Fonts\\InterDisplay-SemiBold.ttf", label_font_size)
-    except Exception:
-        font = ImageFont.load_default()
-        print("Warning: Truetype font not found — using default font (size may differ).")
+            font = ImageFont.load_default(size=label_font_size)
+    except OSError:
+        font = ImageFont.load_default(size=label_font_size)
+        print("Warning: Truetype font not found — using default font.")
 
     # --- 3. create a new canvas with space for label below the QR ---
     qr_w, qr_h = qr_img.size
@@ -0,0 +1,132 @@
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from restaurants.models import Restaurant
+from adminpanel.models import StaffProfile
+
+RESTAURANT_ID_CLAIM = 'restaurant_id'
+USER_CACHE_TIMEOUT = 60  # seconds; also dropped whenever the user or their profile is saved
+
+
+def staff_restaurant_id(user_id):
+    return StaffProfile.objects.filter(user_id=user_id).values_list('restaurant_id', flat=True).first()
+
+
+def user_cache_key(user_id):
+    return f"staff-user:{user_id}"
+
+
+# -------------------------------
+# TOKENS
+# -------------------------------
+class StaffTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login: embeds the staff member's restaurant id in the tokens."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[RESTAURANT_ID_CLAIM] = staff_restaurant_id(user.id)
+        return token
+
+
+class StaffTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh: re-reads the restaurant, so reassigned staff pick it up within one access lifetime."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"])
+        access[RESTAURANT_ID_CLAIM] = staff_restaurant_id(access[api_settings.USER_ID_CLAIM])
+        data["access"] = str(access)
+        return data
+
+
+# -------------------------------
+# AUTHENTICATION
+# -------------------------------
+class StaffUser:
+    """
+    The parts of a staff member's User that admin requests use. Cached in
+    place of the User row, which would carry the password hash along.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, is_active, restaurant_id):
+        self.id = id
+        self.username = username
+        self.is_active = is_active
+        self.restaurant_id = restaurant_id
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.username
+
+
+class StaffJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps what authorization needs of the user (id,
+    is_active, restaurant) in the cache for a short while, so back-to-back
+    admin requests don't each hit auth_user.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation is checked against the password hash, which isn't cached
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        fields = cache.get(key)
+        if fields is None:
+            fields = (
+                self.user_model.objects
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values('id', 'username', 'is_active', restaurant_id=F('staffprofile__restaurant_id'))
+                .first()
+            )
+            if fields is None:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+            cache.set(key, fields, USER_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not fields["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return StaffUser(**fields)
+
+
+class StaffRestaurantMixin:
+    """
+    For admin APIViews: `self.restaurant_id` comes from the token's
+    restaurant_id claim, falling back to the StaffProfile for tokens
+    issued before the claim existed (or other auth schemes).
+    """
+
+    @property
+    def restaurant_id(self):
+        if not hasattr(self, '_restaurant_id'):
+            self._restaurant_id = self.resolve_restaurant_id()
+        return self._restaurant_id
+
+    def resolve_restaurant_id(self):
+        request = self.request
+        if not request.user or not request.user.is_authenticated:
+            raise NotAuthenticated()
+
+        token = request.auth
+        restaurant_id = token.get(RESTAURANT_ID_CLAIM) if hasattr(token, 'get') else None
+        if restaurant_id is None:
+            restaurant_id = getattr(request.user, 'restaurant_id', None) or staff_restaurant_id(request.user.id)
+        if restaurant_id is None:
+            raise PermissionDenied("This account is not linked to a restaurant.")
+        return restaurant_id
+
+    def get_restaurant(self):
+        """Load the full Restaurant row, for views that actually need its fields."""
+        return Restaurant.objects.get(id=self.restaurant_id)
@@ -0,0 +1,133 @@
+import csv
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from restaurants.models import MenuCategory, MenuItem
+from restaurants.cache import invalidate_menu
+from adminpanel.serializers import MenuCSVRowSerializer
+
+REQUIRED_COLUMNS = {"category", "name", "price", "is_veg", "is_jain", "is_chefs_special", "cooking_time_minutes"}
+UPDATE_FIELDS = ["description", "price", "is_veg", "is_non_veg", "is_jain", "is_chefs_special", "cooking_time_minutes"]
+MAX_REPORTED_ERRORS = 500
+# bulk_update builds one CASE WHEN per field per row, so its cost grows
+# with batch size squared; small batches are much faster
+UPDATE_BATCH_SIZE = 100
+
+
+class MenuCSVImporter:
+    """
+    Streams a menu CSV into the database in batches.
+
+    Rows are upserted by (category, name): existing items are updated,
+    new ones created, unchanged ones skipped. Categories and existing items are loaded once up
+    front, each batch is validated row by row and then written with one
+    bulk_create / bulk_update, and the whole import runs in a single
+    transaction so a failure leaves the menu untouched. Invalid rows are
+    skipped and listed in the report with their line number.
+    """
+
+    def __init__(self, restaurant_id, batch_size=1000):
+        self.restaurant_id = restaurant_id
+        self.batch_size = batch_size
+        self.row_serializer = MenuCSVRowSerializer()
+
+        self.created = 0
+        self.updated = 0
+        self.rejected_count = 0
+        self.rejected = []
+
+    def run(self, text_stream):
+        reader = csv.DictReader(text_stream)
+        missing = REQUIRED_COLUMNS - set(reader.fieldnames or ())
+        if missing:
+            raise serializers.ValidationError({"file": f"Missing columns: {', '.join(sorted(missing))}"})
+
+        with transaction.atomic():
+            self.categories = {
+                c.name: c for c in MenuCategory.objects.filter(restaurant_id=self.restaurant_id)
+            }
+            self.items = {
+                (item.category_id, item.name): item
+                for item in MenuItem.objects.filter(restaurant_id=self.restaurant_id).only("id", "category_id", "name", *UPDATE_FIELDS)
+            }
+
+            # Data starts on line 2, after the header
+            rows = enumerate(reader, start=2)
+            while batch := list(islice(rows, self.batch_size)):
+                self.import_batch(batch)
+
+            # bulk writes skip the post_save signals that normally drop the menu cache
+            transaction.on_commit(lambda: invalidate_menu(self.restaurant_id))
+
+        return self.report()
+
+    def import_batch(self, batch):
+        valid = []
+        for line, row in batch:
+            try:
+                valid.append(self.row_serializer.run_validation(row))
+            except serializers.ValidationError as exc:
+                self.reject(line, exc.detail)
+
+        self.create_missing_categories({row["category"] for row in valid})
+
+        to_create = {}
+        to_update = {}
+        for row in valid:
+            category = self.categories[row["category"]]
+            key = (category.id, row["name"])
+            fields = {
+                "description": row["description"],
+                "price": row["price"],
+                "is_veg": row["is_veg"],
+                # Logic: If not veg, then it is non-veg
+                "is_non_veg": not row["is_veg"],
+                "is_jain": row["is_jain"],
+                "is_chefs_special": row["is_chefs_special"],
+                "cooking_time_minutes": row["cooking_time_minutes"],
+            }
+
+            # Later rows for the same (category, name) win
+            item = self.items.get(key) or to_create.get(key)
+            if item is None:
+                to_create[key] = MenuItem(restaurant_id=self.restaurant_id, category=category, name=row["name"], **fields)
+                continue
+            changed = False
+            for field, value in fields.items():
+                if getattr(item, field) != value:
+                    setattr(item, field, value)
+                    changed = True
+            # Re-importing an unchanged row costs nothing
+            if changed and item.pk is not None:
+                to_update[key] = item
+
+        MenuItem.objects.bulk_create(to_create.values())
+        MenuItem.objects.bulk_update(to_update.values(), UPDATE_FIELDS, batch_size=UPDATE_BATCH_SIZE)
+
+        self.items.update(to_create)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def create_missing_categories(self, names):
+        new = [
+            MenuCategory(restaurant_id=self.restaurant_id, name=name)
+            for name in names if name not in self.categories
+        ]
+        for category in MenuCategory.objects.bulk_create(new):
+            self.categories[category.name] = category
+
+    def reject(self, line, errors):
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_ERRORS:
+            self.rejected.append({"line": line, "errors": errors})
+
+    def report(self):
+        return {
+            "message": f"{self.created} items created, {self.updated} updated, {self.rejected_count} rows rejected",
+            "created": self.created,
+            "updated": self.updated,
+            "rejected_count": self.rejected_count,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,61 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, raising ValueError if malformed."""
+    created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+def after_cursor(queryset, cursor):
+    """Rows strictly older than the cursor position in (created_at, id) order."""
+    created_at, order_id = decode_cursor(cursor)
+    # The plain created_at bound lets the index seek straight to the
+    # page; the OR alone would force a scan from the newest row
+    return queryset.filter(created_at__lte=created_at).filter(
+        Q(created_at__lt=created_at) | Q(id__lt=order_id)
+    )
+
+
+def paginate_orders(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is a range scan on order_restaurant_created_idx that starts
+    right after the previous page's last row, so deep pages cost the same
+    as the first. Returns (orders, next_cursor); next_cursor is None on
+    the last page.
+    """
+    return paginate_merged([queryset], cursor, limit)
+
+
+def paginate_merged(querysets, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    paginate_orders() across several querysets whose rows share one id
+    space, e.g. live and archived orders: a page is read from each, and
+    the newest `limit` of them kept.
+    """
+    page = []
+    for queryset in querysets:
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            queryset = after_cursor(queryset, cursor)
+        page.extend(queryset[:limit + 1])
+    if len(querysets) > 1:
+        page.sort(key=lambda order: (order.created_at, order.id), reverse=True)
+
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -23,6 +23,48 @@ class RestaurantSettingsSerializer(serializers.ModelSerializer):
         fields = ['primary_color', 'secondary_color', 'background_color', 'font_choice']
 
 class TableSerializer(serializers.ModelSerializer):
+    # Served on demand from the QR cache rather than a stored file
+    qr_code = serializers.SerializerMethodField()
+
     class Meta:
         model = Table
-        fields = ['id', 'number', 'qr_code']
+        fields = ['id', 'number', 'qr_code', 'qr_status']
+
+    def get_qr_code(self, obj):
+        return f"/api/restaurants/{obj.restaurant_id}/tables/{obj.number}/qr/"
+
+class TableBulkCreateSerializer(serializers.Serializer):
+    """Either an inclusive `start`..`end` range or an explicit list of `numbers`."""
+    MAX_TABLES = 500
+
+    start = serializers.IntegerField(min_value=1, required=False)
+    end = serializers.IntegerField(min_value=1, required=False)
+    numbers = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, attrs):
+        if "numbers" in attrs:
+            numbers = sorted(set(attrs["numbers"]))
+        elif "start" in attrs and "end" in attrs:
+            if attrs["start"] > attrs["end"]:
+                raise serializers.ValidationError("start must not be greater than end.")
+            numbers = list(range(attrs["start"], attrs["end"] + 1))
+        else:
+            raise serializers.ValidationError("Provide either start and end, or numbers.")
+
+        if not numbers:
+            raise serializers.ValidationError("No table numbers given.")
+        if len(numbers) > self.MAX_TABLES:
+            raise serializers.ValidationError(f"At most {self.MAX_TABLES} tables per request.")
+        return {"numbers": numbers}
+
+
+class MenuCSVRowSerializer(serializers.Serializer):
+    """One row of the menu CSV (same columns as veronicas_bombay_menu.csv)."""
+    category = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, default="")
+    price = serializers.DecimalField(max_digits=7, decimal_places=2)
+    is_veg = serializers.BooleanField()
+    is_jain = serializers.BooleanField()
+    is_chefs_special = serializers.BooleanField()
+    cooking_time_minutes = serializers.IntegerField(min_value=0)
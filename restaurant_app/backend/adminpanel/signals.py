@@ -0,0 +1,17 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import user_cache_key
+from .models import StaffProfile
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.id))
+
+
+@receiver([post_save, post_delete], sender=StaffProfile)
+def staff_profile_changed(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.user_id))
@@ -1,3 +1,715 @@
-from django.test import TestCase
+import os
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from PIL import Image, PdfParser
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from django.core.management import call_command
+from restaurants.models import (
+    Restaurant, MenuCategory, MenuItem, Order, OrderChange, OrderItem, PrepTimeEstimate, Table, ItemSalesHour, DailySales,
+    ArchivedOrder, ArchivedOrderItem,
+)
+from restaurants.analytics import backfill_rollups
+from restaurants.images import VARIANT_DIR
+from restaurants.prep_times import learned_prep_minutes, record_completion
+from adminpanel.authentication import user_cache_key
+from adminpanel.models import StaffProfile
+
+
+class AdminTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        self.user = User.objects.create_user(username="owner", password="pass")
+        StaffProfile.objects.create(user=self.user, restaurant=self.restaurant)
+        # bulk_create skips Table.save(), so no QR images are written
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=n) for n in (1, 2)])
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@override_settings(ORDER_ARCHIVE_IN_BACKGROUND=False, ORDER_CHANGE_SETTLE_SECONDS=0)
+class AdminOrdersChangeFeedTests(AdminTestCase):
+    def test_since_returns_only_changes_and_tombstones(self):
+        kept = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        removed = Order.objects.create(restaurant=self.restaurant, table_number=2, status="completed")
+
+        response = self.client.get("/admin/orders/")
+        self.assertEqual(len(response.json()), 2)
+        cursor = response["X-Orders-Cursor"]
+
+        # Nothing changed yet
+        data = self.client.get("/admin/orders/", {"since": cursor}).json()
+        self.assertEqual(data, {"cursor": int(cursor), "orders": [], "deleted": []})
+
+        kept.status = "preparing"
+        kept.save()
+        added = Order.objects.create(restaurant=self.restaurant, table_number=2)
+        self.client.delete("/admin/orders/")
+
+        data = self.client.get("/admin/orders/", {"since": cursor}).json()
+        self.assertEqual({o["id"] for o in data["orders"]}, {kept.id, added.id})
+        self.assertEqual(data["deleted"], [removed.id])
+        self.assertGreater(data["cursor"], int(cursor))
+
+    def test_since_must_be_an_integer(self):
+        response = self.client.get("/admin/orders/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_waits_for_late_commits(self):
+        Order.objects.create(restaurant=self.restaurant, table_number=1)
+        cursor = self.client.get("/admin/orders/")["X-Orders-Cursor"]
+        early = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        late = Order.objects.create(restaurant=self.restaurant, table_number=2)
+
+        # The early order's change took the lower id but hasn't committed yet
+        change = OrderChange.objects.get(order_id=early.id)
+        change.delete()
+        with self.settings(ORDER_CHANGE_SETTLE_SECONDS=10):
+            data = self.client.get("/admin/orders/", {"since": cursor}).json()
+            self.assertEqual([o["id"] for o in data["orders"]], [late.id])
+            self.assertEqual(data["cursor"], int(cursor))
+
+            OrderChange.objects.create(id=change.id, restaurant=self.restaurant, order_id=early.id)
+            data = self.client.get("/admin/orders/", {"since": data["cursor"]}).json()
+            self.assertEqual({o["id"] for o in data["orders"]}, {early.id, late.id})
+
+        # Once settled, the cursor moves past both
+        data = self.client.get("/admin/orders/", {"since": data["cursor"]}).json()
+        self.assertEqual(data["cursor"], OrderChange.objects.latest('id').id)
+
+    def test_old_changes_are_pruned_and_their_cursors_expire(self):
+        cursor = self.client.get("/admin/orders/")["X-Orders-Cursor"]
+        Order.objects.create(restaurant=self.restaurant, table_number=1, status="completed")
+        OrderChange.objects.update(created_at=timezone.now() - timedelta(days=30))
+        Order.objects.create(restaurant=self.restaurant, table_number=2)
+
+        # Archiving the completed order prunes the month-old change
+        self.client.delete("/admin/orders/")
+        self.assertEqual(OrderChange.objects.count(), 2)
+        self.assertEqual(self.client.get("/admin/orders/", {"since": cursor}).status_code, 410)
+
+        cursor = self.client.get("/admin/orders/")["X-Orders-Cursor"]
+        self.assertEqual(self.client.get("/admin/orders/", {"since": cursor}).status_code, 200)
+
+
+class AdminOrdersQueryCountTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dosa = MenuItem.objects.create(restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"))
+
+    def place_orders(self, count, lines):
+        orders = [Order.objects.create(restaurant=self.restaurant, table_number=1) for _ in range(count)]
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=self.dosa, quantity=1, item_price=self.dosa.price)
+            for order in orders
+            for _ in range(lines)
+        ])
+
+    def count_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/admin/orders/", params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_list_length_or_order_size(self):
+        cursor = self.client.get("/admin/orders/")["X-Orders-Cursor"]
+        self.place_orders(2, lines=1)
+        small = [self.count_queries({}), self.count_queries({"limit": 10}), self.count_queries({"since": cursor})]
+
+        self.place_orders(8, lines=4)
+        large = [self.count_queries({}), self.count_queries({"limit": 10}), self.count_queries({"since": cursor})]
+        self.assertEqual(small, large)
+
+        line = self.client.get("/admin/orders/").json()[0]["items"][0]
+        self.assertEqual(line, {"menu_item": self.dosa.id, "menu_item_name": "Dosa", "quantity": 1, "price": "120.00"})
+
+
+class AdminOrdersPaginationTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        Order.objects.bulk_create([
+            Order(restaurant=self.restaurant, table_number=1 + n % 2, status="completed" if n % 3 == 0 else "pending")
+            for n in range(25)
+        ])
+
+    def test_keyset_pages_cover_every_order_once(self):
+        seen = []
+        params = {"limit": 10}
+        while True:
+            data = self.client.get("/admin/orders/", params).json()
+            seen += [o["id"] for o in data["results"]]
+            if data["next"] is None:
+                break
+            params["before"] = data["next"]
+
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_status_filter(self):
+        data = self.client.get("/admin/orders/", {"status": "completed", "limit": 50}).json()
+        self.assertEqual(len(data["results"]), 9)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/admin/orders/", {"before": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_queries_use_composite_indexes(self):
+        orders = Order.objects.filter(restaurant=self.restaurant, table_number__in=[1, 2])
+
+        plan = orders.order_by("-created_at", "-id")[:51].explain()
+        self.assertIn("order_restaurant_created_idx", plan)
+
+        plan = orders.filter(status="completed").order_by("-created_at")[:51].explain()
+        self.assertIn("order_restaurant_status_idx", plan)
+
+
+class StaffTokenAuthenticationTests(AdminTestCase):
+    def login(self):
+        client = APIClient()
+        tokens = client.post("/admin/auth/login/", {"username": "owner", "password": "pass"}).json()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return client, tokens
+
+    def test_token_carries_restaurant_claim(self):
+        _, tokens = self.login()
+        self.assertEqual(AccessToken(tokens["access"])["restaurant_id"], self.restaurant.id)
+
+        refreshed = APIClient().post("/admin/auth/refresh/", {"refresh": tokens["refresh"]}).json()
+        self.assertEqual(AccessToken(refreshed["access"])["restaurant_id"], self.restaurant.id)
+
+    def test_admin_requests_do_no_identity_queries(self):
+        client, _ = self.login()
+        client.get("/admin/orders/")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/admin/orders/")
+        self.assertEqual(response.status_code, 200)
+        identity_tables = ("auth_user", "adminpanel_staffprofile")
+        self.assertFalse([q for q in ctx.captured_queries if any(t in q["sql"] for t in identity_tables)])
+
+    def test_deactivated_user_is_rejected_despite_cache(self):
+        client, _ = self.login()
+        client.get("/admin/orders/")
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get("/admin/orders/").status_code, 401)
+
+    def test_cache_holds_no_password_hash(self):
+        client, _ = self.login()
+        client.get("/admin/orders/")
+
+        self.assertEqual(cache.get(user_cache_key(self.user.id)), {
+            "id": self.user.id, "username": "owner", "is_active": True, "restaurant_id": self.restaurant.id,
+        })
+
+    def test_moved_staff_follow_their_profile(self):
+        # Tokens from before the restaurant claim fall back to the cached profile
+        token = AccessToken.for_user(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(client.get("/admin/settings/").json()["primary_color"], "#2563eb")
+
+        other = Restaurant.objects.create(
+            name="Other", cuisine="Goan", address="Panjim", primary_color="#000000"
+        )
+        StaffProfile.objects.filter(user=self.user).update(restaurant=other)
+        StaffProfile.objects.get(user=self.user).save()
+        self.assertEqual(client.get("/admin/settings/").json()["primary_color"], "#000000")
+
+
+class RestaurantSettingsTests(AdminTestCase):
+    def test_staff_get_their_restaurants_settings(self):
+        response = self.client.get("/admin/settings/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["primary_color"], "#2563eb")
+
+    def test_guests_name_the_restaurant(self):
+        self.restaurant.primary_color = "#ff5a1f"
+        self.restaurant.save()
+
+        guest = APIClient()
+        response = guest.get(f"/admin/settings/?restaurant_id={self.restaurant.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["primary_color"], "#ff5a1f")
+
+        self.assertEqual(guest.get("/admin/settings/").status_code, 400)
+        self.assertEqual(guest.get("/admin/settings/?restaurant_id=999").status_code, 404)
+        self.assertEqual(guest.put("/admin/settings/", {"primary_color": "#000000"}).status_code, 401)
+
+
+class MenuCSVUploadTests(AdminTestCase):
+    HEADER = "category,name,description,price,is_veg,is_jain,is_chefs_special,cooking_time_minutes\n"
+
+    def upload(self, body):
+        csv_file = SimpleUploadedFile("menu.csv", (self.HEADER + body).encode(), content_type="text/csv")
+        return self.client.post("/admin/menu/csv-upload/", {"file": csv_file}, format="multipart")
+
+    def test_import_creates_updates_and_reports_rejects(self):
+        coffee = MenuCategory.objects.create(restaurant=self.restaurant, name="Coffee")
+        MenuItem.objects.create(restaurant=self.restaurant, category=coffee, name="Espresso", price=Decimal("150.00"))
+
+        response = self.upload(
+            "Coffee,Espresso,a balanced double shot,200,True,True,False,3\n"
+            "Coffee,Americano,double espresso with hot water,240,True,True,False,3\n"
+            "Mains,Keema Pav,,abc,False,False,False,15\n"
+            "Mains,Chicken Cafreal,goan spiced chicken,480,False,False,True,20\n"
+        )
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data["created"], data["updated"], data["rejected_count"]), (2, 1, 1))
+        self.assertEqual(data["rejected"][0]["line"], 4)
+        self.assertIn("price", data["rejected"][0]["errors"])
+
+        self.assertEqual(MenuItem.objects.get(name="Espresso").price, Decimal("200.00"))
+        cafreal = MenuItem.objects.select_related("category").get(name="Chicken Cafreal")
+        self.assertEqual(cafreal.category.name, "Mains")
+        self.assertTrue(cafreal.is_non_veg)
+
+    def test_missing_columns_are_rejected(self):
+        csv_file = SimpleUploadedFile("menu.csv", b"name,price\nTea,50\n", content_type="text/csv")
+        response = self.client.post("/admin/menu/csv-upload/", {"file": csv_file}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MenuItem.objects.exists())
+
+
+@override_settings(QR_RENDER_WORKERS=0, QR_CACHE_DIR=tempfile.mkdtemp())
+class TableBulkCreateTests(AdminTestCase):
+    def test_range_creates_missing_tables_and_renders_codes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/tables/bulk/", {"start": 1, "end": 5}, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual([t["number"] for t in data["created"]], [3, 4, 5])
+        self.assertEqual(data["skipped"], [1, 2])
+        self.assertTrue(all(t["qr_status"] == "pending" for t in data["created"]))
+
+        self.assertEqual(Table.objects.get(restaurant=self.restaurant, number=4).qr_status, Table.QR_READY)
+        self.assertEqual(data["created"][1]["qr_code"], f"/api/restaurants/{self.restaurant.id}/tables/4/qr/")
+
+    def test_numbers_taken_meanwhile_do_not_fail_the_batch(self):
+        def create_table_meanwhile(execute, sql, params, many, context):
+            # Another request adds table 4 just before the batch is inserted
+            if sql.startswith("INSERT") and Table._meta.db_table in sql and not taken:
+                taken.append(4)
+                Table.objects.create(restaurant=self.restaurant, number=4)
+            return execute(sql, params, many, context)
+
+        taken = []
+        with connection.execute_wrapper(create_table_meanwhile):
+            response = self.client.post("/admin/tables/bulk/", {"start": 3, "end": 5}, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([t["number"] for t in response.json()["created"]], [3, 4, 5])
+        self.assertEqual(Table.objects.filter(restaurant=self.restaurant, number=4).count(), 1)
+
+    def test_single_table_renders_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/tables/", {"number": 9}, format="json")
+
+        self.assertEqual(response.json()["qr_status"], "pending")
+        self.assertEqual(Table.objects.get(number=9).qr_status, Table.QR_READY)
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.post("/admin/tables/bulk/", {"start": 10, "end": 1}, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/admin/tables/bulk/", {"start": 1, "end": 1000}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QR_RENDER_WORKERS=0)
+class TableQRSheetTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=n) for n in range(3, 16)])
+
+    def download(self, **params):
+        response = self.client.get("/admin/tables/qr-sheet/", params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_pdf_has_one_page_per_twelve_tables(self):
+        response, body = self.download()
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertEqual(len(PdfParser.PdfParser(buf=body).pages), 2)
+
+    def test_png_sheets_are_zipped(self):
+        _, body = self.download(output="png")
+        with zipfile.ZipFile(BytesIO(body)) as archive:
+            self.assertEqual(archive.namelist(), ["tables-001.png", "tables-002.png"])
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get("/admin/tables/qr-sheet/", {"output": "svg"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QR_RENDER_WORKERS=0)
+class MenuImageVariantTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.variant_dir = os.path.join(media.name, VARIANT_DIR)
+        bakery = MenuCategory.objects.create(restaurant=self.restaurant, name="Bakery")
+        self.item = MenuItem.objects.create(
+            restaurant=self.restaurant, category=bakery, name="Bun Maska", price=Decimal("60.00")
+        )
+
+    def photo(self, size=(2000, 1500), color="#d4a373"):
+        buffer = BytesIO()
+        Image.new("RGB", size, color).save(buffer, "JPEG")
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def upload(self, image, item=None):
+        item = item or self.item
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(f"/admin/menu/{item.id}/", {"image": image}, format="multipart")
+
+    def variant_files(self):
+        return set(os.listdir(self.variant_dir))
+
+    def test_upload_produces_variants_in_menu_payload(self):
+        self.assertEqual(self.upload(self.photo()).status_code, 200)
+
+        menu = self.client.get(f"/api/restaurants/{self.restaurant.id}/menu/").json()
+        variants = menu[0]["items"][0]["image_variants"]
+        self.assertEqual(
+            {size: (v["width"], v["height"]) for size, v in variants.items()},
+            {"thumb": (160, 120), "medium": (480, 360), "large": (1024, 768)},
+        )
+
+        response = self.client.get(variants["medium"]["webp"])
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (480, 360))
+
+    def test_small_photos_are_not_upscaled(self):
+        self.upload(self.photo(size=(300, 200)))
+        variants = MenuItem.objects.get(id=self.item.id).image_variants
+        self.assertEqual((variants["large"]["width"], variants["medium"]["width"]), (300, 300))
+
+    def test_removing_photo_clears_variants(self):
+        self.upload(self.photo())
+        self.upload("")
+        self.assertEqual(MenuItem.objects.get(id=self.item.id).image_variants, {})
+
+    def test_replaced_photos_leave_no_unused_variant_files(self):
+        self.upload(self.photo())
+        first = self.variant_files()
+        self.upload(self.photo(color="#6b4226"))
+        second = self.variant_files()
+        self.assertEqual(len(second), 6)
+        self.assertFalse(first & second)
+
+        # The same photo on another item shares its files
+        other = MenuItem.objects.create(restaurant=self.restaurant, name="Chai", price=Decimal("40.00"))
+        self.upload(self.photo(color="#6b4226"), item=other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertEqual(self.variant_files(), second)
+
+        self.upload("", item=other)
+        self.assertEqual(self.variant_files(), set())
+
+    def test_unknown_variant_is_not_found(self):
+        self.assertEqual(self.client.get("/api/images/../settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/api/images/" + "0" * 32 + ".webp").status_code, 404)
+
+
+class PrepTimeLearningTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dosa = MenuItem.objects.create(
+            restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"), cooking_time_minutes=10
+        )
+        self.chai = MenuItem.objects.create(
+            restaurant=self.restaurant, name="Chai", price=Decimal("40.00"), cooking_time_minutes=5
+        )
+
+    def set_status(self, order, new_status):
+        response = self.client.put(f"/admin/orders/{order.id}/", {"status": new_status}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return Order.objects.get(id=order.id)
+
+    def cook(self, minutes):
+        """Place a dosa + chai order that took `minutes` once it started preparing."""
+        order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=self.dosa, item_price=self.dosa.price),
+            OrderItem(order=order, menu_item=self.chai, item_price=self.chai.price),
+        ])
+        order = self.set_status(order, "preparing")
+        Order.objects.filter(id=order.id).update(preparing_at=F("preparing_at") - timedelta(minutes=minutes))
+        return self.set_status(order, "completed")
+
+    def test_status_transitions_are_timestamped(self):
+        order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        self.assertIsNone(order.preparing_at)
+
+        order = self.set_status(order, "preparing")
+        self.assertIsNotNone(order.preparing_at)
+        self.assertIsNone(order.completed_at)
+
+        order = self.set_status(order, "completed")
+        self.assertGreaterEqual(order.completed_at, order.preparing_at)
+
+    def test_completions_update_a_moving_average(self):
+        order = self.cook(20)
+        hour = timezone.localtime(order.preparing_at).hour
+
+        # Both lines cook in parallel; chai was expected to take half as long
+        estimates = {e.menu_item_id: e for e in PrepTimeEstimate.objects.filter(hour=hour)}
+        self.assertAlmostEqual(estimates[self.dosa.id].minutes, 12.0, places=1)
+        self.assertAlmostEqual(estimates[self.chai.id].minutes, 6.0, places=1)
+
+        # Learned values only replace the owner's guess after enough samples
+        self.assertEqual(learned_prep_minutes([self.dosa], order.preparing_at)[self.dosa.id], 10)
+        self.cook(20)
+        self.cook(20)
+        learned = learned_prep_minutes([self.dosa], order.preparing_at)[self.dosa.id]
+        self.assertAlmostEqual(learned, 14.9, places=1)
+
+        data = self.client.get("/admin/menu/prep-times/", {"item": self.dosa.id}).json()
+        self.assertEqual(data[0]["cooking_time_minutes"], 10)
+        self.assertEqual(data[0]["learned"], [{"hour": hour, "minutes": 14.9, "samples": 3}])
+
+    def test_simultaneous_completions_are_both_learned_from(self):
+        first, second = self.cook(20), self.cook(20)
+        PrepTimeEstimate.objects.all().delete()
+
+        def complete_second_meanwhile(execute, sql, params, many, context):
+            # Record the second completion just as the first one writes
+            if not recorded and sql.startswith(("INSERT", "UPDATE")) and PrepTimeEstimate._meta.db_table in sql:
+                recorded.append(second)
+                record_completion(second)
+            return execute(sql, params, many, context)
+
+        recorded = []
+        with connection.execute_wrapper(complete_second_meanwhile):
+            record_completion(first)
+
+        estimate = PrepTimeEstimate.objects.get(menu_item=self.dosa)
+        self.assertEqual(estimate.samples, 2)
+        self.assertAlmostEqual(estimate.minutes, 13.6, places=1)
+
+    def test_stale_orders_are_not_learned_from(self):
+        self.cook(60 * 8)
+        self.assertFalse(PrepTimeEstimate.objects.exists())
+
+
+class AdminBillsTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dosa = MenuItem.objects.create(restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"))
+        self.chai = MenuItem.objects.create(restaurant=self.restaurant, name="Chai", price=Decimal("40.50"))
+
+    def place_order(self, dosas, chais):
+        response = APIClient().post(
+            f"/api/restaurants/{self.restaurant.id}/orders/",
+            {"table_number": 1, "items": [
+                {"menu_item": self.dosa.id, "quantity": dosas},
+                {"menu_item": self.chai.id, "quantity": chais},
+            ]},
+            format="json",
+        )
+        order = Order.objects.get(id=response.json()["id"])
+        order.status = "completed"
+        order.save()
+        return order
+
+    def test_total_is_computed_at_creation(self):
+        order = self.place_order(2, 3)
+        self.assertEqual(order.total_amount, Decimal("361.50"))
+
+    def test_bills_are_paginated_with_flat_lines_and_daily_sums(self):
+        for chais in range(1, 6):
+            self.place_order(1, chais)
+        Order.objects.create(restaurant=self.restaurant, table_number=2)  # still open
+
+        data = self.client.get("/admin/bills/", {"limit": 3}).json()
+        self.assertEqual([bill["total_amount"] for bill in data["results"]], ["322.50", "282.00", "241.50"])
+        self.assertEqual(data["results"][0]["items"][1], {"menu_item_name": "Chai", "quantity": 5, "price": "40.50"})
+
+        rest = self.client.get("/admin/bills/", {"limit": 3, "before": data["next"]}).json()
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next"])
+
+        self.assertEqual(len(data["daily"]), 1)
+        self.assertEqual(data["daily"][0]["orders"], 5)
+        self.assertEqual(data["daily"][0]["total"], "1207.50")
+
+    def test_archived_bills_keep_their_totals(self):
+        self.place_order(2, 3)
+        before = self.client.get("/admin/bills/").json()
+
+        call_command("archive_orders", stdout=StringIO())
+        self.place_order(1, 1)
+        after = self.client.get("/admin/bills/", {"limit": 1}).json()
+        self.assertFalse(Order.objects.filter(total_amount=Decimal("361.50")).exists())
+
+        older = self.client.get("/admin/bills/", {"limit": 1, "before": after["next"]}).json()
+        self.assertEqual(older["results"], before["results"])
+        self.assertEqual(after["daily"][0]["orders"], 2)
+        self.assertEqual(after["daily"][0]["total"], "522.00")
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for n in range(6):
+            self.place_order(1, 1)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/admin/bills/", {"limit": 2})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get("/admin/bills/", {"limit": 6})
+        self.assertEqual(len(small), len(large))
+
+
+class SalesAnalyticsTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dosa = MenuItem.objects.create(restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"))
+        self.chai = MenuItem.objects.create(restaurant=self.restaurant, name="Chai", price=Decimal("40.00"))
+
+    def place_order(self, dosas, chais, final_status="completed"):
+        order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=self.dosa, quantity=dosas, item_price=self.dosa.price),
+            OrderItem(order=order, menu_item=self.chai, quantity=chais, item_price=self.chai.price),
+        ])
+        Order.objects.filter(id=order.id).update(total_amount=120 * dosas + 40 * chais)
+        self.client.put(f"/admin/orders/{order.id}/", {"status": final_status}, format="json")
+        return Order.objects.get(id=order.id)
+
+    def rollups(self):
+        return (
+            sorted(ItemSalesHour.objects.values_list('menu_item_id', 'hour', 'orders', 'quantity', 'revenue')),
+            sorted(DailySales.objects.values_list('date', 'orders', 'items_sold', 'revenue', 'cancelled_orders')),
+        )
+
+    def test_rollups_follow_completions_and_cancellations(self):
+        self.place_order(2, 1)
+        self.place_order(1, 3)
+        self.place_order(5, 5, final_status="cancelled")
+
+        self.assertEqual(ItemSalesHour.objects.get(menu_item=self.dosa).quantity, 3)
+        self.assertEqual(ItemSalesHour.objects.get(menu_item=self.chai).revenue, Decimal("160.00"))
+        daily = DailySales.objects.get()
+        self.assertEqual((daily.orders, daily.items_sold, daily.revenue, daily.cancelled_orders), (2, 7, Decimal("520.00"), 1))
+
+        # Reopening a completed order takes it back out
+        order = Order.objects.filter(status="completed").first()
+        self.client.put(f"/admin/orders/{order.id}/", {"status": "preparing"}, format="json")
+        self.assertEqual(DailySales.objects.get().orders, 1)
+
+    def test_backfill_matches_incremental_rollups(self):
+        for n in range(1, 6):
+            self.place_order(n, 6 - n, final_status="cancelled" if n == 3 else "completed")
+        incremental = self.rollups()
+
+        call_command("backfill_sales", chunk_days=1, stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_orders_completed_during_a_backfill_are_counted_once(self):
+        old = self.place_order(1, 1)
+        Order.objects.filter(id=old.id).update(created_at=F("created_at") - timedelta(days=10))
+        later = self.place_order(2, 0, final_status="preparing")
+
+        def complete_later(processed):
+            # Called once the old order's days are rebuilt, before today's
+            if later.status != "completed":
+                later.status = "completed"
+                later.save()
+
+        backfill_rollups(chunk_days=1, progress=complete_later)
+        self.assertEqual(DailySales.objects.get(date=timezone.localdate()).orders, 1)
+        during = self.rollups()
+
+        backfill_rollups()
+        self.assertEqual(self.rollups(), during)
+
+    def test_reports(self):
+        self.place_order(2, 1)
+        self.place_order(0, 4)
+
+        daily = self.client.get("/admin/analytics/").json()
+        self.assertEqual(daily["rows"][0]["revenue"], "440.00")
+
+        items = self.client.get("/admin/analytics/", {"report": "items"}).json()["rows"]
+        self.assertEqual([(row["name"], row["quantity"], row["revenue"]) for row in items],
+                         [("Dosa", 2, "240.00"), ("Chai", 5, "200.00")])
+
+        hours = self.client.get("/admin/analytics/", {"report": "hours", "item": self.chai.id}).json()["rows"]
+        self.assertEqual(hours, [{"hour": timezone.localtime().hour, "orders": 2, "quantity": 5, "revenue": "200.00"}])
+
+        self.assertEqual(self.client.get("/admin/analytics/", {"from": "2025-02-30"}).status_code, 400)
+
+
+@override_settings(ORDER_ARCHIVE_IN_BACKGROUND=False, ORDER_ARCHIVE_BATCH_SIZE=2, ORDER_ARCHIVE_PAUSE=0)
+class OrderArchiveTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dosa = MenuItem.objects.create(restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"))
+
+    def place_order(self, status, quantity=1):
+        order = Order.objects.create(
+            restaurant=self.restaurant, table_number=1, total_amount=quantity * self.dosa.price
+        )
+        OrderItem.objects.create(order=order, menu_item=self.dosa, quantity=quantity, item_price=self.dosa.price)
+        order.status = status
+        order.save()
+        return order
+
+    def test_finished_orders_move_to_the_archive_in_batches(self):
+        finished = [self.place_order("completed", n) for n in (1, 2, 3)] + [self.place_order("cancelled")]
+        still_open = self.place_order("preparing")
+
+        response = self.client.delete("/admin/orders/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"message": "Archiving 4 orders."})
+
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [still_open.id])
+        self.assertEqual(OrderItem.objects.count(), 1)
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list('id', flat=True)), [o.id for o in finished])
+        self.assertEqual(ArchivedOrderItem.objects.count(), 4)
+
+        # Archiving is not a refund
+        self.assertEqual(DailySales.objects.get().revenue, Decimal("720.00"))
+
+        # History outlives the menu item
+        self.dosa.delete()
+        data = self.client.get("/admin/orders/archive/", {"status": "completed", "limit": 2}).json()
+        self.assertEqual([o["id"] for o in data["results"]], [finished[2].id, finished[1].id])
+        self.assertEqual(data["results"][0]["items"], [{"menu_item_name": "Dosa", "quantity": 3, "price": "120.00"}])
+        rest = self.client.get("/admin/orders/archive/", {"status": "completed", "before": data["next"]}).json()
+        self.assertEqual([o["id"] for o in rest["results"]], [finished[0].id])
+
+        self.assertEqual(self.client.get("/admin/orders/archive/", {"from": "yesterday"}).status_code, 400)
+
+    def test_backfill_includes_archived_orders(self):
+        self.place_order("completed", 2)
+        call_command("archive_orders", stdout=StringIO())
+        self.place_order("completed", 1)
+
+        call_command("backfill_sales", stdout=StringIO())
+        self.assertEqual(DailySales.objects.get().revenue, Decimal("360.00"))
+        self.assertEqual(ItemSalesHour.objects.get().quantity, 3)
@@ -3,12 +3,18 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .views import (
     AdminOrdersView,
+    AdminOrderArchiveView,
     AdminOrderUpdateView,
+    AdminBillsView,
+    AdminAnalyticsView,
     AddMenuItemView,
     UpdateMenuItemView,
     MenuCSVUploadView,
+    PrepTimesView,
     RestaurantSettingsView,
     TableListView,
+    TableBulkCreateView,
+    TableQRSheetView,
     TableDetailView,
 )
 
@@ -21,12 +27,16 @@ urlpatterns = [
     # ORDER Management
     path('orders/', AdminOrdersView.as_view()),
     path('orders/<int:order_id>/', AdminOrderUpdateView.as_view()),
+    path('orders/archive/', AdminOrderArchiveView.as_view()),
+    path('bills/', AdminBillsView.as_view()),
+    path('analytics/', AdminAnalyticsView.as_view()),
 
     # MENU Management
     path('menu/', AddMenuItemView.as_view()),
     path('menu/<int:pk>/', UpdateMenuItemView.as_view()),
     path('menu/<int:pk>/', UpdateMenuItemView.as_view()),
     path('menu/csv-upload/', MenuCSVUploadView.as_view()),
+    path('menu/prep-times/', PrepTimesView.as_view()),
     
     
     # Settings
@@ -34,5 +44,7 @@ urlpatterns = [
     
     # Tables & QR Codes
     path('tables/', TableListView.as_view()),
+    path('tables/bulk/', TableBulkCreateView.as_view()),
+    path('tables/qr-sheet/', TableQRSheetView.as_view()),
     path('tables/<int:pk>/', TableDetailView.as_view()),
 ]
@@ -1,2 +1,10 @@
+from decimal import Decimal
+
+
 def get_staff_restaurant(user):
     return user.staffprofile.restaurant
+
+
+def money(amount):
+    """Render an amount the way DRF renders a 2dp DecimalField, e.g. "120.00"."""
+    return str(Decimal(amount or 0).quantize(Decimal("0.01")))
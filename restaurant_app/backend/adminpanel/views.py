@@ -4,95 +4,423 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
-from restaurants.models import Order, MenuItem, MenuCategory
-from restaurants.serializers import OrderSerializer
+from datetime import date, timedelta
 
-from adminpanel.models import StaffProfile
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from restaurants.models import (
+    Restaurant, Order, OrderItem, MenuItem, MenuCategory, PrepTimeEstimate, ItemSalesHour, DailySales,
+    ArchivedOrder, ArchivedOrderItem,
+)
+from restaurants.analytics import day_bounds, sales_date
+from restaurants.archive import archivable_orders
+from restaurants.changes import snapshot_cursor, read_changes, cursor_expired
+from restaurants.serializers import OrderSerializer, with_order_lines
+from restaurants.events import publish_order_event
+from restaurants.prep_times import record_completion
+from restaurants.cache import get_table_numbers
+from restaurants.jobs import delete_unused_variants, enqueue_menu_image_variants, enqueue_order_archive
+
+from adminpanel.authentication import StaffRestaurantMixin
+from adminpanel.menu_import import MenuCSVImporter
+from adminpanel.pagination import paginate_orders, paginate_merged, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from adminpanel.utils import money
 from adminpanel.serializers import (
     AdminOrderUpdateSerializer,
     AddMenuItemSerializer,
     RestaurantSettingsSerializer
 )
 
-import csv
 from io import TextIOWrapper
 
 
 # -------------------------------
 # GET ALL ORDERS (Admin)
 # -------------------------------
-class AdminOrdersView(APIView):
+class AdminOrdersView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
+
+        # Get valid table numbers (cached until a table is added or removed)
+        valid_table_numbers = get_table_numbers(restaurant_id)
 
-        # Get valid table numbers
-        valid_table_numbers = Table.objects.filter(restaurant=restaurant).values_list('number', flat=True)
+        since = request.query_params.get('since')
+        if since is not None:
+            return self.get_changes(restaurant_id, valid_table_numbers, since)
 
-        orders = Order.objects.filter(
-            restaurant=restaurant,
+        # Take the cursor before reading, so anything written meanwhile
+        # shows up again in the next ?since= poll rather than being missed
+        cursor = snapshot_cursor(restaurant_id)
+
+        orders = with_order_lines(Order.objects.filter(
+            restaurant_id=restaurant_id,
             table_number__in=valid_table_numbers
-        ).order_by('-created_at')
+        ))
+
+        order_status = request.query_params.get('status')
+        if order_status:
+            orders = orders.filter(status=order_status)
+
+        # ?limit= / ?before= switch to keyset pagination, newest first
+        if 'limit' in request.query_params or 'before' in request.query_params:
+            try:
+                limit = min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+                page, next_cursor = paginate_orders(orders, request.query_params.get('before'), max(limit, 1))
+            except ValueError:
+                return Response({"error": "Invalid limit or before cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+            response = Response({
+                "results": OrderSerializer(page, many=True).data,
+                "next": next_cursor,
+            })
+        else:
+            response = Response(OrderSerializer(orders.order_by('-created_at', '-id'), many=True).data)
+
+        response['X-Orders-Cursor'] = cursor
+        return response
+
+    def get_changes(self, restaurant_id, valid_table_numbers, since):
+        """
+        Orders created, updated or deleted after the `since` cursor.
+        Deleted orders are returned as ids in `deleted`. Recent changes
+        come back again in the next poll too (see restaurants/changes.py).
+        """
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({"error": "since must be an integer cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if cursor_expired(since):
+            return Response(
+                {"error": "This cursor has expired; reload the full order list"},
+                status=status.HTTP_410_GONE
+            )
 
-        return Response(OrderSerializer(orders, many=True).data)
+        changes, cursor = read_changes(restaurant_id, since)
+
+        # Only the latest change per order matters
+        latest = {}
+        for _, order_id, deleted in changes:
+            latest[order_id] = deleted
+
+        deleted_ids = [order_id for order_id, deleted in latest.items() if deleted]
+        orders = with_order_lines(Order.objects.filter(
+            restaurant_id=restaurant_id,
+            table_number__in=valid_table_numbers,
+            id__in=[order_id for order_id, deleted in latest.items() if not deleted]
+        )).order_by('-created_at')
+
+        return Response({
+            "cursor": cursor,
+            "orders": OrderSerializer(orders, many=True).data,
+            "deleted": deleted_ids,
+        })
 
     def delete(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
-        
-        # Clear completed and cancelled orders
-        deleted_count, _ = Order.objects.filter(
-            restaurant=restaurant, 
-            status__in=['completed', 'cancelled']
-        ).delete()
-        
-        return Response({"message": f"Cleared {deleted_count} orders."})
+        restaurant_id = self.restaurant_id
+
+        # Completed and cancelled orders move to the archive in small
+        # batches in the background; pollers see them go as deletions
+        count = archivable_orders(restaurant_id).count()
+        enqueue_order_archive(restaurant_id)
+
+        return Response({"message": f"Archiving {count} orders."}, status=status.HTTP_202_ACCEPTED)
+
+
+# -------------------------------
+# ORDER ARCHIVE (read-only)
+# -------------------------------
+class AdminOrderArchiveView(StaffRestaurantMixin, APIView):
+    """
+    Archived orders, newest first, with keyset pagination (?limit=,
+    ?before=). Optional filters: ?status=, ?table=, and ?from= / ?to=
+    inclusive YYYY-MM-DD dates.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        restaurant_id = self.restaurant_id
+        params = request.query_params
+
+        orders = ArchivedOrder.objects.filter(restaurant_id=restaurant_id)
+
+        order_status = params.get('status')
+        if order_status:
+            orders = orders.filter(status=order_status)
+
+        try:
+            if params.get('table'):
+                orders = orders.filter(table_number=int(params['table']))
+            if params.get('from'):
+                first = date.fromisoformat(params['from'])
+                orders = orders.filter(created_at__gte=day_bounds(first, first)[0])
+            if params.get('to'):
+                last = date.fromisoformat(params['to'])
+                orders = orders.filter(created_at__lt=day_bounds(last, last)[1])
+        except (ValueError, OverflowError):
+            return Response({"error": "table must be an integer, from and to YYYY-MM-DD dates"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            page, next_cursor = paginate_orders(orders, params.get('before'), max(limit, 1))
+        except ValueError:
+            return Response({"error": "Invalid limit or before cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = {}
+        order_items = (
+            ArchivedOrderItem.objects
+            .filter(order_id__in=[order.id for order in page])
+            .order_by('id')
+            .values_list('order_id', 'menu_item_name', 'quantity', 'item_price')
+        )
+        for order_id, name, quantity, price in order_items:
+            lines.setdefault(order_id, []).append(
+                {"menu_item_name": name, "quantity": quantity, "price": money(price)}
+            )
+
+        return Response({
+            "results": [
+                {
+                    "id": order.id,
+                    "table_number": order.table_number,
+                    "status": order.status,
+                    "created_at": order.created_at,
+                    "completed_at": order.completed_at,
+                    "cancelled_at": order.cancelled_at,
+                    "archived_at": order.archived_at,
+                    "total_amount": money(order.total_amount),
+                    "items": lines.get(order.id, []),
+                }
+                for order in page
+            ],
+            "next": next_cursor,
+        })
+
+
+# -------------------------------
+# BILLS (completed orders)
+# -------------------------------
+class AdminBillsView(StaffRestaurantMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 366
+
+    def get(self, request):
+        restaurant_id = self.restaurant_id
+
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            days = min(int(request.query_params.get('days', self.DEFAULT_DAYS)), self.MAX_DAYS)
+        except ValueError:
+            return Response({"error": "limit and days must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Completed orders stay bills once the archive job has moved them
+        fields = ('id', 'table_number', 'created_at', 'completed_at', 'total_amount')
+        try:
+            page, next_cursor = paginate_merged(
+                [
+                    Order.objects.filter(restaurant_id=restaurant_id, status="completed").only(*fields),
+                    ArchivedOrder.objects.filter(restaurant_id=restaurant_id, status="completed").only(*fields),
+                ],
+                request.query_params.get('before'),
+                max(limit, 1),
+            )
+        except ValueError:
+            return Response({"error": "Invalid before cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The page's lines in one flat query per table, grouped in Python
+        lines = {}
+        page_ids = [order.id for order in page]
+        order_items = [
+            OrderItem.objects
+            .filter(order_id__in=page_ids)
+            .order_by('id')
+            .values_list('order_id', 'menu_item__name', 'quantity', 'item_price'),
+            ArchivedOrderItem.objects
+            .filter(order_id__in=page_ids)
+            .order_by('id')
+            .values_list('order_id', 'menu_item_name', 'quantity', 'item_price'),
+        ]
+        for rows in order_items:
+            for order_id, name, quantity, price in rows:
+                lines.setdefault(order_id, []).append(
+                    {"menu_item_name": name, "quantity": quantity, "price": money(price)}
+                )
+
+        # From the sales rollup, which archiving leaves alone
+        since = sales_date(timezone.now() - timedelta(days=days))
+        daily = (
+            DailySales.objects
+            .filter(restaurant_id=restaurant_id, date__gte=since, orders__gt=0)
+            .order_by('-date')
+            .values_list('date', 'orders', 'revenue')
+        )
+
+        return Response({
+            "results": [
+                {
+                    "id": order.id,
+                    "table_number": order.table_number,
+                    "created_at": order.created_at,
+                    "completed_at": order.completed_at,
+                    "total_amount": money(order.total_amount),
+                    "items": lines.get(order.id, []),
+                }
+                for order in page
+            ],
+            "next": next_cursor,
+            "daily": [
+                {"date": day, "orders": orders, "total": money(revenue)}
+                for day, orders, revenue in daily
+            ],
+        })
+
+
+# -------------------------------
+# SALES ANALYTICS (from rollups)
+# -------------------------------
+class AdminAnalyticsView(StaffRestaurantMixin, APIView):
+    """
+    Dashboard figures read from the sales rollups, never from order lines.
+
+    ?report=daily   revenue, orders, items sold and cancellations per day
+    ?report=items   sales per menu item over the range, best sellers first
+    ?report=hours   sales per hour of day over the range (?item= for one item)
+
+    ?from= / ?to= are inclusive YYYY-MM-DD dates, the last 30 days by default.
+    """
+    permission_classes = [IsAuthenticated]
+    REPORTS = ('daily', 'items', 'hours')
+    MAX_DAYS = 366
+
+    def get(self, request):
+        restaurant_id = self.restaurant_id
+
+        report = request.query_params.get('report', 'daily')
+        if report not in self.REPORTS:
+            return Response({"error": f"report must be one of {', '.join(self.REPORTS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            last = date.fromisoformat(request.query_params.get('to') or timezone.localdate().isoformat())
+            first = date.fromisoformat(request.query_params.get('from') or (last - timedelta(days=29)).isoformat())
+        except ValueError:
+            return Response({"error": "from and to must be YYYY-MM-DD dates"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= (last - first).days < self.MAX_DAYS:
+            return Response({"error": f"Range must be 1 to {self.MAX_DAYS} days"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if report == 'daily':
+            rows = [
+                {
+                    "date": row["date"],
+                    "orders": row["orders"],
+                    "items_sold": row["items_sold"],
+                    "revenue": money(row["revenue"]),
+                    "cancelled_orders": row["cancelled_orders"],
+                }
+                for row in DailySales.objects.filter(
+                    restaurant_id=restaurant_id, date__gte=first, date__lte=last
+                ).order_by('date').values('date', 'orders', 'items_sold', 'revenue', 'cancelled_orders')
+            ]
+        else:
+            start, end = day_bounds(first, last)
+            sales = ItemSalesHour.objects.filter(restaurant_id=restaurant_id, hour__gte=start, hour__lt=end)
+            totals = {"orders_total": Sum('orders'), "quantity_total": Sum('quantity'), "revenue_total": Sum('revenue')}
+
+            if report == 'items':
+                sales = (
+                    sales.values('menu_item_id', 'menu_item__name')
+                    .annotate(**totals)
+                    .order_by('-revenue_total', 'menu_item_id')
+                )
+                label = lambda row: {"menu_item_id": row["menu_item_id"], "name": row["menu_item__name"]}
+            else:
+                item_id = request.query_params.get('item')
+                if item_id is not None:
+                    if not item_id.isdigit():
+                        return Response({"error": "item must be a menu item id"}, status=status.HTTP_400_BAD_REQUEST)
+                    sales = sales.filter(menu_item_id=item_id)
+                # Sum each stored hour in SQL (at most 24 rows a day), then
+                # fold them into hours of the day in the local time zone
+                by_hour = {}
+                for row in sales.values('hour').annotate(**totals).order_by():
+                    hour = by_hour.setdefault(
+                        timezone.localtime(row['hour']).hour,
+                        {"orders_total": 0, "quantity_total": 0, "revenue_total": 0},
+                    )
+                    for field in hour:
+                        hour[field] += row[field]
+                sales = [{"hour_of_day": hour, **by_hour[hour]} for hour in sorted(by_hour)]
+                label = lambda row: {"hour": row["hour_of_day"]}
+
+            rows = [
+                {
+                    **label(row),
+                    "orders": row["orders_total"],
+                    "quantity": row["quantity_total"],
+                    "revenue": money(row["revenue_total"]),
+                }
+                for row in sales
+            ]
+
+        return Response({"report": report, "from": first, "to": last, "rows": rows})
 
 
 # -------------------------------
 # UPDATE ORDER STATUS
 # -------------------------------
-class AdminOrderUpdateView(APIView):
+class AdminOrderUpdateView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def put(self, request, order_id):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
 
-        try:
-            order = Order.objects.get(id=order_id, restaurant=restaurant)
-        except Order.DoesNotExist:
-            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            # Locked, so of two concurrent updates completing the order only
+            # the one that sees it still open learns from it
+            try:
+                order = Order.objects.select_for_update().get(id=order_id, restaurant_id=restaurant_id)
+            except Order.DoesNotExist:
+                return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = AdminOrderUpdateSerializer(order, data=request.data)
+            previous_status = order.status
+            serializer = AdminOrderUpdateSerializer(order, data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        if serializer.is_valid():
-            serializer.save()
-            return Response({"message": "Order updated successfully"})
+            order = serializer.save()
+            # Learn from how long the kitchen actually took
+            if order.status == "completed" and previous_status != "completed":
+                record_completion(order)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Push the new status to any guest watching this order
+        publish_order_event(order)
+        return Response({"message": "Order updated successfully"})
 
 
 # -------------------------------
 # ADD MENU ITEM
 # -------------------------------
-class AddMenuItemView(APIView):
+class AddMenuItemView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
 
         data = request.data.copy()
-        data["restaurant"] = restaurant.id
+        data["restaurant"] = restaurant_id
 
         serializer = AddMenuItemSerializer(data=data)
 
         if serializer.is_valid():
-            serializer.save()
+            item = serializer.save()
+            if item.image:
+                transaction.on_commit(lambda: enqueue_menu_image_variants(item.id))
             return Response({"message": "Menu item added successfully"}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -101,15 +429,14 @@ class AddMenuItemView(APIView):
 # -------------------------------
 # UPDATE MENU ITEM (Image Upload etc)
 # -------------------------------
-class UpdateMenuItemView(APIView):
+class UpdateMenuItemView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, pk):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
 
         try:
-            item = MenuItem.objects.get(id=pk, restaurant=restaurant)
+            item = MenuItem.objects.get(id=pk, restaurant_id=restaurant_id)
         except MenuItem.DoesNotExist:
             return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -120,63 +447,85 @@ class UpdateMenuItemView(APIView):
 
         serializer = AddMenuItemSerializer(item, data=data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            if 'image' not in data:
+                serializer.save()
+                return Response(serializer.data)
+
+            # A new or removed photo makes the old variants stale
+            stale_variants = item.image_variants
+            item = serializer.save(image_variants={})
+            transaction.on_commit(lambda: delete_unused_variants(stale_variants))
+            if item.image:
+                transaction.on_commit(lambda: enqueue_menu_image_variants(item.id))
             return Response(serializer.data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# -------------------------------
+# LEARNED PREP TIMES
+# -------------------------------
+class PrepTimesView(StaffRestaurantMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        restaurant_id = self.restaurant_id
+
+        items = MenuItem.objects.filter(restaurant_id=restaurant_id).order_by('id')
+        item_id = request.query_params.get('item')
+        if item_id is not None:
+            if not item_id.isdigit():
+                return Response({"error": "item must be a menu item id"}, status=status.HTTP_400_BAD_REQUEST)
+            items = items.filter(id=item_id)
+
+        learned = {}
+        estimates = (
+            PrepTimeEstimate.objects
+            .filter(menu_item__in=items)
+            .order_by('hour')
+            .values_list('menu_item_id', 'hour', 'minutes', 'samples')
+        )
+        for menu_item_id, hour, minutes, samples in estimates:
+            learned.setdefault(menu_item_id, []).append(
+                {"hour": hour, "minutes": round(minutes, 1), "samples": samples}
+            )
+
+        return Response([
+            {
+                "id": menu_item_id,
+                "name": name,
+                "cooking_time_minutes": cooking_time,
+                "learned": learned.get(menu_item_id, []),
+            }
+            for menu_item_id, name, cooking_time in items.values_list('id', 'name', 'cooking_time_minutes')
+        ])
+
+
 # -------------------------------
 # CSV BULK UPLOAD
 # -------------------------------
-class MenuCSVUploadView(APIView):
+class MenuCSVUploadView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
 
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
 
         csv_file = request.FILES.get("file")
 
         if not csv_file:
             return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
-        csv_reader = csv.DictReader(TextIOWrapper(csv_file.file, encoding='utf-8'))
-
-        created_items = 0
-
-        for row in csv_reader:
-            # Create or get category
-            category, _ = MenuCategory.objects.get_or_create(
-                restaurant=restaurant,
-                name=row["category"]
-            )
-
-            is_veg = row["is_veg"].lower() == "true"
-            # Logic: If not veg, then it is non-veg
-            is_non_veg = not is_veg
-
-            # Prepare data for serializer
-            item_data = {
-                "restaurant": restaurant.id,
-                "category": category.id,
-                "name": row["name"],
-                "description": row.get("description", ""),
-                "price": row["price"],
-                "is_veg": is_veg,
-                "is_non_veg": is_non_veg,
-                "is_jain": row["is_jain"].lower() == "true",
-                "is_chefs_special": row["is_chefs_special"].lower() == "true",
-                "cooking_time_minutes": row["cooking_time_minutes"],
-            }
-
-            serializer = AddMenuItemSerializer(data=item_data)
-            if serializer.is_valid():
-                serializer.save()
-                created_items += 1
+        # utf-8-sig also accepts the BOM that Excel puts on exported CSVs
+        importer = MenuCSVImporter(restaurant_id)
+        try:
+            report = importer.run(TextIOWrapper(csv_file.file, encoding='utf-8-sig'))
+        except ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({"file": "File must be a UTF-8 encoded CSV"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"message": f"{created_items} items uploaded successfully"})
+        return Response(report)
 
 
 # -------------------------------
@@ -184,21 +533,29 @@ class MenuCSVUploadView(APIView):
 # -------------------------------
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
-class RestaurantSettingsView(APIView):
+class RestaurantSettingsView(StaffRestaurantMixin, APIView):
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
         return [IsAuthenticated()]
 
     def get(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        # Guests have no staff token to resolve the restaurant from, so they
+        # name it (the menu page now gets the theme from the bootstrap endpoint)
+        if not request.user.is_authenticated:
+            restaurant_id = request.query_params.get('restaurant_id', '')
+            if not restaurant_id.isdigit():
+                return Response({"error": "restaurant_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+            restaurant = Restaurant.objects.filter(id=restaurant_id).first()
+            if restaurant is None:
+                return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            restaurant = self.get_restaurant()
         serializer = RestaurantSettingsSerializer(restaurant)
         return Response(serializer.data)
 
     def put(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant = self.get_restaurant()
         serializer = RestaurantSettingsSerializer(restaurant, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -209,43 +566,117 @@ class RestaurantSettingsView(APIView):
 # -------------------------------
 # TABLE & QR CODE MANAGEMENT
 # -------------------------------
+import tempfile
+from django.conf import settings
+from django.http import FileResponse
 from restaurants.models import Table
-from adminpanel.serializers import TableSerializer
+from restaurants.jobs import enqueue_table_qr, get_executor
+from restaurants.qr_sheets import write_qr_sheets, SHEET_FORMATS
+from restaurants.cache import invalidate_table_numbers
+from adminpanel.serializers import TableSerializer, TableBulkCreateSerializer
 
-class TableListView(APIView):
+class TableListView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
-        tables = Table.objects.filter(restaurant=restaurant).order_by('number')
+        restaurant_id = self.restaurant_id
+        tables = Table.objects.filter(restaurant_id=restaurant_id).order_by('number')
         return Response(TableSerializer(tables, many=True).data)
 
     def post(self, request):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
         
         number = request.data.get('number')
         if not number:
             return Response({"error": "Table number is required"}, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if table number already exists for this restaurant
-        if Table.objects.filter(restaurant=restaurant, number=number).exists():
+        if Table.objects.filter(restaurant_id=restaurant_id, number=number).exists():
             return Response({"error": "Table number already exists"}, status=status.HTTP_400_BAD_REQUEST)
 
-        table = Table.objects.create(restaurant=restaurant, number=number)
+        table = Table.objects.create(restaurant_id=restaurant_id, number=number)
         return Response(TableSerializer(table).data, status=status.HTTP_201_CREATED)
 
 
-class TableDetailView(APIView):
+class TableBulkCreateView(StaffRestaurantMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        restaurant_id = self.restaurant_id
+
+        serializer = TableBulkCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        numbers = serializer.validated_data["numbers"]
+
+        with transaction.atomic():
+            # Skip numbers that are already registered
+            existing = set(
+                Table.objects.filter(restaurant_id=restaurant_id, number__in=numbers).values_list('number', flat=True)
+            )
+            missing = [number for number in numbers if number not in existing]
+
+            # A number added meanwhile by another request is left to it,
+            # rather than failing the whole batch on the unique constraint
+            Table.objects.bulk_create(
+                [Table(restaurant_id=restaurant_id, number=number) for number in missing],
+                ignore_conflicts=True,
+            )
+            # ignore_conflicts leaves the ids unset
+            tables = list(Table.objects.filter(restaurant_id=restaurant_id, number__in=missing).order_by('number'))
+
+            # bulk_create skips Table.save(), so queue the QR codes and drop
+            # the cached table numbers here
+            table_ids = [table.id for table in tables]
+            transaction.on_commit(lambda: enqueue_table_qr(table_ids))
+            transaction.on_commit(lambda: invalidate_table_numbers(restaurant_id))
+
+        return Response({
+            "created": TableSerializer(tables, many=True).data,
+            "skipped": sorted(existing),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class TableQRSheetView(StaffRestaurantMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?output= rather than ?format=, which DRF keeps for renderer selection
+        output = request.query_params.get('output', 'pdf')
+        if output not in SHEET_FORMATS:
+            return Response({"error": "output must be pdf or png"}, status=status.HTTP_400_BAD_REQUEST)
+
+        restaurant = self.get_restaurant()
+        numbers = list(
+            Table.objects.filter(restaurant_id=restaurant.id).order_by('number').values_list('number', flat=True)
+        )
+        if not numbers:
+            return Response({"error": "No tables to print"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Sheets are spooled to a temporary file page by page and streamed
+        # from there, so memory stays flat however many tables there are
+        spool = tempfile.TemporaryFile()
+        executor = get_executor() if settings.QR_RENDER_WORKERS else None
+        write_qr_sheets(restaurant, numbers, output, spool, executor)
+        spool.seek(0)
+
+        content_type, extension = SHEET_FORMATS[output]
+        return FileResponse(
+            spool,
+            as_attachment=True,
+            filename=f"table-qr-codes.{extension}",
+            content_type=content_type,
+        )
+
+
+class TableDetailView(StaffRestaurantMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, pk):
-        staff = StaffProfile.objects.get(user=request.user)
-        restaurant = staff.restaurant
+        restaurant_id = self.restaurant_id
         
         try:
-            table = Table.objects.get(id=pk, restaurant=restaurant)
+            table = Table.objects.get(id=pk, restaurant_id=restaurant_id)
             table.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Table.DoesNotExist:
@@ -0,0 +1,103 @@
+"""
+Sales dashboard reports: rollup tables vs aggregating raw order lines.
+
+    python -m benchmarks.bench_analytics [--lines 1000000]
+
+Seeds completed orders spread over 90 days (four lines each), rebuilds
+the rollups with the backfill, then times the analytics endpoint against
+the equivalent query over OrderItem.
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks.harness import test_database, measure, report
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from adminpanel.models import StaffProfile
+from restaurants.analytics import backfill_rollups, line_revenue
+from restaurants.models import MenuItem, Order, OrderItem
+from benchmarks.seed import seed_restaurant, explicit_timestamps
+
+LINES_PER_ORDER = 4
+
+
+def seed_sales(restaurant, lines, chunk_size=20_000):
+    rng = random.Random(42)
+    menu_items = list(MenuItem.objects.filter(restaurant=restaurant))
+    start = timezone.now() - timedelta(days=90)
+    orders = lines // LINES_PER_ORDER
+    step = timedelta(days=90) / orders
+
+    for offset in range(0, orders, chunk_size):
+        batch = range(offset, min(offset + chunk_size, orders))
+        picks = {n: rng.sample(menu_items, LINES_PER_ORDER) for n in batch}
+        with explicit_timestamps(Order):
+            created = Order.objects.bulk_create([
+                Order(
+                    restaurant=restaurant,
+                    table_number=rng.randint(1, 20),
+                    status="cancelled" if n % 20 == 0 else "completed",
+                    created_at=start + step * n,
+                    total_amount=sum((item.price for item in picks[n]), Decimal(0)),
+                )
+                for n in batch
+            ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=1, item_price=item.price)
+            for order, n in zip(created, batch)
+            for item in picks[n]
+        ])
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with test_database():
+        restaurant = seed_restaurant(categories=10, items_per_category=10)
+        seed_sales(restaurant, args.lines)
+        print(f"seeded {OrderItem.objects.count()} order lines")
+
+        started = time.perf_counter()
+        backfill_rollups()
+        print(f"backfill: {time.perf_counter() - started:.1f}s")
+
+        user = User.objects.create_user(username="bench", password="bench")
+        StaffProfile.objects.create(user=user, restaurant=restaurant)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        since = timezone.now() - timedelta(days=30)
+
+        def raw_items_report():
+            return list(
+                OrderItem.objects
+                .filter(order__restaurant=restaurant, order__status="completed", order__created_at__gte=since)
+                .values('menu_item_id', 'menu_item__name')
+                .annotate(sold=Sum('quantity'), takings=Sum(line_revenue()))
+                .order_by('-takings')
+            )
+
+        report("raw lines, items (30d)", measure(raw_items_report, iterations=5, warmup=1))
+        report("rollup, items (30d)", measure(lambda: client.get("/admin/analytics/", {"report": "items"})))
+        report("rollup, hours (30d)", measure(lambda: client.get("/admin/analytics/", {"report": "hours"})))
+        report("rollup, daily (90d)", measure(
+            lambda: client.get("/admin/analytics/", {"from": (timezone.localdate() - timedelta(days=89)).isoformat()})
+        ))
+
+
+if __name__ == "__main__":
+    main()
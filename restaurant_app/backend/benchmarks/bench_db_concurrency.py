@@ -0,0 +1,191 @@
+"""
+Concurrent order writes against the configured database profile.
+
+    python -m benchmarks.bench_db_concurrency [--writers 8] [--staff 2] [--readers 4] [--seconds 10]
+    DB_ENGINE=postgres DB_NAME=restaurant_os python -m benchmarks.bench_db_concurrency
+
+Writer processes place orders through the order endpoint, staff
+processes move orders along in read-then-write transactions, and reader
+processes poll order status, for a fixed time, the way separate server
+workers would share the database. Reports orders per second, write
+latency and errors (e.g. "database is locked"). With SQLite the run
+is repeated with Django's defaults (rollback journal, deferred
+transactions) for comparison; Postgres runs against a throwaway database
+on the configured server.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.harness import test_database, percentile
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+
+from restaurants.models import MenuItem, Order
+from benchmarks.seed import seed_restaurant
+
+
+def init_worker(database_name, pragmas, options):
+    # Point the freshly spawned worker at the benchmark's database and profile
+    connection.settings_dict["NAME"] = database_name
+    connection.settings_dict["OPTIONS"] = options
+    settings.SQLITE_PRAGMAS = pragmas
+    # Failed requests are counted, not logged
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+
+def writer(restaurant_id, item_ids, tables, seconds, seed):
+    deadline = time.monotonic() + seconds
+    client = Client()
+    rng = random.Random(seed)
+    url = f"/api/restaurants/{restaurant_id}/orders/"
+    latencies, errors = [], Counter()
+    try:
+        while time.monotonic() < deadline:
+            payload = {
+                "table_number": rng.randint(1, tables),
+                "items": [{"menu_item": i, "quantity": rng.randint(1, 3)} for i in rng.sample(item_ids, 3)],
+            }
+            started = time.perf_counter()
+            try:
+                response = client.post(url, payload, content_type="application/json")
+            except OperationalError as exc:
+                errors[str(exc)] += 1
+                continue
+            if response.status_code == 201:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors[f"HTTP {response.status_code}"] += 1
+    finally:
+        connections.close_all()
+    return latencies, errors
+
+
+def staff(restaurant_id, seconds):
+    deadline = time.monotonic() + seconds
+    next_status = {"pending": "preparing", "preparing": "completed"}
+    updates, errors = 0, Counter()
+    try:
+        while time.monotonic() < deadline:
+            try:
+                with transaction.atomic():
+                    order = (
+                        Order.objects.filter(restaurant_id=restaurant_id, status__in=next_status)
+                        .order_by('id').first()
+                    )
+                    if order is not None:
+                        order.status = next_status[order.status]
+                        order.save()
+            except OperationalError as exc:
+                errors[str(exc)] += 1
+                continue
+            if order is not None:
+                updates += 1
+            # A kitchen tablet, not a tight loop
+            time.sleep(0.05)
+    finally:
+        connections.close_all()
+    return updates, errors
+
+
+def reader(restaurant_id, order_id, seconds):
+    deadline = time.monotonic() + seconds
+    client = Client()
+    url = f"/api/restaurants/{restaurant_id}/orders/{order_id}/"
+    reads, errors = 0, Counter()
+    try:
+        while time.monotonic() < deadline:
+            try:
+                client.get(url)
+                reads += 1
+            except OperationalError as exc:
+                errors[str(exc)] += 1
+    finally:
+        connections.close_all()
+    return reads, errors
+
+
+def run_load(restaurant, writers, staff_count, readers, seconds, pragmas, options):
+    item_ids = list(MenuItem.objects.filter(restaurant=restaurant).values_list('id', flat=True))
+    polled = Order.objects.create(restaurant=restaurant, table_number=1)
+    tables = restaurant.table_set.count()
+    # The main process's connection would otherwise sit idle in the way
+    connections.close_all()
+
+    with ProcessPoolExecutor(
+        max_workers=writers + staff_count + readers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(connection.settings_dict["NAME"], pragmas, options),
+    ) as pool:
+        writes = [pool.submit(writer, restaurant.id, item_ids, tables, seconds, n) for n in range(writers)]
+        updates = [pool.submit(staff, restaurant.id, seconds) for _ in range(staff_count)]
+        reads = [pool.submit(reader, restaurant.id, polled.id, seconds) for _ in range(readers)]
+        writes = [future.result() for future in writes]
+        updates = [future.result() for future in updates]
+        reads = [future.result() for future in reads]
+
+    latencies = [ms for worker_latencies, _ in writes for ms in worker_latencies]
+    errors = sum((worker_errors for _, worker_errors in writes + updates + reads), Counter())
+    return {
+        "orders": len(latencies),
+        "orders_per_sec": len(latencies) / seconds,
+        "p50": percentile(latencies, 50) if latencies else 0,
+        "p95": percentile(latencies, 95) if latencies else 0,
+        "p99": percentile(latencies, 99) if latencies else 0,
+        "updates_per_sec": sum(count for count, _ in updates) / seconds,
+        "reads_per_sec": sum(count for count, _ in reads) / seconds,
+        "errors": errors,
+    }
+
+
+def report(label, stats):
+    print(
+        f"{label:<26} {stats['orders_per_sec']:>7.1f} orders/s "
+        f"p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms p99={stats['p99']:.1f}ms "
+        f"{stats['updates_per_sec']:>6.1f} updates/s {stats['reads_per_sec']:>6.1f} reads/s "
+        f"errors={sum(stats['errors'].values())}"
+    )
+    for message, count in stats["errors"].most_common(3):
+        print(f"    {count} x {message}")
+
+
+def profiles():
+    """(label, SQLITE_PRAGMAS, OPTIONS) for each configuration to compare."""
+    options = dict(connection.settings_dict["OPTIONS"])
+    if connection.vendor != "sqlite":
+        pooled = "pool" in options
+        yield f"{connection.vendor}, {'pooled' if pooled else 'persistent'}", settings.SQLITE_PRAGMAS, options
+        return
+    # Rollback journal and deferred transactions are SQLite's and Django's
+    # own defaults; the journal mode sticks to the file, so this runs first
+    defaults = {key: value for key, value in options.items() if key != "transaction_mode"}
+    yield "sqlite, defaults", {"journal_mode": "DELETE"}, defaults
+    yield "sqlite, tuned", settings.SQLITE_PRAGMAS, options
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--staff", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with test_database(shared=True):
+        restaurant = seed_restaurant(categories=10, items_per_category=10)
+        print(f"{args.writers} writers, {args.staff} staff, {args.readers} readers, {args.seconds:.0f}s per profile")
+
+        for label, pragmas, options in profiles():
+            report(label, run_load(restaurant, args.writers, args.staff, args.readers, args.seconds, pragmas, options))
+
+
+if __name__ == "__main__":
+    main()
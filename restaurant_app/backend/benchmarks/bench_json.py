@@ -0,0 +1,93 @@
+"""
+JSON rendering and compression on a realistic menu: DRF's JSONRenderer
+vs orjson, and payload bytes plain, gzipped and (if installed) brotli.
+
+    python -m benchmarks.bench_json
+
+The menu has 40 categories of 10 items, each with a photo and its
+resized variants, so the payload repeats long image URLs the way a
+real one does.
+"""
+
+import hashlib
+from io import BytesIO
+
+from benchmarks.harness import test_database, measure, report
+
+from django.conf import settings
+from django.test import Client
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from restaurants.cache import build_menu_document
+from restaurants.images import VARIANT_WIDTHS
+from restaurants.middleware import brotli
+from restaurants.models import MenuItem, Order, OrderItem
+from restaurants.renderers import ORJSONParser, ORJSONRenderer
+from restaurants.serializers import OrderSerializer, with_order_lines
+from benchmarks.seed import seed_restaurant
+
+
+def fake_variants(item_id):
+    def name(size, extension):
+        return f"{hashlib.sha256(f'{item_id}-{size}'.encode()).hexdigest()[:32]}.{extension}"
+
+    return {
+        size: {"width": width, "height": width * 3 // 4, "webp": name(size, "webp"), "jpeg": name(size, "jpg")}
+        for size, width in VARIANT_WIDTHS.items()
+    }
+
+
+def main():
+    with test_database():
+        restaurant = seed_restaurant(categories=40, items_per_category=10)
+        items = list(MenuItem.objects.filter(restaurant=restaurant))
+        for item in items:
+            item.image = f"menu_items/{item.name.lower().replace(' ', '_')}_photo.jpg"
+            item.image_variants = fake_variants(item.id)
+        MenuItem.objects.bulk_update(items, ["image", "image_variants"])
+
+        menu = ORJSONParser().parse(BytesIO(build_menu_document(restaurant.id)))
+
+        orders = Order.objects.bulk_create([Order(restaurant=restaurant, table_number=1) for _ in range(50)])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=1, item_price=item.price)
+            for order in orders
+            for item in items[:4]
+        ])
+        order_list = OrderSerializer(with_order_lines(Order.objects.all()), many=True).data
+
+        for label, data in (("menu", menu), ("50 orders", order_list)):
+            report(f"{label}: DRF render", measure(lambda: JSONRenderer().render(data), iterations=100))
+            report(f"{label}: orjson render", measure(lambda: ORJSONRenderer().render(data), iterations=100))
+
+        document = ORJSONRenderer().render(menu)
+        payload = b'{"table_number": 4, "items": [' + b", ".join(
+            b'{"menu_item": %d, "quantity": 2}' % item.id for item in items[:8]
+        ) + b"]}"
+        report("order body: DRF parse", measure(lambda: JSONParser().parse(BytesIO(payload)), iterations=1000))
+        report("order body: orjson parse", measure(lambda: ORJSONParser().parse(BytesIO(payload)), iterations=1000))
+
+        report("menu: gzip per request", measure(lambda: compress_string(document), iterations=100))
+
+        # The cached menu is compressed once, when it is built
+        client = Client()
+        url = f"/api/restaurants/{restaurant.id}/menu/"
+        report("menu endpoint, identity", measure(lambda: client.get(url)))
+        report("menu endpoint, gzip", measure(lambda: client.get(url, HTTP_ACCEPT_ENCODING="gzip")))
+
+        sizes = f"plain {len(document):,}, gzip {len(compress_string(document)):,}"
+        if brotli is not None:
+            quality = settings.COMPRESSION_BROTLI_QUALITY
+            report(f"menu: brotli q{quality} per request", measure(
+                lambda: brotli.compress(document, quality=quality), iterations=100
+            ))
+            sizes += f", brotli q{quality} {len(brotli.compress(document, quality=quality)):,}"
+            sizes += f", brotli q11 {len(brotli.compress(document, quality=11)):,}"
+        else:
+            sizes += " (brotli not installed)"
+        print(f"menu bytes: {sizes}")
+
+if __name__ == "__main__":
+    main()
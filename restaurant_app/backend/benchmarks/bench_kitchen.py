@@ -0,0 +1,89 @@
+"""
+Kitchen wait estimates with a busy queue: incremental scheduler vs
+re-simulating every open order.
+
+    python -m benchmarks.bench_kitchen [--open-orders 1000]
+"""
+
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.harness import test_database, measure, report
+
+from django.utils import timezone
+
+from restaurants.kitchen import get_scheduler, get_kitchen_stations
+from restaurants.models import MenuCategory, MenuItem, Order, OrderItem
+from restaurants.serializers import OrderCreateSerializer
+from benchmarks.seed import seed_restaurant, explicit_timestamps
+
+
+def seed_open_orders(restaurant, count):
+    rng = random.Random(42)
+    menu_items = list(MenuItem.objects.filter(restaurant=restaurant))
+    start = timezone.now() - timedelta(hours=2)
+
+    with explicit_timestamps(Order):
+        orders = Order.objects.bulk_create([
+            Order(
+                restaurant=restaurant,
+                table_number=rng.randint(1, 20),
+                status=rng.choice(["pending", "preparing"]),
+                created_at=start + timedelta(seconds=n * 7),
+            )
+            for n in range(count)
+        ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, menu_item=menu_item, quantity=1, item_price=menu_item.price)
+        for order in orders
+        for menu_item in rng.sample(menu_items, 3)
+    ])
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--open-orders", type=int, default=1000)
+    args = parser.parse_args()
+
+    with test_database():
+        restaurant = seed_restaurant(categories=10, items_per_category=10)
+        MenuCategory.objects.filter(restaurant=restaurant).update(stations=2)
+        orders = seed_open_orders(restaurant, args.open_orders)
+
+        menu_items = list(MenuItem.objects.filter(restaurant=restaurant)[:3])
+        lines = [(item.category_id, item.cooking_time_minutes) for item in menu_items]
+        scheduler = get_scheduler(restaurant.id)
+        scheduler.estimate(lines)
+        print(f"{scheduler.open_orders()} open orders")
+
+        def full_resimulation():
+            scheduler._rebuild(*get_kitchen_stations(restaurant.id))
+            return scheduler.estimate(lines)
+
+        report("re-simulate queue", measure(full_resimulation, iterations=50))
+        report("incremental, no changes", measure(lambda: scheduler.estimate(lines)))
+
+        pending = iter(orders)
+
+        def after_status_change():
+            order = next(pending)
+            order.status = "completed"
+            order.save()
+            return scheduler.estimate(lines)
+
+        report("incremental, 1 completion", measure(after_status_change))
+
+        payload = {"table_number": 1, "items": [{"menu_item": item.id, "quantity": 1} for item in menu_items]}
+
+        def create_order():
+            serializer = OrderCreateSerializer(data=payload, context={"restaurant": restaurant})
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+        report("order create", measure(create_order, iterations=100))
+
+
+if __name__ == "__main__":
+    main()
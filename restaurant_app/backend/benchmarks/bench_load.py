@@ -0,0 +1,263 @@
+"""
+Load test of the busiest endpoints, with a query budget for each.
+
+    python -m benchmarks.bench_load [--clients 4] [--seconds 5] [--endpoints menu order-poll]
+
+Seeds a restaurant (40 categories of 10 items, 20 tables, a staff login
+and ORDERS open orders), then drives each endpoint in turn from --clients
+spawned processes, the way separate server workers would:
+
+    menu          the public menu, gzip accepted
+    bootstrap     a guest's first page load after a QR scan, gzip accepted
+    order-poll    a guest's order, with the ETag of their last response
+    admin-list    the kitchen dashboard's full order list, staff token
+    order-create  a three-item order for a random table
+
+order-create runs last, so the other endpoints see the same data on
+every run. Reports requests/sec, p50/p95/p99 latency and queries per
+request. The run fails (non-zero exit) if an endpoint's worst request
+issues more queries than QUERY_BUDGETS allows or any request errors, so
+it can gate CI as well as size a Saturday night.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.harness import test_database, percentile
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.test import Client
+
+from adminpanel.authentication import StaffTokenObtainPairSerializer
+from adminpanel.models import StaffProfile
+from restaurants.models import MenuItem, Order, OrderItem
+from benchmarks.seed import seed_restaurant
+
+ORDERS = 200
+WARMUP = 5
+
+# Most queries a single request to each endpoint may issue, counting
+# BEGIN and COMMIT. Lower them when an endpoint gets cheaper.
+QUERY_BUDGETS = {
+    # Served from the cache once warm
+    "menu": 0,
+    "bootstrap": 0,
+    # The order, then its lines unless it's a 304
+    "order-poll": 2,
+    # Change-feed cursor, orders, lines; the table numbers are cached
+    "admin-list": 3,
+    # Restaurant, claiming the Idempotency-Key in its own transaction (3),
+    # table, items, prep times, the kitchen queue catching up on the
+    # change feed (3), then the order, change, lines and the key's order
+    # id in a transaction (6), the lines read back for the response, and
+    # storing it on the key and clearing expired keys (2)
+    "order-create": 18,
+}
+
+
+# -------------------------------
+# ENDPOINTS
+# -------------------------------
+# Each takes the client's Client, Random and the shared context and
+# returns a callable that makes one request.
+
+def menu(client, rng, context):
+    url = f"/api/restaurants/{context['restaurant_id']}/menu/"
+    return lambda: client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+
+def bootstrap(client, rng, context):
+    urls = [f"/api/restaurants/{context['restaurant_id']}/tables/{n}/bootstrap/" for n in range(1, context["tables"] + 1)]
+    return lambda: client.get(rng.choice(urls), HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+
+def order_poll(client, rng, context):
+    urls = [f"/api/restaurants/{context['restaurant_id']}/orders/{order_id}/" for order_id in context["order_ids"]]
+    etags = {}
+
+    def poll():
+        url = rng.choice(urls)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags.get(url, ""))
+        if response.has_header("ETag"):
+            etags[url] = response["ETag"]
+        return response
+
+    return poll
+
+
+def admin_list(client, rng, context):
+    return lambda: client.get("/admin/orders/", HTTP_AUTHORIZATION=f"Bearer {context['token']}")
+
+
+def order_create(client, rng, context):
+    url = f"/api/restaurants/{context['restaurant_id']}/orders/"
+
+    def place():
+        payload = {
+            "table_number": rng.randint(1, context["tables"]),
+            "items": [{"menu_item": i, "quantity": rng.randint(1, 3)} for i in rng.sample(context["item_ids"], 3)],
+        }
+        # Each new cart gets a key, as the checkout page sends
+        return client.post(url, payload, content_type="application/json",
+                           headers={"Idempotency-Key": f"{rng.random():.17f}"})
+
+    return place
+
+
+ENDPOINTS = {
+    "menu": menu,
+    "bootstrap": bootstrap,
+    "order-poll": order_poll,
+    "admin-list": admin_list,
+    "order-create": order_create,
+}
+
+
+# -------------------------------
+# CLIENTS
+# -------------------------------
+def init_worker(database_name):
+    # Point the freshly spawned worker at the benchmark's database
+    connection.settings_dict["NAME"] = database_name
+    # Failed requests are counted, not logged
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_client(endpoint, context, seconds, seed):
+    rng = random.Random(seed)
+    request = ENDPOINTS[endpoint](Client(), rng, context)
+    counter = QueryCounter()
+    latencies, queries, errors = [], Counter(), Counter()
+    try:
+        # Fill this process's caches first, as a worker that has been up a while would have
+        for _ in range(WARMUP):
+            request()
+
+        deadline = time.monotonic() + seconds
+        with connection.execute_wrapper(counter):
+            while time.monotonic() < deadline:
+                counter.count = 0
+                started = time.perf_counter()
+                try:
+                    response = request()
+                except OperationalError as exc:
+                    errors[str(exc)] += 1
+                    continue
+                if response.status_code >= 400:
+                    errors[f"HTTP {response.status_code}"] += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+                queries[counter.count] += 1
+    finally:
+        connections.close_all()
+    return latencies, queries, errors
+
+
+def run_endpoint(endpoint, context, clients, seconds):
+    with ProcessPoolExecutor(
+        max_workers=clients,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(connection.settings_dict["NAME"],),
+    ) as pool:
+        futures = [pool.submit(run_client, endpoint, context, seconds, n) for n in range(clients)]
+        results = [future.result() for future in futures]
+
+    latencies = [ms for client_latencies, _, _ in results for ms in client_latencies]
+    queries = sum((client_queries for _, client_queries, _ in results), Counter())
+    errors = sum((client_errors for _, _, client_errors in results), Counter())
+    return {
+        "requests": len(latencies),
+        "per_sec": len(latencies) / seconds,
+        "p50": percentile(latencies, 50) if latencies else 0,
+        "p95": percentile(latencies, 95) if latencies else 0,
+        "p99": percentile(latencies, 99) if latencies else 0,
+        "queries": sum(count * n for count, n in queries.items()) / max(len(latencies), 1),
+        "max_queries": max(queries, default=0),
+        "errors": errors,
+    }
+
+
+def report(label, stats, budget):
+    over = stats["max_queries"] > budget
+    print(
+        f"{label:<14} {stats['per_sec']:>7.1f} req/s "
+        f"p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms p99={stats['p99']:.1f}ms "
+        f"queries={stats['queries']:.1f} (max {stats['max_queries']}, budget {budget}) "
+        f"errors={sum(stats['errors'].values())}"
+        f"{'  OVER BUDGET' if over else ''}"
+    )
+    for message, count in stats["errors"].most_common(3):
+        print(f"    {count} x {message}")
+    return over or bool(stats["errors"]) or not stats["requests"]
+
+
+# -------------------------------
+# SETUP
+# -------------------------------
+def seed(orders):
+    restaurant = seed_restaurant(categories=40, items_per_category=10, tables=20)
+    items = list(MenuItem.objects.filter(restaurant=restaurant))
+
+    rng = random.Random(42)
+    placed = Order.objects.bulk_create([
+        Order(restaurant=restaurant, table_number=rng.randint(1, 20)) for _ in range(orders)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, menu_item=item, quantity=rng.randint(1, 3), item_price=item.price)
+        for order in placed
+        for item in rng.sample(items, 3)
+    ])
+
+    user = User.objects.create_user(username="bench-staff", password="bench-password")
+    StaffProfile.objects.create(user=user, restaurant=restaurant)
+
+    return {
+        "restaurant_id": restaurant.id,
+        "tables": 20,
+        "item_ids": [item.id for item in items],
+        "order_ids": [order.id for order in placed],
+        "token": str(StaffTokenObtainPairSerializer.get_token(user).access_token),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    args = parser.parse_args()
+
+    failed = False
+    with test_database(shared=True):
+        context = seed(ORDERS)
+        # The main process's connection would otherwise sit idle in the way
+        connections.close_all()
+        print(f"{args.clients} clients, {args.seconds:.0f}s per endpoint, {ORDERS} open orders")
+
+        for endpoint in ENDPOINTS:
+            if endpoint in args.endpoints:
+                stats = run_endpoint(endpoint, context, args.clients, args.seconds)
+                failed |= report(endpoint, stats, QUERY_BUDGETS[endpoint])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Menu endpoint: per-category queries (old) vs prefetched, cached document.
+
+    python -m benchmarks.bench_menu
+"""
+
+from benchmarks.harness import test_database, measure, report
+
+from django.core.cache import cache
+from django.test import Client
+
+from restaurants.models import MenuCategory, MenuItem
+from restaurants.serializers import MenuItemSerializer
+from restaurants.cache import build_menu_document
+from benchmarks.seed import seed_restaurant
+
+
+def legacy_menu(restaurant):
+    # The pre-cache implementation of RestaurantMenuView.get, kept for comparison
+    response_data = []
+    for category in MenuCategory.objects.filter(restaurant=restaurant):
+        items = MenuItem.objects.filter(category=category)
+        response_data.append({
+            "id": category.id,
+            "name": category.name,
+            "items": MenuItemSerializer(items, many=True).data
+        })
+    return response_data
+
+
+def main():
+    with test_database():
+        restaurant = seed_restaurant(categories=40, items_per_category=10)
+        client = Client()
+        url = f"/api/restaurants/{restaurant.id}/menu/"
+
+        report("legacy per-category", measure(lambda: legacy_menu(restaurant), iterations=50))
+        report("prefetched build (miss)", measure(lambda: build_menu_document(restaurant.id), iterations=50))
+
+        cache.clear()
+        report("GET menu (cached)", measure(lambda: client.get(url)))
+
+
+if __name__ == "__main__":
+    main()
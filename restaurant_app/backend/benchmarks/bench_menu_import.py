@@ -0,0 +1,106 @@
+"""
+Menu CSV import: per-row get_or_create + serializer save (old) vs the
+batched MenuCSVImporter, on synthetic files in the
+veronicas_bombay_menu.csv format.
+
+    python -m benchmarks.bench_menu_import [--rows 100000]
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+
+from benchmarks.harness import test_database
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from restaurants.models import MenuCategory, MenuItem, Restaurant
+from adminpanel.serializers import AddMenuItemSerializer
+from adminpanel.menu_import import MenuCSVImporter
+
+HEADER = ["category", "name", "description", "price", "is_veg", "is_jain", "is_chefs_special", "cooking_time_minutes"]
+CATEGORIES = ["Coffee", "Tea", "Breakfast", "Small Plates", "Mains", "Pasta", "Burgers", "Desserts", "Coolers", "Bar"]
+
+
+def synthetic_csv(rows, seed=7):
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    for n in range(rows):
+        writer.writerow([
+            f"{rng.choice(CATEGORIES)} {n % 50}",
+            f"Dish {n}",
+            "house special with seasonal produce and a long description",
+            rng.randint(80, 900),
+            rng.choice(["True", "False"]),
+            rng.choice(["True", "False"]),
+            rng.choice(["True", "False", "False", "False"]),
+            rng.randint(2, 30),
+        ])
+    out.seek(0)
+    return out
+
+
+def legacy_import(restaurant, stream):
+    # The pre-batching MenuCSVUploadView.post loop, kept for comparison
+    for row in csv.DictReader(stream):
+        category, _ = MenuCategory.objects.get_or_create(restaurant=restaurant, name=row["category"])
+        is_veg = row["is_veg"].lower() == "true"
+        serializer = AddMenuItemSerializer(data={
+            "restaurant": restaurant.id,
+            "category": category.id,
+            "name": row["name"],
+            "description": row.get("description", ""),
+            "price": row["price"],
+            "is_veg": is_veg,
+            "is_non_veg": not is_veg,
+            "is_jain": row["is_jain"].lower() == "true",
+            "is_chefs_special": row["is_chefs_special"].lower() == "true",
+            "cooking_time_minutes": row["cooking_time_minutes"],
+        })
+        if serializer.is_valid():
+            serializer.save()
+
+
+def timed(label, fn):
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:8.2f}s  queries~{len(ctx.captured_queries)}")
+    return result
+
+
+def fresh_restaurant(name):
+    return Restaurant.objects.create(name=name, cuisine="Bombay", address="Bandra")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with test_database():
+        restaurant = fresh_restaurant("legacy")
+        timed(f"legacy, {args.legacy_rows} rows", lambda: legacy_import(restaurant, synthetic_csv(args.legacy_rows)))
+
+        restaurant = fresh_restaurant("batched small")
+        timed(f"batched, {args.legacy_rows} rows", lambda: MenuCSVImporter(restaurant.id).run(synthetic_csv(args.legacy_rows)))
+
+        restaurant = fresh_restaurant("batched")
+        report = timed(f"batched, {args.rows} rows (insert)", lambda: MenuCSVImporter(restaurant.id).run(synthetic_csv(args.rows)))
+        print(f"  {report['message']}")
+        report = timed(f"batched, {args.rows} rows (unchanged)", lambda: MenuCSVImporter(restaurant.id).run(synthetic_csv(args.rows)))
+        print(f"  {report['message']}")
+        report = timed(f"batched, {args.rows} rows (all changed)", lambda: MenuCSVImporter(restaurant.id).run(synthetic_csv(args.rows, seed=8)))
+        print(f"  {report['message']}")
+
+
+if __name__ == "__main__":
+    main()
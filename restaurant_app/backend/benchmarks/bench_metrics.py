@@ -0,0 +1,46 @@
+"""
+Cost of the request metrics: the same requests with MetricsMiddleware
+on, off, and with the slow-request SQL capture turned on.
+
+    python -m benchmarks.bench_metrics
+"""
+
+from benchmarks.harness import test_database, measure, report
+
+from django.conf import settings
+from django.test import Client, override_settings
+
+from restaurants.models import MenuItem, Order, OrderItem
+from benchmarks.seed import seed_restaurant
+
+
+def main():
+    with test_database():
+        restaurant = seed_restaurant(categories=10, items_per_category=10)
+        items = list(MenuItem.objects.filter(restaurant=restaurant)[:4])
+        order = Order.objects.create(restaurant=restaurant, table_number=1)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=1, item_price=item.price) for item in items
+        ])
+
+        urls = [
+            ("menu (cached)", f"/api/restaurants/{restaurant.id}/menu/"),
+            ("order poll", f"/api/restaurants/{restaurant.id}/orders/{order.id}/"),
+        ]
+        without = [name for name in settings.MIDDLEWARE if name != "restaurants.metrics.MetricsMiddleware"]
+        profiles = [
+            ("no metrics", override_settings(MIDDLEWARE=without)),
+            ("metrics", override_settings(SLOW_REQUEST_MS=0)),
+            # Threshold high enough that nothing is logged, only captured
+            ("metrics + slow log", override_settings(SLOW_REQUEST_MS=60_000)),
+        ]
+        for label, url in urls:
+            for profile, overrides in profiles:
+                with overrides:
+                    # A new client, since the middleware chain is loaded once per client
+                    client = Client()
+                    report(f"{label}, {profile}", measure(lambda: client.get(url), iterations=1000, warmup=50))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Order creation throughput: per-line queries (old) vs batched, atomic create.
+
+    python -m benchmarks.bench_order_create
+"""
+
+from benchmarks.harness import test_database, measure, report
+
+from restaurants.models import MenuItem, Order, OrderItem
+from restaurants.serializers import OrderCreateSerializer
+from benchmarks.seed import seed_restaurant
+
+
+def legacy_create(restaurant, payload):
+    # The pre-batching OrderCreateSerializer.create, kept for comparison
+    order = Order.objects.create(
+        restaurant=restaurant, table_number=payload["table_number"], status="pending"
+    )
+    longest_time = 0
+    for item in payload["items"]:
+        menu_item_obj = MenuItem.objects.get(id=item["menu_item"])
+        longest_time = max(longest_time, menu_item_obj.cooking_time_minutes)
+        OrderItem.objects.create(
+            order=order, menu_item=menu_item_obj,
+            quantity=item["quantity"], item_price=menu_item_obj.price
+        )
+    order.estimated_wait_time = longest_time
+    order.save()
+    return order
+
+
+def batched_create(restaurant, payload):
+    serializer = OrderCreateSerializer(data=payload, context={"restaurant": restaurant})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def main():
+    with test_database():
+        restaurant = seed_restaurant(categories=10, items_per_category=10)
+        item_ids = list(MenuItem.objects.filter(restaurant=restaurant).values_list("id", flat=True))
+        payload = {
+            "table_number": 1,
+            "items": [{"menu_item": i, "quantity": 1} for i in item_ids[:12]],
+        }
+
+        report("legacy create (12 lines)", measure(lambda: legacy_create(restaurant, payload)))
+        report("batched create (12 lines)", measure(lambda: batched_create(restaurant, payload)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Admin order list on a large table: keyset pages and index usage.
+
+    python -m benchmarks.bench_order_list [--orders 1000000]
+
+Seeds the orders, runs ANALYZE, checks that the list and status-filter
+queries are served by the composite indexes (exits non-zero if not), and
+times the first page, a deep page and a status-filtered page.
+"""
+
+import argparse
+import random
+import sys
+from datetime import timedelta
+
+from benchmarks.harness import test_database, measure, report
+
+from django.db import connection
+from django.utils import timezone
+
+from restaurants.models import Order
+from adminpanel.pagination import paginate_orders, encode_cursor, after_cursor
+from benchmarks.seed import seed_restaurant, explicit_timestamps
+
+STATUSES = ["pending", "preparing", "completed", "completed", "completed", "cancelled"]
+
+
+def seed_orders(restaurant, count, chunk_size=50_000):
+    rng = random.Random(42)
+    start = timezone.now() - timedelta(days=90)
+    with explicit_timestamps(Order):
+        for offset in range(0, count, chunk_size):
+            Order.objects.bulk_create([
+                Order(
+                    restaurant=restaurant,
+                    table_number=rng.randint(1, 20),
+                    status=rng.choice(STATUSES),
+                    created_at=start + timedelta(seconds=n * 7),
+                )
+                for n in range(offset, min(offset + chunk_size, count))
+            ])
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with test_database():
+        restaurant = seed_restaurant(categories=1, items_per_category=1, tables=20)
+        seed_orders(restaurant, args.orders)
+        print(f"seeded {Order.objects.count()} orders")
+
+        orders = Order.objects.filter(restaurant=restaurant, table_number__in=list(range(1, 21)))
+        _, cursor = paginate_orders(orders, limit=50)
+        deep_cursor = encode_cursor(orders.order_by("-created_at", "-id")[args.orders // 2])
+
+        checks = [
+            ("order_restaurant_created_idx", orders.order_by("-created_at", "-id")[:51]),
+            ("order_restaurant_created_idx", after_cursor(orders, deep_cursor).order_by("-created_at", "-id")[:51]),
+            ("order_restaurant_status_idx", orders.filter(status="completed").order_by("-created_at")[:51]),
+        ]
+        failed = False
+        for index, queryset in checks:
+            plan = queryset.explain()
+            print(f"{index}: {'ok' if index in plan else 'NOT USED'}\n  {plan}")
+            failed |= index not in plan
+
+        report("first page", measure(lambda: paginate_orders(orders, limit=50)))
+        report("second page", measure(lambda: paginate_orders(orders, cursor, limit=50)))
+        report("middle page", measure(lambda: paginate_orders(orders, deep_cursor, limit=50)))
+        report("completed, first page", measure(lambda: paginate_orders(orders.filter(status="completed"), limit=50)))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Onboarding a banquet hall: 200 tables with inline QR rendering (old
+Table.save behaviour) vs the bulk endpoint plus the process pool.
+
+    python -m benchmarks.bench_tables [--tables 200]
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.harness import test_database
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from restaurants.models import Restaurant, Table
+from restaurants.jobs import store_table_qr
+from restaurants.qr import DEFAULT_STYLE, table_menu_url, qr_cache_key, render_qr_png
+from adminpanel.models import StaffProfile
+from adminpanel.views import TableBulkCreateView
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database(), override_settings(QR_CACHE_DIR=tempfile.mkdtemp()):
+        # Old behaviour: every table renders its PNG inside the request
+        restaurant = Restaurant.objects.create(name="Inline Hall", cuisine="Banquet", address="Worli")
+        start = time.perf_counter()
+        for number in range(1, args.tables + 1):
+            table = Table.objects.bulk_create([Table(restaurant=restaurant, number=number)])[0]
+            data = table_menu_url(restaurant.id, number)
+            store_table_qr(table.id, qr_cache_key(data, DEFAULT_STYLE), render_qr_png(data))
+        print(f"inline rendering, {args.tables} tables: request blocked {time.perf_counter() - start:.2f}s")
+
+        # New behaviour: one bulk request, rendering in the worker pool
+        restaurant = Restaurant.objects.create(name="Pooled Hall", cuisine="Banquet", address="Worli")
+        user = User.objects.create_user(username="bench")
+        StaffProfile.objects.create(user=user, restaurant=restaurant)
+        request = APIRequestFactory().post("/admin/tables/bulk/", {"start": 1, "end": args.tables}, format="json")
+        force_authenticate(request, user=user)
+
+        start = time.perf_counter()
+        response = TableBulkCreateView.as_view()(request)
+        responded = time.perf_counter() - start
+        while Table.objects.filter(restaurant=restaurant, qr_status=Table.QR_PENDING).exists():
+            time.sleep(0.05)
+        ready = time.perf_counter() - start
+
+        print(f"bulk endpoint + pool, {args.tables} tables: responded {responded:.2f}s "
+              f"(status {response.status_code}), all ready after {ready:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Shared setup for the backend benchmarks.
+
+Each benchmark is a plain script run from the backend directory, e.g.
+
+    python -m benchmarks.bench_menu
+
+It boots Django against a throwaway test database so the dev db.sqlite3
+is never touched, and reports latency percentiles and query counts.
+"""
+
+import os
+import time
+import statistics
+import tempfile
+from contextlib import contextmanager, ExitStack
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_app.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment, CaptureQueriesContext
+
+
+@contextmanager
+def test_database(shared=False):
+    """
+    Create a throwaway database for the duration of the benchmark.
+
+    shared=True is for benchmarks that spawn worker processes: with SQLite
+    the test database goes in a temporary file instead of memory, so the
+    workers can open it too.
+    """
+    with ExitStack() as stack:
+        if shared and connection.vendor == "sqlite":
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(fn, iterations=200, warmup=10):
+    """
+    Call fn repeatedly and return a stats dict with latency in milliseconds
+    and the number of queries issued by a single (post-warmup) call.
+    """
+    for _ in range(warmup):
+        fn()
+
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    queries = len(ctx.captured_queries)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "queries": queries,
+        "p50": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "per_sec": 1000 / statistics.mean(samples),
+    }
+
+
+def report(label, stats):
+    print(
+        f"{label:<28} queries={stats['queries']:<4} "
+        f"p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms p99={stats['p99']:.2f}ms "
+        f"({stats['per_sec']:.0f}/s)"
+    )
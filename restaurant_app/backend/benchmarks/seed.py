@@ -0,0 +1,53 @@
+"""Synthetic data helpers shared by the benchmarks."""
+
+from contextlib import contextmanager
+from decimal import Decimal
+
+from restaurants.models import Restaurant, MenuCategory, MenuItem, Table
+
+
+def seed_restaurant(categories=40, items_per_category=10, tables=20):
+    restaurant = Restaurant.objects.create(
+        name="Bench Bistro",
+        cuisine="Indian",
+        address="1 Benchmark Road",
+    )
+
+    MenuCategory.objects.bulk_create([
+        MenuCategory(restaurant=restaurant, name=f"Category {c}")
+        for c in range(categories)
+    ])
+    category_list = list(MenuCategory.objects.filter(restaurant=restaurant))
+
+    MenuItem.objects.bulk_create([
+        MenuItem(
+            restaurant=restaurant,
+            category=category,
+            name=f"{category.name} dish {i}",
+            description="A long description of a dish that guests will read on their phones. " * 2,
+            price=Decimal("249.00") + i,
+            is_veg=i % 2 == 0,
+            is_non_veg=i % 2 == 1,
+            cooking_time_minutes=5 + i,
+        )
+        for category in category_list
+        for i in range(items_per_category)
+    ])
+
+    # bulk_create skips Table.save(), so no QR codes are rendered here
+    Table.objects.bulk_create([
+        Table(restaurant=restaurant, number=n) for n in range(1, tables + 1)
+    ])
+
+    return restaurant
+
+
+@contextmanager
+def explicit_timestamps(model, field_name="created_at"):
+    """Let bulk_create keep the created_at values we set instead of now()."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
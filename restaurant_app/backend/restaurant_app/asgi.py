@@ -3,6 +3,11 @@ ASGI config for restaurant_app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve through this entry point (e.g. ``uvicorn restaurant_app.asgi:application``)
+in production: the live order status stream at
+``/api/restaurants/<id>/orders/<order_id>/events/`` is an async view that
+holds a connection open per guest, which only scales under ASGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,7 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurants.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'restaurants.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -79,26 +85,185 @@ WSGI_APPLICATION = 'restaurant_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE picks the profile: 'sqlite' (default) or 'postgres'
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME') or BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                # Take the write lock when a transaction begins, so concurrent
+                # writers wait out busy_timeout instead of failing to upgrade
+                # a read lock with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+elif DB_ENGINE == 'postgres':
+    # Needs psycopg[pool]. Each process keeps a pool of connections;
+    # DB_POOL=0 uses plain persistent connections instead, e.g. behind
+    # pgbouncer. Django's pool requires CONN_MAX_AGE = 0.
+    DB_POOL = os.environ.get('DB_POOL', '1') != '0'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'restaurant_os'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgres', not {DB_ENGINE!r}")
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+
+# CACHE_BACKEND picks the profile: 'locmem' (default), 'redis' or
+# 'memcached'. The menu, table numbers, kitchen layout and staff logins are
+# cached and dropped on every change (see restaurants/cache.py), but locmem
+# is per process, so a drop only reaches the worker that made the change.
+# With several server workers use redis or memcached, which every worker
+# shares; under locmem entries expire after a minute instead of an hour,
+# which bounds how stale the other workers get.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+    CACHE_TIMEOUT = 60
+elif CACHE_BACKEND in ('redis', 'memcached'):
+    # Needs redis (redis-py) or pymemcache respectively
+    CACHES = {
+        'default': {
+            'BACKEND': {
+                'redis': 'django.core.cache.backends.redis.RedisCache',
+                'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            }[CACHE_BACKEND],
+            'LOCATION': os.environ.get('CACHE_LOCATION') or {
+                'redis': 'redis://localhost:6379/0',
+                'memcached': 'localhost:11211',
+            }[CACHE_BACKEND],
+            'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'restaurant_os'),
+        }
+    }
+    CACHE_TIMEOUT = 60 * 60
+else:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be 'locmem', 'redis' or 'memcached', not {CACHE_BACKEND!r}")
+
+# Applied to every new SQLite connection (see restaurants/signals.py). WAL
+# lets readers carry on while an order is being written, and with WAL,
+# synchronous=NORMAL only fsyncs at checkpoints without risking corruption
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'adminpanel.authentication.StaffJWTAuthentication',
+    ),
+    # orjson in place of the stdlib json module (see restaurants/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'restaurants.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'restaurants.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# Response compression (see restaurants/middleware.py): smallest body worth
+# compressing, and the brotli quality, kept low since responses are
+# compressed on the fly
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Request metrics served at /metrics (see restaurants/metrics.py). Scrapes
+# need "Authorization: Bearer <METRICS_TOKEN>"; with no token set, /metrics
+# is only served while DEBUG is on.
+# SLOW_REQUEST_MS > 0 logs the SQL of every request slower than that.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': False,
+    # Carry the staff member's restaurant id as a claim (see adminpanel/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'adminpanel.authentication.StaffTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'adminpanel.authentication.StaffTokenRefreshSerializer',
 }
 
+# Pub/sub backend for live order status events (see restaurants/events.py)
+ORDER_EVENTS_BROKER = 'restaurants.events.InProcessBroker'
+
+# Worker processes that render table QR codes (see restaurants/jobs.py).
+# 0 renders inline in the request, which the test suite relies on.
+QR_RENDER_WORKERS = 2
+
+# Guest-facing frontend that table QR codes point at
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://192.168.29.121:5173').rstrip('/')
+
+# Content-addressed cache of rendered QR codes (see restaurants/qr.py)
+QR_CACHE_DIR = BASE_DIR / 'media' / 'qr_cache'
+QR_CACHE_MAX_ENTRIES = 512
+# Default-style codes kept on disk (a few KB each)
+QR_CACHE_MAX_FILES = 10_000
+
+# TTF used for the "Table N" labels on printable QR sheets; unset uses
+# Pillow's bundled font
+QR_LABEL_FONT = os.environ.get('QR_LABEL_FONT') or None
+
+
+# Learned preparation times (see restaurants/prep_times.py): weight of
+# each new completion, and samples needed before they replace the
+# owner-entered cooking time
+PREP_TIME_EWMA_ALPHA = 0.2
+PREP_TIME_MIN_SAMPLES = 3
+
+# Moving finished orders to the archive (see restaurants/archive.py): orders
+# per transaction, and the pause between batches that lets requests waiting
+# to write get in. False archives inline in the request, which the test
+# suite relies on.
+ORDER_ARCHIVE_BATCH_SIZE = 200
+ORDER_ARCHIVE_PAUSE = 0.05
+ORDER_ARCHIVE_IN_BACKGROUND = True
+
+# The order change feed (see restaurants/changes.py): the longest an order
+# write may take to commit, and how long changes are kept for pollers
+ORDER_CHANGE_SETTLE_SECONDS = 10
+ORDER_CHANGE_RETENTION_DAYS = 7
+
+# How long a placed order's Idempotency-Key keeps answering retries with
+# the same order (see restaurants/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -144,4 +309,11 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# The guest checkout sends an Idempotency-Key with each order
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
+# Response headers the frontend reads cross-origin: the admin change-feed
+# cursor, and whether a placed order was a replay
+CORS_EXPOSE_HEADERS = ['X-Orders-Cursor', 'Idempotent-Replayed']
\ No newline at end of file
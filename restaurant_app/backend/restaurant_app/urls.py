@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from restaurants.metrics import metrics_view
 from .views import home
 
 urlpatterns = [
@@ -25,6 +26,7 @@ urlpatterns = [
     path('dj-admin/', admin.site.urls),
     path('api/', include('restaurants.urls')),
     path('admin/', include('adminpanel.urls')),
+    path('metrics', metrics_view),
 ]
 
 # Media file serving (dev mode)
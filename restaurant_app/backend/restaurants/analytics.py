@@ -0,0 +1,269 @@
+"""
+Sales rollups for reporting.
+
+ItemSalesHour (restaurant x item x hour) and DailySales (restaurant x day)
+are adjusted in place whenever an order moves into or out of `completed`
+or `cancelled`, so dashboards read a few hundred pre-summed rows instead
+of every order line. backfill_rollups() rebuilds them from history.
+
+Sales are bucketed by when the order was placed, in the current time zone.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, DailySales, ItemSalesHour, Order, OrderItem
+
+
+def line_revenue():
+    return ExpressionWrapper(F('quantity') * F('item_price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def sales_hour(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def sales_date(moment):
+    return timezone.localtime(moment).date()
+
+
+def day_bounds(first, last):
+    """Aware datetimes covering the local dates first..last inclusive."""
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+    return start, end
+
+
+# ----- incremental updates -----
+
+def order_status_changed(order, previous_status):
+    """Adjust the rollups for an order that moved from `previous_status`."""
+    was_sale, is_sale = previous_status == "completed", order.status == "completed"
+    if was_sale != is_sale:
+        apply_sale(order, 1 if is_sale else -1)
+
+    was_cancelled, is_cancelled = previous_status == "cancelled", order.status == "cancelled"
+    if was_cancelled != is_cancelled:
+        increment(
+            DailySales,
+            {"restaurant_id": order.restaurant_id, "date": sales_date(order.created_at)},
+            cancelled_orders=1 if is_cancelled else -1,
+        )
+
+
+def apply_sale(order, sign):
+    lines = (
+        OrderItem.objects
+        .filter(order_id=order.id)
+        .values('menu_item_id')
+        .annotate(sold=Sum('quantity'), takings=Sum(line_revenue()))
+        .order_by()
+    )
+
+    hour = sales_hour(order.created_at)
+    items_sold = 0
+    for line in lines:
+        items_sold += line["sold"]
+        increment(
+            ItemSalesHour,
+            {"menu_item_id": line["menu_item_id"], "hour": hour},
+            defaults={"restaurant_id": order.restaurant_id},
+            orders=sign,
+            quantity=sign * line["sold"],
+            revenue=sign * line["takings"],
+        )
+
+    increment(
+        DailySales,
+        {"restaurant_id": order.restaurant_id, "date": sales_date(order.created_at)},
+        orders=sign,
+        items_sold=sign * items_sold,
+        revenue=sign * order.total_amount,
+    )
+
+
+def increment(model, keys, defaults=None, **deltas):
+    """Add `deltas` to the row identified by `keys`, creating it if needed."""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**keys).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **(defaults or {}), **deltas)
+    except IntegrityError:
+        # Someone else created it in the meantime
+        model.objects.filter(**keys).update(**changes)
+
+
+# ----- backfill -----
+
+def backfill_rollups(restaurant_ids=None, chunk_days=7, progress=None):
+    """
+    Rebuild the rollups from every completed and cancelled order, live or
+    archived.
+
+    History is rebuilt `chunk_days` local days at a time. Each span's rows
+    are deleted, summed again by the database and written back in one
+    transaction, so dashboards show either the old or the new numbers for
+    a day and never an empty one, and memory use depends on the span and
+    not on the size of the history.
+
+    It is safe to run during service. An order completed or cancelled
+    before its span's transaction is summed by it (which replaces what the
+    incremental path added for it); one changed afterwards is added onto
+    the rebuilt rows by the incremental path as usual, and never both.
+    Returns the number of orders processed.
+    """
+    sources = [
+        (Order.objects.filter(status__in=("completed", "cancelled")), OrderItem),
+        (ArchivedOrder.objects.all(), ArchivedOrderItem),
+    ]
+    item_rollups = ItemSalesHour.objects.all()
+    daily_rollups = DailySales.objects.all()
+    if restaurant_ids is not None:
+        sources = [(orders.filter(restaurant_id__in=restaurant_ids), lines) for orders, lines in sources]
+        item_rollups = item_rollups.filter(restaurant_id__in=restaurant_ids)
+        daily_rollups = daily_rollups.filter(restaurant_id__in=restaurant_ids)
+
+    earliest = [orders.aggregate(first=Min('created_at'))['first'] for orders, _ in sources]
+    earliest = [moment for moment in earliest if moment is not None]
+    last = sales_date(timezone.now())
+    first = sales_date(min(earliest)) if earliest else last
+
+    # Nothing is sold outside first..last, so rows there are simply stale
+    with transaction.atomic():
+        start, end = day_bounds(first, last)
+        item_rollups.exclude(hour__gte=start, hour__lt=end).delete()
+        daily_rollups.exclude(date__gte=first, date__lte=last).delete()
+
+    processed = 0
+    span_first = first
+    while span_first <= last:
+        span_last = min(span_first + timedelta(days=chunk_days - 1), last)
+        start, end = day_bounds(span_first, span_last)
+        while True:
+            try:
+                with transaction.atomic():
+                    item_rollups.filter(hour__gte=start, hour__lt=end).delete()
+                    daily_rollups.filter(date__gte=span_first, date__lte=span_last).delete()
+                    counted = sum(
+                        merge_chunk(orders.filter(created_at__gte=start, created_at__lt=end), line_model)
+                        for orders, line_model in sources
+                    )
+                break
+            except IntegrityError:
+                # An order completed meanwhile created one of the span's
+                # rows first; sum the span again, including that order
+                continue
+
+        span_first = span_last + timedelta(days=1)
+        if counted:
+            processed += counted
+            if progress is not None:
+                progress(processed)
+
+    return processed
+
+
+def merge_chunk(orders, line_model):
+    """Add the given orders onto the rollups. Returns how many there were."""
+    item_rows = (
+        line_model.objects
+        # Archived lines of since-deleted menu items have no rollup row
+        .filter(order__in=orders.filter(status="completed"), menu_item__isnull=False)
+        .annotate(hour=TruncHour('order__created_at'))
+        .values('order__restaurant_id', 'menu_item_id', 'hour')
+        .annotate(order_count=Count('order_id', distinct=True), sold=Sum('quantity'), takings=Sum(line_revenue()))
+        .order_by()
+    )
+
+    items = {}
+    items_sold = {}
+    for row in item_rows:
+        restaurant_id = row["order__restaurant_id"]
+        items[(row["menu_item_id"], row["hour"])] = {
+            "restaurant_id": restaurant_id,
+            "orders": row["order_count"],
+            "quantity": row["sold"],
+            "revenue": row["takings"],
+        }
+        day = (restaurant_id, sales_date(row["hour"]))
+        items_sold[day] = items_sold.get(day, 0) + row["sold"]
+
+    daily_rows = (
+        orders
+        .annotate(date=TruncDate('created_at'))
+        .values('restaurant_id', 'date')
+        .annotate(
+            completed=Count('id', filter=Q(status="completed")),
+            takings=Coalesce(Sum('total_amount', filter=Q(status="completed")), Decimal(0)),
+            cancelled=Count('id', filter=Q(status="cancelled")),
+        )
+        .order_by()
+    )
+    days = {
+        (row["restaurant_id"], row["date"]): {
+            "orders": row["completed"],
+            "items_sold": items_sold.get((row["restaurant_id"], row["date"]), 0),
+            "revenue": row["takings"],
+            "cancelled_orders": row["cancelled"],
+        }
+        for row in daily_rows
+    }
+
+    counted = sum(values["orders"] + values["cancelled_orders"] for values in days.values())
+    if items:
+        merge(
+            ItemSalesHour,
+            ItemSalesHour.objects.filter(
+                menu_item_id__in={menu_item_id for menu_item_id, _ in items},
+                hour__gte=min(hour for _, hour in items),
+                hour__lte=max(hour for _, hour in items),
+            ),
+            lambda row: (row.menu_item_id, row.hour),
+            lambda key: {"menu_item_id": key[0], "hour": key[1]},
+            items,
+            ["orders", "quantity", "revenue"],
+        )
+    if days:
+        merge(
+            DailySales,
+            DailySales.objects.filter(
+                restaurant_id__in={restaurant_id for restaurant_id, _ in days},
+                date__gte=min(date for _, date in days),
+                date__lte=max(date for _, date in days),
+            ),
+            lambda row: (row.restaurant_id, row.date),
+            lambda key: {"restaurant_id": key[0], "date": key[1]},
+            days,
+            ["orders", "items_sold", "revenue", "cancelled_orders"],
+        )
+    return counted
+
+
+def merge(model, candidates, key_of, fields_of_key, sums, fields):
+    """Add `sums` (key -> values) onto existing rollup rows, creating the rest."""
+    existing = {}
+    for row in candidates:
+        key = key_of(row)
+        if key in sums:
+            existing[key] = row
+
+    updated = []
+    created = []
+    for key, values in sums.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(model(**fields_of_key(key), **values))
+            continue
+        for field in fields:
+            setattr(row, field, getattr(row, field) + values[field])
+        updated.append(row)
+
+    model.objects.bulk_create(created, batch_size=500)
+    model.objects.bulk_update(updated, fields, batch_size=500)
@@ -0,0 +1,92 @@
+"""
+Archive of finished orders.
+
+Completed and cancelled orders are copied into ArchivedOrder and
+ArchivedOrderItem and removed from Order in small batches, each in its
+own short transaction, so the hot tables stay small without holding the
+database's write lock for more than a moment at a time.
+
+The sales rollups are left alone: archiving moves an order, it does not
+undo the sale. Removed orders still reach pollers as deletions through
+the usual post_delete signal. Each run ends by pruning old change feed
+entries (see restaurants/changes.py).
+"""
+
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .changes import prune_changes
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVE_STATUSES = ("completed", "cancelled")
+
+
+def archivable_orders(restaurant_id=None):
+    orders = Order.objects.filter(status__in=ARCHIVE_STATUSES)
+    if restaurant_id is not None:
+        orders = orders.filter(restaurant_id=restaurant_id)
+    return orders
+
+
+def archive_orders(restaurant_id=None, batch_size=None, pause=None):
+    """
+    Archive every finished order of a restaurant (or of all restaurants),
+    oldest first. Returns the number of orders archived.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    pause = settings.ORDER_ARCHIVE_PAUSE if pause is None else pause
+
+    archived = 0
+    while True:
+        moved = archive_batch(restaurant_id, batch_size)
+        archived += moved
+        if moved < batch_size:
+            break
+        time.sleep(pause)
+
+    prune_changes(batch_size)
+    return archived
+
+
+def archive_batch(restaurant_id, batch_size):
+    with transaction.atomic():
+        orders = list(archivable_orders(restaurant_id).select_for_update().order_by('id')[:batch_size])
+        if not orders:
+            return 0
+        order_ids = [order.id for order in orders]
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=order.id,
+                restaurant_id=order.restaurant_id,
+                table_number=order.table_number,
+                status=order.status,
+                total_amount=order.total_amount,
+                created_at=order.created_at,
+                preparing_at=order.preparing_at,
+                completed_at=order.completed_at,
+                cancelled_at=order.cancelled_at,
+            )
+            for order in orders
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                id=line_id,
+                order_id=order_id,
+                menu_item_id=menu_item_id,
+                menu_item_name=name,
+                quantity=quantity,
+                item_price=price,
+            )
+            for line_id, order_id, menu_item_id, name, quantity, price in (
+                OrderItem.objects
+                .filter(order_id__in=order_ids)
+                .values_list('id', 'order_id', 'menu_item_id', 'menu_item__name', 'quantity', 'item_price')
+            )
+        ])
+
+        Order.objects.filter(id__in=order_ids).delete()
+
+    return len(orders)
@@ -0,0 +1,144 @@
+"""
+Cached public documents: the menu, the guest bootstrap and the table numbers.
+
+Entries are dropped by signals (see restaurants/signals.py) whenever what
+they were built from changes, and otherwise live for CACHE_TIMEOUT. Both
+rely on the cache being shared: with the default per-process locmem
+backend a change only clears the worker that made it, and the others keep
+serving the old entry, ETag and all, until it expires, which is why
+CACHE_TIMEOUT is a minute under locmem. Multi-worker deployments should
+set CACHE_BACKEND to redis or memcached (see restaurant_app/settings.py).
+"""
+
+import time
+import hashlib
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import Restaurant, MenuCategory, MenuItem, Table
+from .middleware import precompress
+from .renderers import ORJSONRenderer
+from .serializers import MenuItemSerializer
+
+
+def menu_cache_key(restaurant_id):
+    return f"restaurant:{restaurant_id}:menu"
+
+
+def build_menu_document(restaurant_id):
+    """
+    Build the public menu for a restaurant as rendered JSON bytes.
+
+    Categories and their items are loaded with a single prefetch, and the
+    prefetch fills each item's `category` cache so the nested
+    MenuCategorySerializer does not trigger extra queries.
+    """
+    categories = (
+        MenuCategory.objects
+        .filter(restaurant_id=restaurant_id)
+        .order_by('id')
+        .prefetch_related(
+            Prefetch('menuitem_set', queryset=MenuItem.objects.order_by('id'))
+        )
+    )
+
+    response_data = []
+    for category in categories:
+        response_data.append({
+            "id": category.id,
+            "name": category.name,
+            "items": MenuItemSerializer(category.menuitem_set.all(), many=True).data
+        })
+
+    return ORJSONRenderer().render(response_data)
+
+
+def get_menu_document(restaurant_id):
+    """
+    Return the cached menu entry, building it on a miss.
+
+    The entry is a dict with the rendered `document`, its compressed
+    `encodings` (see restaurants/middleware.py), a strong `etag` (content
+    hash) and `last_modified` (build time as a unix timestamp), so
+    conditional requests can be answered without rendering anything.
+
+    Returns None if the restaurant does not exist. A cache hit needs no
+    queries at all, since deleting a restaurant drops its entry.
+    """
+    key = menu_cache_key(restaurant_id)
+    entry = cache.get(key)
+    if entry is None:
+        if not Restaurant.objects.filter(id=restaurant_id).exists():
+            return None
+        entry = document_entry(build_menu_document(restaurant_id))
+        cache.set(key, entry, settings.CACHE_TIMEOUT)
+    return entry
+
+
+def document_entry(document):
+    return {
+        "document": document,
+        "encodings": precompress(document),
+        "etag": '"%s"' % hashlib.sha256(document).hexdigest()[:32],
+        "last_modified": int(time.time()),
+    }
+
+
+def bootstrap_cache_key(restaurant_id):
+    return f"restaurant:{restaurant_id}:bootstrap"
+
+
+RESTAURANT_INFO_FIELDS = ('id', 'name', 'description', 'cuisine', 'address', 'map_url')
+THEME_FIELDS = ('primary_color', 'secondary_color', 'background_color', 'font_choice')
+
+
+def get_bootstrap_document(restaurant_id):
+    """
+    Return the cached guest bootstrap entry (same shape as the menu entry),
+    building it on a miss: the restaurant's details, its theme and its
+    menu, as one document.
+
+    The menu is spliced in from the menu entry's rendered bytes rather than
+    serialized again. Both entries are dropped together by invalidate_menu,
+    which also runs whenever the Restaurant row changes.
+    """
+    key = bootstrap_cache_key(restaurant_id)
+    entry = cache.get(key)
+    if entry is None:
+        restaurant = Restaurant.objects.filter(id=restaurant_id).values(*RESTAURANT_INFO_FIELDS, *THEME_FIELDS).first()
+        menu = get_menu_document(restaurant_id)
+        if restaurant is None or menu is None:
+            return None
+        document = b'{"restaurant":%s,"theme":%s,"menu":%s}' % (
+            orjson.dumps({field: restaurant[field] for field in RESTAURANT_INFO_FIELDS}),
+            orjson.dumps({field: restaurant[field] for field in THEME_FIELDS}),
+            menu["document"],
+        )
+        entry = document_entry(document)
+        cache.set(key, entry, settings.CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_menu(restaurant_id):
+    cache.delete_many([menu_cache_key(restaurant_id), bootstrap_cache_key(restaurant_id)])
+
+
+def table_numbers_cache_key(restaurant_id):
+    return f"restaurant:{restaurant_id}:tables"
+
+
+def get_table_numbers(restaurant_id):
+    """Registered table numbers for a restaurant, cached until a Table changes."""
+    key = table_numbers_cache_key(restaurant_id)
+    numbers = cache.get(key)
+    if numbers is None:
+        numbers = list(Table.objects.filter(restaurant_id=restaurant_id).values_list('number', flat=True))
+        cache.set(key, numbers, settings.CACHE_TIMEOUT)
+    return numbers
+
+
+def invalidate_table_numbers(restaurant_id):
+    cache.delete(table_numbers_cache_key(restaurant_id))
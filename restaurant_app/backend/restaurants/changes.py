@@ -0,0 +1,97 @@
+"""
+The order change feed: OrderChange rows, read in id order from a cursor.
+
+Ids are handed out when a change is inserted but only become visible
+when its transaction commits, and commits need not come in id order: on
+PostgreSQL one transaction can take id 10 and commit after another has
+committed id 11. A reader that moved its cursor straight to 11 would
+never see 10.
+
+So the cursor only moves past changes older than
+ORDER_CHANGE_SETTLE_SECONDS, by which time any transaction holding a
+lower id has committed. Newer changes are returned straight away all the
+same, and again on every read until they settle; readers apply them by
+order id, so seeing one twice is harmless.
+
+Changes are kept for ORDER_CHANGE_RETENTION_DAYS and pruned after each
+archive run. A cursor from before the oldest change kept has expired,
+and its reader should start over from a full read.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import BigIntegerField, Max, Min, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import OrderChange
+
+
+def settled_before():
+    return timezone.now() - timedelta(seconds=settings.ORDER_CHANGE_SETTLE_SECONDS)
+
+
+def snapshot_cursor(restaurant_id):
+    """
+    Cursor to follow a full read taken now with: the newest change before
+    any that could still be sharing the feed with an uncommitted one.
+    """
+    first_unsettled = (
+        OrderChange.objects
+        .filter(restaurant_id=restaurant_id, created_at__gte=settled_before())
+        .order_by('id')
+        .values('id')[:1]
+    )
+    return (
+        OrderChange.objects
+        .filter(
+            restaurant_id=restaurant_id,
+            id__lt=Coalesce(Subquery(first_unsettled), Value(2 ** 63 - 1), output_field=BigIntegerField()),
+        )
+        .aggregate(cursor=Max('id'))['cursor'] or 0
+    )
+
+
+def read_changes(restaurant_id, since):
+    """
+    `(changes, cursor)`: every `(id, order_id, deleted)` change after the
+    `since` cursor, and the cursor to read from next.
+    """
+    cutoff = settled_before()
+    rows = (
+        OrderChange.objects
+        .filter(restaurant_id=restaurant_id, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'order_id', 'deleted', 'created_at')
+    )
+
+    changes = []
+    cursor = since
+    settled = True
+    for change_id, order_id, deleted, created_at in rows:
+        # Stop at the first unsettled change; what follows may still be
+        # missing a change that is yet to commit
+        settled = settled and created_at < cutoff
+        if settled:
+            cursor = change_id
+        changes.append((change_id, order_id, deleted))
+    return changes, cursor
+
+
+def cursor_expired(since):
+    """Whether changes after `since` may already have been pruned."""
+    oldest = OrderChange.objects.aggregate(oldest=Min('id'))['oldest']
+    return oldest is not None and since < oldest - 1
+
+
+def prune_changes(batch_size):
+    """Delete changes past ORDER_CHANGE_RETENTION_DAYS, in batches. Returns how many."""
+    cutoff = timezone.now() - timedelta(days=settings.ORDER_CHANGE_RETENTION_DAYS)
+    pruned = 0
+    while True:
+        ids = list(OrderChange.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return pruned
+        OrderChange.objects.filter(id__in=ids).delete()
+        pruned += len(ids)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+FINAL_STATUSES = ("completed", "cancelled")
+
+
+class Subscription:
+    def __init__(self, order_id, loop):
+        self.order_id = order_id
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Pub/sub for order events within a single server process.
+
+    Subscribers are SSE streams running on the ASGI event loop, while
+    publishers are sync views running in worker threads, so events are
+    handed over with call_soon_threadsafe. A multi-process deployment can
+    point ORDER_EVENTS_BROKER at a shared implementation with the same
+    subscribe / unsubscribe / publish interface.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, order_id):
+        subscription = Subscription(order_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[order_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.order_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.order_id]
+
+    def publish(self, order_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(order_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.ORDER_EVENTS_BROKER)()
+
+
+def order_event(order):
+    return {
+        "id": order.id,
+        "status": order.status,
+        "estimated_wait_time": order.estimated_wait_time,
+        "version": order.version,
+    }
+
+
+def publish_order_event(order):
+    get_broker().publish(order.id, order_event(order))
+
+
+def format_sse(event):
+    return f"event: order\ndata: {json.dumps(event)}\n\n"
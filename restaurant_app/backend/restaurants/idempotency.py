@@ -0,0 +1,118 @@
+"""
+Idempotency-Key handling for order submissions.
+
+Guests' phones retry on flaky restaurant Wi-Fi, and guests double-tap.
+The checkout sends the same Idempotency-Key with every attempt at one
+cart. The first request claims the key by inserting an OrderRequest (the
+unique constraint settles races between concurrent duplicates). The
+order's id is written to the claim in the transaction that creates the
+order, and the 201 response right after. Later attempts get that
+response back, marked Idempotent-Replayed, for IDEMPOTENCY_KEY_TTL
+seconds; one arriving while the first is still running gets a 409 and
+tries again.
+
+Only orders that were placed are remembered: a rejected submission
+(unknown table, unavailable item) releases its key, so the guest can fix
+the cart and resend.
+"""
+
+import hashlib
+from datetime import timedelta
+
+import orjson
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Order, OrderRequest
+from .serializers import OrderSerializer, prefetch_order_lines
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# A claim still in flight after this long belongs to a worker that died
+# mid-request, so the next attempt takes it over. Were that worker only
+# slow, its order fails to commit: the claim it would update is gone.
+STALE_CLAIM = timedelta(seconds=60)
+
+
+def fingerprint(data):
+    return hashlib.sha256(orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def key_ttl():
+    return timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def claim(restaurant, key, data):
+    """
+    Claim `key` for a submission of `data`. Returns (OrderRequest, None)
+    to go ahead and place the order, or (None, response) to answer with
+    instead: the stored response of an earlier attempt, or an error.
+    """
+    if not 0 < len(key) <= MAX_KEY_LENGTH:
+        return None, Response(
+            {"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    digest = fingerprint(data)
+    # Twice at most: once more after clearing out an expired or abandoned claim
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return OrderRequest.objects.create(restaurant=restaurant, key=key, fingerprint=digest), None
+        except IntegrityError:
+            pass
+
+        existing = OrderRequest.objects.filter(restaurant=restaurant, key=key).first()
+        if existing is None:
+            continue  # released in the meantime
+
+        age = timezone.now() - existing.created_at
+        if existing.order_id is None:
+            if age < STALE_CLAIM:
+                break
+        elif age < key_ttl():
+            if existing.fingerprint != digest:
+                return None, Response(
+                    {"error": f"This {HEADER} was already used for a different order"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return None, replay(existing)
+
+        # Expired, or abandoned before its order was placed; unless someone
+        # else has already cleared it out
+        OrderRequest.objects.filter(pk=existing.pk, order_id=existing.order_id).delete()
+
+    return None, Response(
+        {"error": "This order is still being placed"},
+        status=status.HTTP_409_CONFLICT,
+        headers={"Retry-After": "1"}
+    )
+
+
+def replay(order_request):
+    if order_request.response is None:
+        # The order was committed, but its worker stopped before storing
+        # the response
+        order = Order.objects.filter(id=order_request.order_id).first()
+        if order is not None:
+            prefetch_order_lines([order])
+        complete(order_request, OrderSerializer(order).data if order else {"id": order_request.order_id})
+    return Response(order_request.response, status=status.HTTP_201_CREATED, headers={"Idempotent-Replayed": "true"})
+
+
+def complete(order_request, data):
+    """Store the response of the placed order."""
+    order_request.response = data
+    order_request.save(update_fields=["response"])
+    # Keys are cleared out as new ones are used, rather than by a separate job
+    OrderRequest.objects.filter(created_at__lt=timezone.now() - key_ttl()).delete()
+
+
+def release(order_request):
+    """Give up a claim whose order was not placed, so the key can be used again."""
+    OrderRequest.objects.filter(pk=order_request.pk, order_id__isnull=True).delete()
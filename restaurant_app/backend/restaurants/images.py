@@ -0,0 +1,96 @@
+"""
+Responsive variants of menu item photos.
+
+Owners upload whatever their phone produces, so each upload is resized
+into a few fixed widths and re-encoded as WebP and JPEG. Like qr.py this
+module avoids Django model imports, so the resizing can run in the
+process-pool workers (see restaurants/jobs.py).
+
+Variant files are named after a hash of their own bytes, which makes
+them safe to serve with an immutable, year-long Cache-Control.
+"""
+
+import hashlib
+import re
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = {
+    "thumb": 160,
+    "medium": 480,
+    "large": 1024,
+}
+
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+VARIANT_DIR = "menu_items/variants"
+VARIANT_NAME = re.compile(r"^[0-9a-f]{32}\.(webp|jpg)$")
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def variant_filename(content, fmt):
+    extension = "jpg" if fmt == "jpeg" else fmt
+    return f"{hashlib.sha256(content).hexdigest()[:32]}.{extension}"
+
+
+def variant_url(filename):
+    return f"/api/images/{filename}"
+
+
+def variant_filenames(variants):
+    """Every file named in an `image_variants` mapping."""
+    return {variant[fmt] for variant in variants.values() for fmt in VARIANT_FORMATS if fmt in variant}
+
+
+def render_image_variants(content):
+    """
+    Resize the image in `content` (the uploaded file's bytes) to every
+    VARIANT_WIDTHS entry, never upscaling, and encode each one in every
+    VARIANT_FORMATS format.
+
+    Returns `(variants, files)`: `variants` maps size name to
+    `{"width", "height", "webp", "jpeg"}` with filenames as values, and
+    `files` maps each filename to its encoded bytes.
+    """
+    largest = max(VARIANT_WIDTHS.values())
+
+    with Image.open(BytesIO(content)) as source:
+        # Let the JPEG decoder downscale while decoding; a 12 MP photo
+        # then never has to be held in memory at full size
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    variants = {}
+    files = {}
+    for size, width in VARIANT_WIDTHS.items():
+        resized = image
+        if image.width > width:
+            resized = image.resize(
+                (width, round(image.height * width / image.width)),
+                Image.Resampling.LANCZOS,
+            )
+
+        variant = {"width": resized.width, "height": resized.height}
+        for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            content = buffer.getvalue()
+
+            filename = variant_filename(content, fmt)
+            files[filename] = content
+            variant[fmt] = filename
+        variants[size] = variant
+
+    return variants, files
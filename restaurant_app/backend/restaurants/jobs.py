@@ -0,0 +1,195 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Q
+
+from .archive import archive_orders
+from .cache import invalidate_menu
+from .images import VARIANT_DIR, VARIANT_FORMATS, VARIANT_WIDTHS, render_image_variants, variant_filenames
+from .models import Table, MenuItem
+from .qr import DEFAULT_STYLE, table_menu_url, qr_cache_key, render_qr_png, get_qr_cache
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_archive_executor = None
+
+
+def get_executor():
+    """
+    Process pool shared by all requests in this server process, used for
+    QR codes and menu images alike. Workers are spawned rather than
+    forked, since forking a threaded server process is unsafe.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.QR_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def enqueue_table_qr(table_ids):
+    """
+    Warm the QR cache for the given tables in the background. Each table
+    moves from `pending` to `ready` (or `failed`) once its code is cached;
+    codes that are already cached are marked ready straight away.
+
+    With QR_RENDER_WORKERS = 0 rendering happens inline instead, which is
+    what the tests use.
+    """
+    tables = Table.objects.filter(id__in=table_ids).values_list('id', 'restaurant_id', 'number')
+    cache = get_qr_cache()
+
+    for table_id, restaurant_id, number in tables:
+        data = table_menu_url(restaurant_id, number)
+        key = qr_cache_key(data, DEFAULT_STYLE)
+
+        if cache.get(key) is not None:
+            mark_table_qr_ready(table_id)
+        elif settings.QR_RENDER_WORKERS == 0:
+            store_table_qr(table_id, key, render_qr_png(data))
+        else:
+            future = get_executor().submit(render_qr_png, data)
+            future.add_done_callback(partial(qr_rendered, table_id, key))
+
+
+def qr_rendered(table_id, key, future):
+    # Runs on the executor's callback thread, which has its own DB connection
+    try:
+        store_table_qr(table_id, key, future.result())
+    except Exception:
+        logger.exception("QR rendering failed for table %s", table_id)
+        Table.objects.filter(id=table_id).update(qr_status=Table.QR_FAILED)
+    finally:
+        connections.close_all()
+
+
+def store_table_qr(table_id, key, png):
+    get_qr_cache().put(key, png)
+    mark_table_qr_ready(table_id)
+
+
+def mark_table_qr_ready(table_id):
+    Table.objects.filter(id=table_id).update(qr_status=Table.QR_READY)
+
+
+def enqueue_menu_image_variants(item_id):
+    """
+    Resize a menu item's uploaded photo into its responsive variants in
+    the background, or inline with QR_RENDER_WORKERS = 0. The variants are
+    attached to the item once every file has been stored.
+    """
+    item = MenuItem.objects.filter(id=item_id).only('id', 'restaurant_id', 'image').first()
+    if item is None or not item.image:
+        return
+
+    # Read through the storage API rather than from a local path, so any
+    # storage backend will do
+    with item.image.open('rb') as image:
+        content = image.read()
+
+    target = (item.id, item.restaurant_id, item.image.name)
+    if settings.QR_RENDER_WORKERS == 0:
+        store_image_variants(*target, *render_image_variants(content))
+    else:
+        future = get_executor().submit(render_image_variants, content)
+        future.add_done_callback(partial(image_variants_rendered, target))
+
+
+def image_variants_rendered(target, future):
+    item_id = target[0]
+    try:
+        store_image_variants(*target, *future.result())
+    except Exception:
+        # The item keeps serving its original image
+        logger.exception("Image variants failed for menu item %s", item_id)
+    finally:
+        connections.close_all()
+
+
+def store_image_variants(item_id, restaurant_id, image_name, variants, files):
+    save_variant_files(files)
+
+    # Only attach them if the photo was not replaced in the meantime
+    if MenuItem.objects.filter(id=item_id, image=image_name).update(image_variants=variants):
+        # Put back any file deleted as unused while they were unattached
+        save_variant_files(files)
+        # update() skips the post_save signal that normally does this
+        invalidate_menu(restaurant_id)
+    else:
+        delete_unused_variants(variants)
+
+
+def save_variant_files(files):
+    for filename, content in files.items():
+        name = f"{VARIANT_DIR}/{filename}"
+        # Names are content hashes, so an existing file is already right
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+
+
+def delete_unused_variants(variants):
+    """
+    Delete the files of a replaced or deleted photo's `variants`, except
+    those another menu item still uses (the same photo uploaded twice
+    yields the same files).
+    """
+    filenames = variant_filenames(variants)
+    if not filenames:
+        return
+
+    in_use = Q()
+    for size in VARIANT_WIDTHS:
+        for fmt in VARIANT_FORMATS:
+            in_use |= Q(**{f"image_variants__{size}__{fmt}__in": filenames})
+    for other_variants in MenuItem.objects.filter(in_use).values_list('image_variants', flat=True):
+        filenames -= variant_filenames(other_variants)
+
+    for filename in filenames:
+        default_storage.delete(f"{VARIANT_DIR}/{filename}")
+
+
+def get_archive_executor():
+    """
+    A single background thread for archiving: the work is all database
+    writes, so running archives one after another is as fast as it gets
+    and keeps them from contending with each other for the write lock.
+    """
+    global _archive_executor
+    with _executor_lock:
+        if _archive_executor is None:
+            _archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="order-archive")
+        return _archive_executor
+
+
+def enqueue_order_archive(restaurant_id):
+    """
+    Move a restaurant's finished orders to the archive in the background,
+    or inline with ORDER_ARCHIVE_IN_BACKGROUND = False.
+    """
+    if not settings.ORDER_ARCHIVE_IN_BACKGROUND:
+        archive_orders(restaurant_id)
+    else:
+        get_archive_executor().submit(run_order_archive, restaurant_id)
+
+
+def run_order_archive(restaurant_id):
+    try:
+        archived = archive_orders(restaurant_id)
+        logger.info("Archived %s orders of restaurant %s", archived, restaurant_id)
+    except Exception:
+        # Whatever was archived stays archived; the rest waits for the next run
+        logger.exception("Archiving orders failed for restaurant %s", restaurant_id)
+    finally:
+        connections.close_all()
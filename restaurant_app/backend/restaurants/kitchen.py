@@ -0,0 +1,236 @@
+"""
+Capacity-aware wait estimates.
+
+Each menu category is cooked on its own set of parallel stations
+(MenuCategory.stations). An order's lines are queued on those stations
+first come, first served, one dish per unit ordered, and the order is
+ready when its last dish is. Uncategorised items have no stations to
+queue on and are assumed to start straight away. Each dish takes the
+prep time estimated when the order was placed (OrderItem.prep_minutes,
+see restaurants/prep_times.py).
+
+The scheduler keeps, per category, the time each station frees up and
+the queue of slots given to open orders on it. Rather than re-simulating the
+whole queue it follows the order change feed (see restaurants/changes.py),
+so each new, finished or cancelled order only touches its own stations'
+queues, however many orders are open. It rebuilds from the open orders whenever the
+cached station layout is reloaded: after a category changes, and at
+least every CACHE_TIMEOUT, which also corrects any drift.
+"""
+
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Coalesce
+
+from .changes import read_changes, snapshot_cursor
+from .models import MenuCategory, Order, OrderItem
+
+OPEN_STATUSES = ("pending", "preparing")
+
+
+def kitchen_stations_cache_key(restaurant_id):
+    return f"restaurant:{restaurant_id}:stations"
+
+
+def get_kitchen_stations(restaurant_id):
+    """
+    `(generation, {category id: stations})`, cached until a category
+    changes. The generation is new every time the layout is loaded.
+    """
+    key = kitchen_stations_cache_key(restaurant_id)
+    layout = cache.get(key)
+    if layout is None:
+        stations = dict(MenuCategory.objects.filter(restaurant_id=restaurant_id).values_list('id', 'stations'))
+        layout = (uuid.uuid4().hex, stations)
+        cache.set(key, layout, settings.CACHE_TIMEOUT)
+    return layout
+
+
+def invalidate_kitchen_stations(restaurant_id):
+    cache.delete(kitchen_stations_cache_key(restaurant_id))
+
+
+class Station:
+    __slots__ = ("free_at", "queue")
+
+    def __init__(self):
+        self.free_at = 0.0
+        # [order id, start, finish] of every open slot, in queue order
+        self.queue = []
+
+
+class KitchenScheduler:
+    def __init__(self, restaurant_id):
+        self.restaurant_id = restaurant_id
+        self.cursor = None
+        # Changes past the cursor that were already applied; the feed keeps
+        # returning them until they settle
+        self.applied = set()
+        self.generation = None
+        self.stations = {}
+        # order id -> [(category id, station index, slot in that station's queue)]
+        self.slots = {}
+        self._lock = threading.Lock()
+
+    # ----- public -----
+
+    def estimate(self, lines, now=None):
+        """
+        Unix time at which an order with the given `(category_id, minutes)`
+        dishes (one per unit ordered) placed now would be ready. Nothing is reserved; the order
+        takes its slot once it shows up in the change feed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sync(now)
+            free_at = {
+                category_id: [station.free_at for station in stations]
+                for category_id, stations in self.stations.items()
+            }
+
+        ready_at = now
+        for category_id, minutes in lines:
+            if category_id is None:
+                ready_at = max(ready_at, now + minutes * 60)
+                continue
+            station_times = free_at.setdefault(category_id, [0.0])
+            index = min(range(len(station_times)), key=station_times.__getitem__)
+            finish = max(now, station_times[index]) + minutes * 60
+            station_times[index] = finish
+            ready_at = max(ready_at, finish)
+        return ready_at
+
+    def open_orders(self):
+        with self._lock:
+            return len(self.slots)
+
+    # ----- internals -----
+
+    def _sync(self, now):
+        generation, counts = get_kitchen_stations(self.restaurant_id)
+        if generation != self.generation:
+            self._rebuild(generation, counts)
+            return
+
+        changes, self.cursor = read_changes(self.restaurant_id, self.cursor)
+        changes = [change for change in changes if change[0] not in self.applied]
+        self.applied = {change_id for change_id in self.applied if change_id > self.cursor}
+        self.applied.update(change_id for change_id, _, _ in changes if change_id > self.cursor)
+        if not changes:
+            return
+
+        order_ids = list(dict.fromkeys(order_id for _, order_id, _ in changes))
+        orders = {
+            order_id: (order_status, completed_at, cancelled_at)
+            for order_id, order_status, completed_at, cancelled_at in Order.objects.filter(id__in=order_ids)
+            .values_list('id', 'status', 'completed_at', 'cancelled_at')
+        }
+
+        arrived = []
+        for order_id in order_ids:
+            order_status, completed_at, cancelled_at = orders.get(order_id, (None, None, None))  # None once deleted
+            if order_id in self.slots:
+                if order_status not in OPEN_STATUSES:
+                    # Released as of when it actually finished, which may
+                    # be well before this sync
+                    finished_at = completed_at if order_status == "completed" else cancelled_at
+                    finished = finished_at.timestamp() if finished_at is not None else now
+                    self._release(order_id, order_status == "completed", min(finished, now))
+            elif order_status in OPEN_STATUSES:
+                arrived.append(order_id)
+
+        if arrived:
+            self._assign_all(OrderItem.objects.filter(order_id__in=arrived))
+
+    def _rebuild(self, generation, counts):
+        self.generation = generation
+        self.stations = {
+            category_id: [Station() for _ in range(max(1, count))]
+            for category_id, count in counts.items()
+        }
+        self.slots = {}
+        # Read the cursor first, so orders written during the rebuild are
+        # replayed by the next sync rather than missed
+        self.cursor = snapshot_cursor(self.restaurant_id)
+        self.applied = set()
+        self._assign_all(
+            OrderItem.objects.filter(order__restaurant_id=self.restaurant_id, order__status__in=OPEN_STATUSES)
+        )
+
+    def _assign_all(self, order_items):
+        rows = (
+            order_items
+            .order_by('order__created_at', 'order_id', 'id')
+            .annotate(minutes=Coalesce('prep_minutes', Cast('menu_item__cooking_time_minutes', FloatField())))
+            .values_list('order_id', 'order__created_at', 'menu_item__category_id', 'minutes', 'quantity')
+        )
+        for order_id, created_at, category_id, minutes, quantity in rows:
+            for _ in range(quantity):
+                self._assign(order_id, created_at.timestamp(), category_id, minutes)
+
+    def _assign(self, order_id, arrival, category_id, minutes):
+        if category_id is None:
+            # Still listed, so the order counts as open
+            self.slots.setdefault(order_id, [])
+            return
+
+        stations = self.stations.get(category_id)
+        if stations is None:
+            # A category created since the last rebuild
+            stations = self.stations[category_id] = [Station()]
+
+        index = min(range(len(stations)), key=lambda i: stations[i].free_at)
+        station = stations[index]
+        start = max(arrival, station.free_at)
+        finish = start + minutes * 60
+        station.free_at = finish
+        slot = [order_id, start, finish]
+        station.queue.append(slot)
+        self.slots.setdefault(order_id, []).append((category_id, index, slot))
+
+    def _release(self, order_id, completed, finished):
+        for category_id, index, slot in self.slots.pop(order_id):
+            station = self.stations[category_id][index]
+            _, start, finish = slot
+
+            if completed:
+                # Everything queued behind it moves up (or back, if it ran late)
+                delta = finish - finished
+            else:
+                # Cancelled: hand back whatever time it had not used yet
+                delta = finish - max(finished, start)
+
+            # Slots queued ahead of it are left where they are
+            position = next(i for i, queued in enumerate(station.queue) if queued is slot)
+            del station.queue[position]
+            for behind in station.queue[position:]:
+                behind[1] -= delta
+                behind[2] -= delta
+            station.free_at -= delta
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(restaurant_id):
+    with _schedulers_lock:
+        scheduler = _schedulers.get(restaurant_id)
+        if scheduler is None:
+            scheduler = _schedulers[restaurant_id] = KitchenScheduler(restaurant_id)
+        return scheduler
+
+
+def reset_schedulers():
+    with _schedulers_lock:
+        _schedulers.clear()
+
+
+def wait_minutes(ready_at, now):
+    return max(0, math.ceil((ready_at - now) / 60))
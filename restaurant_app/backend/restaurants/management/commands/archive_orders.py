@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from restaurants.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed and cancelled orders to the archive in small batches. "
+        "Safe to run during service, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, help="Only this restaurant; default all")
+        parser.add_argument("--batch-size", type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+
+    def handle(self, restaurant, batch_size, **options):
+        archived = archive_orders(restaurant, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders"))
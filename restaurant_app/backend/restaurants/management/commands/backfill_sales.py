@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.analytics import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the sales rollups (ItemSalesHour, DailySales) from past orders, "
+        "a span of days at a time. Safe to run while orders are being taken."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, action="append", dest="restaurants",
+                            help="Only this restaurant (repeatable); default all")
+        parser.add_argument("--chunk-days", type=int, default=7)
+
+    def handle(self, restaurants, chunk_days, **options):
+        def progress(processed):
+            self.stdout.write(f"  {processed} orders")
+
+        processed = backfill_rollups(restaurants, chunk_days=chunk_days, progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups from {processed} orders"))
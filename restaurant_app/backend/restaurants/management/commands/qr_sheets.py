@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurants.models import Restaurant, Table
+from restaurants.qr_sheets import write_qr_sheets, SHEET_FORMATS
+
+
+class Command(BaseCommand):
+    help = "Render printable QR card sheets for every table of a restaurant."
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int)
+        parser.add_argument("--output", choices=sorted(SHEET_FORMATS), default="pdf")
+        parser.add_argument("--out", help="File to write (default: table-qr-codes-<id>.pdf / .zip)")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Rendering processes; 0 renders inline (default: one per core)",
+        )
+
+    def handle(self, restaurant_id, output, out, workers, **options):
+        try:
+            restaurant = Restaurant.objects.get(id=restaurant_id)
+        except Restaurant.DoesNotExist:
+            raise CommandError(f"Restaurant {restaurant_id} does not exist")
+
+        numbers = list(
+            Table.objects.filter(restaurant=restaurant).order_by("number").values_list("number", flat=True)
+        )
+        if not numbers:
+            raise CommandError(f"{restaurant.name} has no tables")
+
+        path = out or f"table-qr-codes-{restaurant.id}.{SHEET_FORMATS[output][1]}"
+
+        executor = None
+        if workers:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            with open(path, "w+b") as fp:
+                sheets = write_qr_sheets(restaurant, numbers, output, fp, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(numbers)} tables on {sheets} sheets to {path}"))
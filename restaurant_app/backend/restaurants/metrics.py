@@ -0,0 +1,259 @@
+"""
+Per-route request metrics, exposed at /metrics in Prometheus' text format.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper on every connection, counts its queries and the time they took.
+ORJSONRenderer adds the time spent rendering the response body.
+Everything is keyed by method and URL pattern (not the path, so the
+number of series stays fixed), and costs a few microseconds per request
+and per query.
+
+Counters live in the process that served the request: with several
+server workers, each worker's /metrics shows its own share, so scrape
+every worker (or sum across them in Prometheus).
+
+/metrics needs METRICS_TOKEN as a bearer token, and without one is only
+served with DEBUG on: routes, traffic and latencies aren't for everyone.
+
+With SLOW_REQUEST_MS set, any request slower than that is logged to the
+"restaurants.slow_requests" logger with each query's SQL and time
+(without parameters, which may hold guests' data).
+"""
+
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger("restaurants.slow_requests")
+
+# Upper bounds, as Prometheus' le labels
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# Queries kept per request for the slow-request log
+SLOW_REQUEST_MAX_QUERIES = 100
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """What one request spent, filled in as it runs. Also the execute wrapper."""
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.sql = [] if capture_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.sql is not None and len(self.sql) < SLOW_REQUEST_MAX_QUERIES:
+                self.sql.append((elapsed, sql))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection as it opens (see
+    restaurants/signals.py). Connections are per thread, and under ASGI
+    queries run in other threads than the middleware; the request's stats
+    follow them there through the context variable.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def record_render(seconds):
+    """Called by the renderer with the time it took to write a response body."""
+    stats = _current.get()
+    if stats is not None:
+        stats.render_seconds += seconds
+
+
+# -------------------------------
+# REGISTRY
+# -------------------------------
+class RouteMetrics:
+    def __init__(self):
+        self.statuses = {}
+        self.duration_buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.query_buckets = [0] * (len(QUERY_BUCKETS) + 1)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, method, route, status, duration, stats):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.duration_buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+            metrics.duration_sum += duration
+            metrics.query_buckets[bisect_left(QUERY_BUCKETS, stats.queries)] += 1
+            metrics.queries += stats.queries
+            metrics.db_seconds += stats.db_seconds
+            metrics.render_seconds += stats.render_seconds
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """The Prometheus text exposition of everything recorded so far."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            def histogram(name, labels, bounds, counts, total):
+                cumulative = 0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {total}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+            labelled = [(route_labels(method, route), metrics) for (method, route), metrics in routes]
+
+            family("http_requests_total", "counter", "Requests served, by route and status code.")
+            for labels, metrics in labelled:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+
+            family("http_request_duration_seconds", "histogram", "Time to produce the response.")
+            for labels, metrics in labelled:
+                histogram("http_request_duration_seconds", labels, DURATION_BUCKETS,
+                          metrics.duration_buckets, metrics.duration_sum)
+
+            family("http_request_queries", "histogram", "Database queries per request.")
+            for labels, metrics in labelled:
+                histogram("http_request_queries", labels, QUERY_BUCKETS, metrics.query_buckets, metrics.queries)
+
+            family("http_request_db_seconds_total", "counter", "Time spent in database queries.")
+            for labels, metrics in labelled:
+                lines.append(f"http_request_db_seconds_total{{{labels}}} {metrics.db_seconds}")
+
+            family("http_request_render_seconds_total", "counter", "Time spent rendering response bodies.")
+            for labels, metrics in labelled:
+                lines.append(f"http_request_render_seconds_total{{{labels}}} {metrics.render_seconds}")
+
+        return "\n".join(lines) + "\n"
+
+
+def route_labels(method, route):
+    route = route.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'method="{method}",route="{route}"'
+
+
+REGISTRY = Registry()
+
+
+# -------------------------------
+# MIDDLEWARE
+# -------------------------------
+class MetricsMiddleware:
+    """
+    Outermost, so compression and the other middleware count towards the
+    request. Runs sync or async, whichever the chain below it is.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats(capture_sql=bool(settings.SLOW_REQUEST_MS))
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats(capture_sql=bool(settings.SLOW_REQUEST_MS))
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+        REGISTRY.observe(method, route, response.status_code, duration, stats)
+
+        slow_ms = settings.SLOW_REQUEST_MS
+        if slow_ms and duration * 1000 >= slow_ms:
+            log_slow_request(request, route, response, duration, stats)
+        return response
+
+
+def log_slow_request(request, route, response, duration, stats):
+    queries = "".join(f"\n  {seconds * 1000:7.1f}ms  {sql}" for seconds, sql in stats.sql)
+    if stats.queries > len(stats.sql):
+        queries += f"\n  ... {stats.queries - len(stats.sql)} more"
+    logger.warning(
+        "Slow request: %s %s (%s) %s in %.0fms, %d queries in %.0fms, rendering %.0fms%s",
+        request.method, request.path, route, response.status_code, duration * 1000,
+        stats.queries, stats.db_seconds * 1000, stats.render_seconds * 1000, queries,
+    )
+
+
+# -------------------------------
+# ENDPOINT
+# -------------------------------
+def metrics_view(request):
+    """
+    Prometheus scrape target, requiring METRICS_TOKEN as a bearer token.
+    Without a token it is only served with DEBUG on, and is a 404 otherwise.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
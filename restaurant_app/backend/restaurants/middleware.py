@@ -0,0 +1,118 @@
+"""
+Response compression for the API.
+
+Like Django's GZipMiddleware, but it prefers brotli when the client
+accepts it and the `brotli` package is installed, only compresses text
+and JSON, and leaves alone anything under COMPRESSION_MIN_SIZE bytes
+(not worth the CPU) or streamed (event streams must not be buffered,
+files are served as they are).
+
+Cached documents can be compressed once up front with
+precompress() and served with serve_precompressed(); the middleware
+passes those responses through untouched.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def accepted_encoding(request, available=("br", "gzip")):
+    accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if brotli is not None and "br" in available and re_accepts_brotli.search(accept_encoding):
+        return "br"
+    if "gzip" in available and re_accepts_gzip.search(accept_encoding):
+        return "gzip"
+    return None
+
+
+def set_encoded_content(response, encoding, content):
+    response.content = content
+    response.headers["Content-Length"] = str(len(content))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed body is no longer byte-for-byte what a strong ETag
+    # promises; a weak one still matches If-None-Match
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+
+
+def precompress(content):
+    """
+    Every encoding of a public, cacheable document worth serving, by
+    Content-Encoding. Compressed once, so brotli runs at full quality.
+    """
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    encodings = {"gzip": compress_string(content)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(content, quality=11)
+    return encodings
+
+
+def serve_precompressed(request, response, encodings):
+    """Swap in the client's preferred encoding from precompress(), if any."""
+    if encodings:
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request, encodings)
+        if encoding is not None:
+            set_encoded_content(response, encoding, encodings[encoding])
+    return response
+
+
+class CompressionMiddleware:
+    # Runs either way, so under ASGI the async views (the order event
+    # stream) aren't handed to a thread on the way through
+    sync_capable = True
+    async_capable = True
+
+    # Random bytes in the gzip header, as GZipMiddleware adds against BREACH
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = accepted_encoding(request)
+        if encoding == "br":
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == "gzip":
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        else:
+            return response
+
+        if len(compressed) < len(response.content):
+            set_encoded_content(response, encoding, compressed)
+        return response
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+def mark_existing_codes_ready(apps, schema_editor):
+    Table = apps.get_model('restaurants', 'Table')
+    Table.objects.exclude(qr_code='').exclude(qr_code__isnull=True).update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_codes_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:48
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0007_menuitem_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menucategory',
+            name='stations',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='estimated_ready_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:53
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('restaurants', 'Order')
+    OrderItem = apps.get_model('restaurants', 'OrderItem')
+
+    line_totals = (
+        OrderItem.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum(ExpressionWrapper(
+            F('quantity') * F('item_price'), output_field=DecimalField(max_digits=10, decimal_places=2)
+        )))
+        .values('total')
+    )
+    Order.objects.update(total_amount=Coalesce(Subquery(line_totals), Decimal('0')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0009_order_status_timestamps_prep_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
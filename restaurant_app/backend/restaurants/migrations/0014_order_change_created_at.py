@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0013_order_request'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderchange',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='orderchange',
+            index=models.Index(fields=['created_at'], name='order_change_created_idx'),
+        ),
+    ]
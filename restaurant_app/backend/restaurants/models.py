@@ -1,4 +1,6 @@
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from django.utils import timezone
 
 # Create your models here.
 class Restaurant(models.Model):
@@ -20,6 +22,9 @@ class Restaurant(models.Model):
 class MenuCategory(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
+    # Dishes from this category the kitchen can cook at the same time,
+    # used for wait estimates (see restaurants/kitchen.py)
+    stations = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
 
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
@@ -32,6 +37,9 @@ class MenuItem(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=7, decimal_places=2)
     image = models.ImageField(upload_to="menu_items/", blank=True, null=True)
+    # Resized copies of `image` by size name, filled in by a background
+    # job (see restaurants/images.py); empty until they are ready
+    image_variants = models.JSONField(default=dict, blank=True)
 
     is_veg = models.BooleanField(default=False)
     is_non_veg = models.BooleanField(default=False)
@@ -56,56 +64,252 @@ class Order(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     estimated_wait_time = models.IntegerField(default=0)  # shown to customer
+    estimated_ready_at = models.DateTimeField(null=True, blank=True)
+    # Sum of the order's lines, fixed when the order is placed
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # When the order last moved into each status, stamped by save()
+    preparing_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    STATUS_TIMESTAMPS = {
+        "preparing": "preparing_at",
+        "completed": "completed_at",
+        "cancelled": "cancelled_at",
+    }
+
+    # Bumped on every save, used as the order's ETag for status polling
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Admin order list, newest first, paginated on (created_at, id)
+            models.Index(fields=['restaurant', 'created_at', 'id'], name='order_restaurant_created_idx'),
+            # Status-filtered lists and the bills view (completed orders)
+            models.Index(fields=['restaurant', 'status', 'created_at'], name='order_restaurant_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        extra_fields = set()
+        if self.pk is not None:
+            self.version += 1
+            extra_fields |= {"version", "updated_at"}
+
+        if self.status != getattr(self, "_saved_status", None):
+            timestamp_field = self.STATUS_TIMESTAMPS.get(self.status)
+            if timestamp_field is not None:
+                setattr(self, timestamp_field, timezone.now())
+                extra_fields.add(timestamp_field)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+        # Updated after post_save, so receivers can still see the old status
+        self._saved_status = self.status
+
+    @property
+    def etag(self):
+        return f'"order-{self.id}-{self.version}"'
 
     def __str__(self):
         return f"Order {self.id} - Table {self.table_number}"
 
+class OrderChange(models.Model):
+    """
+    Append-only log of order writes. Its id is the cursor used by the admin
+    change feed and the kitchen scheduler (see restaurants/changes.py);
+    order_id is a plain integer so deletions can be reported as tombstones
+    after the Order row is gone.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    order_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', 'id']),
+            # Holding the cursor back from recent changes, and pruning old ones
+            models.Index(fields=['created_at'], name='order_change_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Change {self.id} - Order {self.order_id}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
 
     quantity = models.IntegerField(default=1)
     item_price = models.DecimalField(max_digits=7, decimal_places=2)
+    # Preparation time the wait estimate assumed for this line; null for
+    # orders placed before estimates were learned
+    prep_minutes = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.menu_item.name} x {self.quantity}"
 
-import qrcode
-from io import BytesIO
-from django.core.files import File
+class OrderRequest(models.Model):
+    """
+    An order submission's Idempotency-Key. Claimed before the order is
+    created, and holding the response once it is, so a retried
+    submission gets the same order back instead of a duplicate (see
+    restaurants/idempotency.py).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # Hash of the request body, so a key can't be reused for another order
+    fingerprint = models.CharField(max_length=64)
+    # Set in the transaction that creates the order; a plain integer, like
+    # OrderChange.order_id, so archiving orders doesn't touch these rows
+    order_id = models.BigIntegerField(null=True, blank=True)
+    # The 201 response body, stored once the order is committed
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'key'], name='order_request_key_unique'),
+        ]
+        indexes = [models.Index(fields=['created_at'], name='order_request_created_idx')]
+
+    def __str__(self):
+        return f"{self.key} - Order {self.order_id}"
+
+class PrepTimeEstimate(models.Model):
+    """
+    Learned preparation time of a menu item for one hour of the day, as an
+    exponentially weighted moving average of completed orders (see
+    restaurants/prep_times.py).
+    """
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="prep_times")
+    hour = models.PositiveSmallIntegerField()
+    minutes = models.FloatField()
+    samples = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'hour'], name='prep_time_item_hour_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item.name} at {self.hour:02d}:00 - {self.minutes:.1f} min"
+
+class ItemSalesHour(models.Model):
+    """
+    Completed sales of one menu item in one hour (by order time). Kept up
+    to date as orders are completed or cancelled (see restaurants/analytics.py).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'hour'], name='item_sales_item_hour_unique'),
+        ]
+        indexes = [models.Index(fields=['restaurant', 'hour'], name='item_sales_restaurant_hour_idx')]
+
+    def __str__(self):
+        return f"{self.menu_item_id} at {self.hour:%Y-%m-%d %H:00} - {self.quantity}"
+
+class DailySales(models.Model):
+    """Completed and cancelled order totals for one restaurant and day."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancelled_orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date'], name='daily_sales_restaurant_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.date} - {self.revenue}"
+
+class ArchivedOrder(models.Model):
+    """
+    A completed or cancelled order moved out of Order (see
+    restaurants/archive.py). Keeps the original id, so archived orders can
+    still be matched against receipts and change feeds.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    table_number = models.IntegerField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField()
+    preparing_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Archive list, newest first, paginated on (created_at, id)
+            models.Index(fields=['restaurant', 'created_at', 'id'], name='archived_order_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} - Table {self.table_number}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="items")
+    # History outlives the menu, so the item's name is kept with the line
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True)
+    menu_item_name = models.CharField(max_length=200)
+
+    quantity = models.IntegerField(default=1)
+    item_price = models.DecimalField(max_digits=7, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_name}"
 
 class Table(models.Model):
+    QR_PENDING = "pending"
+    QR_READY = "ready"
+    QR_FAILED = "failed"
+    QR_STATUS_CHOICES = [
+        (QR_PENDING, "Pending"),
+        (QR_READY, "Ready"),
+        (QR_FAILED, "Failed"),
+    ]
+
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
     number = models.IntegerField()
+    # Legacy stored PNG; codes are now served on demand from the QR cache
     qr_code = models.ImageField(upload_to="qr_codes/", blank=True, null=True)
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default=QR_PENDING)
 
     class Meta:
         unique_together = ('restaurant', 'number')
 
     def save(self, *args, **kwargs):
-        if not self.qr_code:
-            # Generate QR Code
-            # TODO: Make base URL configurable
-            frontend_url = "http://192.168.29.121:5173" # Change YOUR_LAPTOP_IP to your laptop's local IP address
-            qr_data = f"{frontend_url}/menu?restaurant_id={self.restaurant.id}&table={self.number}"
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            self.qr_code.save(f'qr_table_{self.restaurant.id}_{self.number}.png', File(buffer), save=False)
-            
+        creating = self._state.adding
         super().save(*args, **kwargs)
 
+        # QR codes are rendered by a background worker once the row is committed
+        if creating:
+            from .jobs import enqueue_table_qr
+            transaction.on_commit(lambda: enqueue_table_qr([self.id]))
+
     def __str__(self):
         return f"Table {self.number} - {self.restaurant.name}"
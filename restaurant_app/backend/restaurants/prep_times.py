@@ -0,0 +1,82 @@
+"""
+Preparation times learned from completed orders.
+
+Every completion adds one sample per order line to an exponentially
+weighted moving average, kept per menu item and hour of day, so the
+estimate follows the kitchen as it speeds up or slows down without ever
+rescanning past orders. Until an item has PREP_TIME_MIN_SAMPLES samples
+for an hour, its owner-entered cooking_time_minutes is used instead.
+"""
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import OrderItem, PrepTimeEstimate
+
+# Orders left open far longer than this (e.g. cleared at closing time)
+# say nothing about how long the dishes took
+MAX_SAMPLE_MINUTES = 180
+
+
+def learned_prep_minutes(menu_items, when=None):
+    """Current prep time estimate for each menu item, by menu item id."""
+    hour = timezone.localtime(when).hour
+    learned = dict(
+        PrepTimeEstimate.objects
+        .filter(menu_item__in=menu_items, hour=hour, samples__gte=settings.PREP_TIME_MIN_SAMPLES)
+        .values_list('menu_item_id', 'minutes')
+    )
+    return {item.id: learned.get(item.id, item.cooking_time_minutes) for item in menu_items}
+
+
+def record_completion(order):
+    """
+    Fold a freshly completed order into the estimates of its items.
+
+    The observed time runs from when the order started preparing (or was
+    placed, if it skipped that status) to when it was completed. Lines are
+    cooked in parallel, so each line is credited with a share of it in
+    proportion to what was expected of that line.
+    """
+    started_at = order.preparing_at or order.created_at
+    if order.completed_at is None:
+        return
+    observed = (order.completed_at - started_at).total_seconds() / 60
+    if not 0 < observed <= MAX_SAMPLE_MINUTES:
+        return
+
+    expected = dict(
+        OrderItem.objects
+        .filter(order=order)
+        .annotate(minutes=Coalesce('prep_minutes', Cast('menu_item__cooking_time_minutes', FloatField())))
+        .values_list('menu_item_id', 'minutes')
+    )
+    if not expected:
+        return
+    longest = max(expected.values()) or 1
+
+    hour = timezone.localtime(started_at).hour
+    # Start new estimates from what was expected, so one odd order cannot
+    # set them
+    PrepTimeEstimate.objects.bulk_create(
+        [
+            PrepTimeEstimate(menu_item_id=menu_item_id, hour=hour, minutes=minutes, samples=0)
+            for menu_item_id, minutes in expected.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+    # Blend in SQL, against whatever the row holds when it is updated, so
+    # completions of the same item recorded at once do not overwrite
+    # each other
+    sample = Case(
+        *[When(menu_item_id=menu_item_id, then=Value(observed * minutes / longest))
+          for menu_item_id, minutes in expected.items()],
+        output_field=FloatField(),
+    )
+    PrepTimeEstimate.objects.filter(menu_item_id__in=expected, hour=hour).update(
+        minutes=F('minutes') + settings.PREP_TIME_EWMA_ALPHA * (sample - F('minutes')),
+        samples=F('samples') + 1,
+    )
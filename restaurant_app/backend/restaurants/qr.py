@@ -0,0 +1,220 @@
+"""
+QR code rendering for tables.
+
+Kept free of Django model imports so it is cheap to load in the
+process-pool workers that do the actual rendering (see restaurants/jobs.py).
+
+Rendered codes are content-addressed: the cache key is a hash of the
+encoded URL and the style, so a code is only ever rendered once, and
+changing FRONTEND_URL simply produces new keys. Old entries are never
+served again and the new ones render lazily on first request; the disk
+tier evicts the least recently used files past QR_CACHE_MAX_FILES.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_STYLE = {
+    "fill": "#000000",
+    "back": "#ffffff",
+    "box_size": 10,
+    "border": 4,
+}
+
+
+def table_menu_url(restaurant_id, number):
+    return f"{settings.FRONTEND_URL}/menu?restaurant_id={restaurant_id}&table={number}"
+
+
+def qr_cache_key(data, style):
+    payload = json.dumps({"data": data, "style": style}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_qr_png(data, style=DEFAULT_STYLE):
+    """Render `data` as a QR code in the given style and return the PNG bytes."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=style["box_size"],
+        border=style["border"],
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color=style["fill"], back_color=style["back"])
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def load_label_font(font_path, size):
+    """
+    Load the TTF at `font_path`, or Pillow's bundled scalable font when no
+    path is configured, so labels render the same size on every platform.
+    """
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size=size)
+
+
+def render_table_card(data, table_no, color, font_path=None, label_font_size=36):
+    """
+    Render a printable "Table N" card: the QR code in the restaurant's
+    colour with the label centred underneath. This is the layout of
+    qr_test.make_table_qr, returning PNG bytes instead of writing a file.
+    """
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color=color, back_color="white").convert("RGB")
+
+    font = load_label_font(font_path, label_font_size)
+    label = f"Table {table_no}"
+
+    qr_w, qr_h = qr_img.size
+    padding_top = 10
+    padding_bottom = 35
+    space_for_label = label_font_size + 10
+
+    canvas = Image.new("RGB", (qr_w, qr_h + padding_top + space_for_label + padding_bottom), "white")
+    canvas.paste(qr_img, (0, padding_top))
+
+    left, top, right, bottom = font.getbbox(label)
+    text_x = (qr_w - (right - left)) // 2 - left
+    text_y = padding_top + qr_h + (space_for_label - (bottom - top)) // 2 - top
+    ImageDraw.Draw(canvas).text((text_x, text_y), label, fill=color, font=font)
+
+    buffer = BytesIO()
+    canvas.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """
+    Two-level cache of rendered QR PNGs: an in-memory LRU in front of a
+    directory of `<key>.png` files shared by all server processes.
+
+    Only the default style goes to disk. Anyone can ask the public QR
+    endpoint for any colours and size, so custom styles live in the
+    bounded in-memory LRU alone, and the disk holds at most `max_files`
+    codes, evicting the least recently read (by mtime).
+    """
+
+    def __init__(self, directory, max_entries, max_files):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Files on disk as this process last counted them, plus its own
+        # writes since; other processes' writes are caught by the next count
+        self._files = None
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.png")
+
+    def get(self, key):
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return png
+
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            # Marks it recently used, for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        self._remember(key, png)
+        return png
+
+    def put(self, key, png, persist=True):
+        if not persist:
+            self._remember(key, png)
+            return
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename, so readers never see a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+
+        self._remember(key, png)
+        with self._lock:
+            if self._files is not None:
+                self._files += 1
+            if self._files is None or self._files > self.max_files:
+                self._files = self._evict()
+
+    def _evict(self):
+        """Delete the least recently used files past a tenth under `max_files`; returns how many are left."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                for file in os.scandir(entry.path):
+                    if file.name.endswith(".png"):
+                        try:
+                            files.append((file.stat().st_mtime, file.path))
+                        except FileNotFoundError:
+                            pass
+        if len(files) <= self.max_files:
+            return len(files)
+
+        files.sort()
+        excess = len(files) - self.max_files * 9 // 10
+        for _, path in files[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(files) - excess
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get_or_render(self, data, style=DEFAULT_STYLE):
+        key = qr_cache_key(data, style)
+        png = self.get(key)
+        if png is None:
+            png = render_qr_png(data, style)
+            self.put(key, png, persist=style == DEFAULT_STYLE)
+        return png
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_qr_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None or _cache.directory != str(settings.QR_CACHE_DIR):
+            _cache = QRCodeCache(
+                str(settings.QR_CACHE_DIR), settings.QR_CACHE_MAX_ENTRIES, settings.QR_CACHE_MAX_FILES
+            )
+        return _cache
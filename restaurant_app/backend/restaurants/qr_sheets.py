@@ -0,0 +1,113 @@
+"""
+Printable sheets of table QR cards.
+
+Cards are rendered in worker processes a page at a time, with the next
+page already rendering while the current one is laid out, and each page
+is written out as soon as it is complete. At most two pages of cards and
+one sheet are held in memory, however many tables the restaurant has.
+"""
+
+import zipfile
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageDraw
+
+from .qr import table_menu_url, render_table_card, load_label_font
+
+# A4 at 150 dpi
+SHEET_DPI = 150
+SHEET_SIZE = (1240, 1754)
+SHEET_MARGIN = 60
+FOOTER_HEIGHT = 40
+COLUMNS = 3
+ROWS = 4
+CARDS_PER_SHEET = COLUMNS * ROWS
+
+SHEET_FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "png": ("application/zip", "zip"),
+}
+
+
+def card_jobs(restaurant, numbers):
+    font_path = settings.QR_LABEL_FONT
+    for number in numbers:
+        yield (table_menu_url(restaurant.id, number), number, restaurant.primary_color, font_path)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_card_pages(jobs, executor=None):
+    """
+    Yield the rendered cards one sheet's worth at a time. Without an
+    executor the cards are rendered inline.
+    """
+    if executor is None:
+        for page in _chunks(jobs, CARDS_PER_SHEET):
+            yield [render_table_card(*job) for job in page]
+        return
+
+    pending = None
+    for page in _chunks(jobs, CARDS_PER_SHEET):
+        futures = [executor.submit(render_table_card, *job) for job in page]
+        if pending is not None:
+            yield [future.result() for future in pending]
+        pending = futures
+    if pending is not None:
+        yield [future.result() for future in pending]
+
+
+def compose_sheet(cards, caption):
+    """Tile up to CARDS_PER_SHEET card PNGs onto one page with cut guides."""
+    sheet = Image.new("RGB", SHEET_SIZE, "white")
+    draw = ImageDraw.Draw(sheet)
+
+    cell_w = (SHEET_SIZE[0] - 2 * SHEET_MARGIN) // COLUMNS
+    cell_h = (SHEET_SIZE[1] - 2 * SHEET_MARGIN - FOOTER_HEIGHT) // ROWS
+
+    for index, png in enumerate(cards):
+        x = SHEET_MARGIN + (index % COLUMNS) * cell_w
+        y = SHEET_MARGIN + (index // COLUMNS) * cell_h
+        draw.rectangle([x, y, x + cell_w, y + cell_h], outline="#d0d0d0")
+
+        with Image.open(BytesIO(png)) as card:
+            card.thumbnail((cell_w - 20, cell_h - 20), Image.Resampling.LANCZOS)
+            sheet.paste(card, (x + (cell_w - card.width) // 2, y + (cell_h - card.height) // 2))
+
+    font = load_label_font(settings.QR_LABEL_FONT, 20)
+    draw.text((SHEET_MARGIN, SHEET_SIZE[1] - SHEET_MARGIN - 20), caption, fill="#666666", font=font)
+    return sheet
+
+
+def write_qr_sheets(restaurant, numbers, output, fp, executor=None):
+    """
+    Write sheets of QR cards for the given table numbers to `fp`, either as
+    one multi-page PDF or as a zip of PNG pages. `fp` must be seekable,
+    since Pillow appends PDF pages in place. Returns the number of sheets.
+    """
+    total = -(-len(numbers) // CARDS_PER_SHEET)
+    archive = zipfile.ZipFile(fp, "w", zipfile.ZIP_STORED) if output == "png" else None
+
+    pages = render_card_pages(card_jobs(restaurant, numbers), executor)
+    for index, cards in enumerate(pages):
+        sheet = compose_sheet(cards, f"{restaurant.name} - sheet {index + 1} of {total}")
+
+        if archive is None:
+            sheet.save(fp, "PDF", append=index > 0, resolution=SHEET_DPI)
+        else:
+            with archive.open(f"tables-{index + 1:03d}.png", "w") as entry:
+                sheet.save(entry, "PNG", dpi=(SHEET_DPI, SHEET_DPI))
+
+    if archive is not None:
+        archive.close()
+    return total
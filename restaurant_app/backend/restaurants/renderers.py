@@ -0,0 +1,65 @@
+"""
+orjson-backed JSON renderer and parser for the API.
+
+Output matches DRF's JSONRenderer for everything the serializers produce.
+Values views put into a Response directly go through the same rules as
+DRF's JSONEncoder (datetimes as ISO 8601 with "Z" for UTC, and so on),
+except Decimals, which are written as exact strings like "120.00" instead
+of floats, the same as serializer DecimalFields.
+"""
+
+import datetime
+import decimal
+import time
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import record_render
+
+# orjson would write datetimes itself, with full microseconds and
+# "+00:00"; passing them through keeps DRF's format
+DUMP_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_drf_encoder = JSONEncoder()
+
+
+def default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return _drf_encoder.default(obj)
+
+
+def dumps(data, indent=False):
+    return orjson.dumps(data, default=default, option=DUMP_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Accept: application/json; indent=4, or the browsable API asking;
+        # orjson only indents by two
+        indent = "indent=" in (accepted_media_type or "") or bool((renderer_context or {}).get("indent"))
+        started = time.perf_counter()
+        content = dumps(data, indent=indent)
+        record_render(time.perf_counter() - started)
+        return content
+
+
+class ORJSONParser(BaseParser):
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -1,5 +1,13 @@
+import time
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from .models import Restaurant, MenuCategory, MenuItem, Order, OrderItem
+from .images import variant_url
+from .kitchen import get_scheduler, wait_minutes
+from .prep_times import learned_prep_minutes
 
 class MenuCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,30 +16,51 @@ class MenuCategorySerializer(serializers.ModelSerializer):
 
 class MenuItemSerializer(serializers.ModelSerializer):
     category = MenuCategorySerializer(read_only=True)
+    # {"thumb": {"width", "height", "webp", "jpeg"}, ...}; empty until the
+    # resized copies are ready, so clients fall back to `image`
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
         fields = [
-            'id', 'name', 'description', 'price', 'image',
+            'id', 'name', 'description', 'price', 'image', 'image_variants',
             'is_veg', 'is_non_veg', 'is_jain', 'is_chefs_special',
             'cooking_time_minutes',
             'category'
         ]
 
+    def get_image_variants(self, obj):
+        return {
+            size: {
+                "width": variant["width"],
+                "height": variant["height"],
+                "webp": variant_url(variant["webp"]),
+                "jpeg": variant_url(variant["jpeg"]),
+            }
+            for size, variant in obj.image_variants.items()
+        }
+
 class RestaurantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Restaurant
         fields = ['id', 'name', 'description', 'cuisine', 'address', 'map_url']
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    menu_item = MenuItemSerializer(read_only=True)
+class OrderLineSerializer(serializers.ModelSerializer):
+    """An order line with just the menu item's id and name, not the whole item."""
+    menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
+    price = serializers.DecimalField(source='item_price', max_digits=7, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'menu_item', 'quantity', 'item_price']
+        fields = ['menu_item', 'menu_item_name', 'quantity', 'price']
+        read_only_fields = fields
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, read_only=True)
+    """
+    Load orders through with_order_lines() or prefetch_order_lines(),
+    which fetch the lines of any number of orders in a single query.
+    """
+    items = OrderLineSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
@@ -41,46 +70,104 @@ class OrderSerializer(serializers.ModelSerializer):
             'table_number',
             'status',
             'estimated_wait_time',
+            'estimated_ready_at',
+            'total_amount',
             'created_at',
             'items'
         ]
 
+def order_lines():
+    """Prefetch of exactly the line columns OrderSerializer reads."""
+    return Prefetch(
+        'items',
+        queryset=(
+            OrderItem.objects
+            .select_related('menu_item')
+            .only('id', 'order_id', 'quantity', 'item_price', 'menu_item__id', 'menu_item__name')
+            .order_by('id')
+        ),
+    )
+
+def with_order_lines(orders):
+    return orders.prefetch_related(order_lines())
+
+def prefetch_order_lines(orders):
+    """with_order_lines() for orders that are already loaded."""
+    prefetch_related_objects(orders, order_lines())
+    return orders
+
+# Each unit takes its own place in the kitchen queue (see
+# restaurants/kitchen.py), so one line can't ask for thousands
+MAX_LINE_QUANTITY = 99
+
 class OrderCreateItemSerializer(serializers.Serializer):
     menu_item = serializers.IntegerField()
-    quantity = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_LINE_QUANTITY)
 
 class OrderCreateSerializer(serializers.Serializer):
     table_number = serializers.IntegerField()
     items = OrderCreateItemSerializer(many=True)
 
-    def create(self, validated_data):
+    def validate_items(self, items):
+        if not items:
+            raise serializers.ValidationError("Order must contain at least one item.")
+
+        # Resolve every menu item in one query, scoped to this restaurant
         restaurant = self.context.get("restaurant")
+        ids = {item["menu_item"] for item in items}
+        self.menu_items = MenuItem.objects.filter(restaurant=restaurant).in_bulk(ids)
 
-        order = Order.objects.create(
-            restaurant=restaurant,
-            table_number=validated_data["table_number"],
-            status="pending"
-        )
+        unknown = sorted(ids - self.menu_items.keys())
+        if unknown:
+            raise serializers.ValidationError(f"Unknown menu items: {unknown}")
 
+        return items
+
+    def create(self, validated_data):
+        restaurant = self.context.get("restaurant")
         items_data = validated_data["items"]
-        longest_time = 0  # <-- track longest cooking time
 
-        for item in items_data:
-            menu_item_obj = MenuItem.objects.get(id=item["menu_item"])
+        # Queue the order's dishes behind everything the kitchen already
+        # has open, on each category's stations
+        now = time.time()
+        prep_minutes = learned_prep_minutes(list(self.menu_items.values()))
+        lines = [
+            (self.menu_items[item["menu_item"]].category_id, prep_minutes[item["menu_item"]])
+            for item in items_data
+            for _ in range(item["quantity"])
+        ]
+        ready_at = get_scheduler(restaurant.id).estimate(lines, now)
 
-            # Track the max cooking time
-            if menu_item_obj.cooking_time_minutes > longest_time:
-                longest_time = menu_item_obj.cooking_time_minutes
+        total_amount = sum(
+            self.menu_items[item["menu_item"]].price * item["quantity"]
+            for item in items_data
+        )
 
-            OrderItem.objects.create(
-                order=order,
-                menu_item=menu_item_obj,
-                quantity=item["quantity"],
-                item_price=menu_item_obj.price
+        with transaction.atomic():
+            order = Order.objects.create(
+                restaurant=restaurant,
+                table_number=validated_data["table_number"],
+                status="pending",
+                estimated_wait_time=wait_minutes(ready_at, now),
+                estimated_ready_at=datetime.fromtimestamp(ready_at, timezone.utc),
+                total_amount=total_amount,
             )
 
-        # Save the longest cooking time into the order
-        order.estimated_wait_time = longest_time
-        order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menu_item=self.menu_items[item["menu_item"]],
+                    quantity=item["quantity"],
+                    item_price=self.menu_items[item["menu_item"]].price,
+                    prep_minutes=prep_minutes[item["menu_item"]],
+                )
+                for item in items_data
+            ])
+
+            # The submission's Idempotency-Key commits with its order, or neither does
+            order_request = self.context.get("order_request")
+            if order_request is not None:
+                order_request.order_id = order.id
+                order_request.save(update_fields=["order_id"])
 
         return order
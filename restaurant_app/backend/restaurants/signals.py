@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Restaurant, MenuCategory, MenuItem, Order, OrderChange, Table
+from .cache import invalidate_menu, invalidate_table_numbers
+from .kitchen import invalidate_kitchen_stations
+from .analytics import order_status_changed
+from .jobs import delete_unused_variants
+from .metrics import record_query
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    # Connecting again reuses the wrapper object, so add it only once
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    invalidate_menu(instance.id)
+
+
+@receiver([post_save, post_delete], sender=MenuCategory)
+@receiver([post_save, post_delete], sender=MenuItem)
+def menu_changed(sender, instance, **kwargs):
+    invalidate_menu(instance.restaurant_id)
+
+
+@receiver(post_delete, sender=MenuItem)
+def menu_item_deleted(sender, instance, **kwargs):
+    variants = instance.image_variants
+    if variants:
+        transaction.on_commit(lambda: delete_unused_variants(variants))
+
+
+@receiver([post_save, post_delete], sender=MenuCategory)
+def category_changed(sender, instance, **kwargs):
+    invalidate_kitchen_stations(instance.restaurant_id)
+
+
+@receiver([post_save, post_delete], sender=Table)
+def table_changed(sender, instance, **kwargs):
+    invalidate_table_numbers(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    OrderChange.objects.create(restaurant_id=instance.restaurant_id, order_id=instance.id)
+
+    # Order.save() only records the new status after post_save has run
+    previous_status = getattr(instance, "_saved_status", None)
+    if instance.status != previous_status:
+        order_status_changed(instance, previous_status)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, origin=None, **kwargs):
+    # Nothing to report when the whole restaurant is being deleted
+    if getattr(origin, "model", type(origin)) is Restaurant:
+        return
+    OrderChange.objects.create(restaurant_id=instance.restaurant_id, order_id=instance.id, deleted=True)
@@ -0,0 +1,274 @@
+"""
+Synthetic restaurants, menus and order history, for profiling at
+production scale (see the generate_data command).
+
+Everything comes from one random.Random, so the same seed and end date
+always produce the same data. Orders are generated a day at a time and
+written in chunks, so memory stays flat however many are asked for.
+
+Rows go in with bulk inserts, skipping save() and signals: nothing
+reaches the change feed or the sales rollups, and tables get no QR
+codes. Rebuild the rollups with backfill_rollups() afterwards.
+"""
+
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from adminpanel.models import StaffProfile
+from .models import (
+    Restaurant, MenuCategory, MenuItem, Order, OrderItem, Table, ArchivedOrder, OrderChange, OrderRequest,
+)
+
+CUISINES = ["Indian", "Italian", "Mexican", "Thai", "Japanese", "Lebanese", "American", "Chinese"]
+
+# (category, items, cooking minutes)
+MENU_SECTIONS = [
+    ("Starters", 12, (8, 15)),
+    ("Soups", 5, (5, 10)),
+    ("Mains", 20, (15, 30)),
+    ("Breads", 8, (5, 10)),
+    ("Rice", 8, (12, 20)),
+    ("Sides", 10, (5, 12)),
+    ("Desserts", 8, (3, 10)),
+    ("Drinks", 15, (1, 5)),
+]
+
+# Share of a day's orders around lunch and dinner, as (share, peak hour,
+# spread in hours); the rest come evenly between opening and closing
+MEALS = [(0.35, 13.0, 1.0), (0.5, 20.5, 1.25)]
+OPENING_HOUR, CLOSING_HOUR = 11, 23
+
+# Busier towards the weekend, Monday first
+WEEKDAY_FACTORS = [0.8, 0.8, 0.9, 1.0, 1.3, 1.5, 1.2]
+
+# Cumulative weights, as random.choices takes them
+LINES_PER_ORDER = [1, 2, 3, 4, 5, 6]
+LINES_WEIGHTS = list(accumulate([20, 25, 25, 15, 10, 5]))
+QUANTITIES = [1, 2, 3, 4]
+QUANTITY_WEIGHTS = list(accumulate([70, 22, 6, 2]))
+
+CANCELLED_SHARE = 0.05
+
+
+# -------------------------------
+# RESTAURANTS
+# -------------------------------
+def create_restaurant(rng, number, tables=20, staff=2, password="password"):
+    """A restaurant with a full menu, its tables and staff logins (username staff<id>-<n>)."""
+    restaurant = Restaurant.objects.create(
+        name=f"Synthetic Kitchen {number}",
+        cuisine=rng.choice(CUISINES),
+        address=f"{rng.randint(1, 999)} Generated Street",
+    )
+
+    categories = MenuCategory.objects.bulk_create([
+        MenuCategory(restaurant=restaurant, name=name) for name, _, _ in MENU_SECTIONS
+    ])
+    MenuItem.objects.bulk_create([
+        MenuItem(
+            restaurant=restaurant,
+            category=category,
+            name=f"{category.name} {n + 1}",
+            description=f"House {category.name.lower()} number {n + 1}.",
+            price=Decimal(rng.randrange(99, 700, 10)) - Decimal("0.01"),
+            is_veg=(veg := rng.random() < 0.5),
+            is_non_veg=not veg,
+            cooking_time_minutes=rng.randint(*cooking),
+        )
+        for category, (_, count, cooking) in zip(categories, MENU_SECTIONS)
+        for n in range(count)
+    ])
+
+    Table.objects.bulk_create([Table(restaurant=restaurant, number=n) for n in range(1, tables + 1)])
+
+    # Hashing is deliberately slow; every generated login shares one hash
+    hashed = make_password(password)
+    users = User.objects.bulk_create([
+        User(username=f"staff{restaurant.id}-{n + 1}", password=hashed) for n in range(staff)
+    ])
+    StaffProfile.objects.bulk_create([StaffProfile(user=user, restaurant=restaurant) for user in users])
+
+    return restaurant
+
+
+# -------------------------------
+# ORDERS
+# -------------------------------
+# Orders and lines are written as plain rows with executemany: at tens of
+# millions of rows, building model instances and compiling bulk_create's
+# SQL took several times longer than the inserts themselves
+ORDER_FIELDS = [
+    "id", "restaurant", "table_number", "status", "estimated_wait_time", "estimated_ready_at",
+    "total_amount", "created_at", "updated_at", "preparing_at", "completed_at", "cancelled_at", "version",
+]
+LINE_FIELDS = ["order", "menu_item", "quantity", "item_price", "prep_minutes"]
+
+
+def insert_rows(model, fields, rows):
+    """INSERT tuples of database-ready values for `fields` into model's table."""
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})", rows)
+
+
+def order_time(rng, midnight):
+    """A moment in the day starting at `midnight`, following the lunch and dinner rushes."""
+    pick = rng.random()
+    for share, peak, spread in MEALS:
+        if pick < share:
+            hour = rng.gauss(peak, spread)
+            break
+        pick -= share
+    else:
+        hour = rng.uniform(OPENING_HOUR, CLOSING_HOUR)
+    hour = min(max(hour, OPENING_HOUR), CLOSING_HOUR - 1 / 60)
+    return midnight + timedelta(hours=hour)
+
+
+def generate_orders(rng, restaurant_id, tables, items, first_day, last_day, orders_per_day, first_id):
+    """
+    Yield (order row, line rows) for every order between first_day and
+    last_day, inclusive, a day at a time, numbering orders from first_id.
+    Every order is completed or cancelled.
+    """
+    adapt_datetime = connection.ops.adapt_datetimefield_value
+    adapt_total = partial(connection.ops.adapt_decimalfield_value, max_digits=10, decimal_places=2)
+    prices = {item.id: connection.ops.adapt_decimalfield_value(item.price, 7, 2) for item in items}
+
+    # A few dishes sell far more than the rest
+    popularity = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(items))))
+    items = rng.sample(items, len(items))
+
+    order_id = first_id
+    day = first_day
+    while day <= last_day:
+        midnight = timezone.make_aware(datetime.combine(day, time()))
+        count = max(0, round(orders_per_day * WEEKDAY_FACTORS[day.weekday()] * rng.gauss(1, 0.1)))
+        for created_at in sorted(order_time(rng, midnight) for _ in range(count)):
+            size = rng.choices(LINES_PER_ORDER, cum_weights=LINES_WEIGHTS)[0]
+            lines, total, wait = [], Decimal(0), 0
+            for item in rng.choices(items, cum_weights=popularity, k=size):
+                quantity = rng.choices(QUANTITIES, cum_weights=QUANTITY_WEIGHTS)[0]
+                prep_minutes = round(item.cooking_time_minutes * rng.uniform(0.8, 1.4), 1)
+                lines.append((order_id, item.id, quantity, prices[item.id], prep_minutes))
+                total += item.price * quantity
+                wait = max(wait, item.cooking_time_minutes)
+
+            preparing_at = completed_at = cancelled_at = None
+            if rng.random() < CANCELLED_SHARE:
+                status, version = "cancelled", 2
+                cancelled_at = updated_at = created_at + timedelta(minutes=rng.uniform(1, 10))
+            else:
+                status, version = "completed", 3
+                preparing_at = created_at + timedelta(minutes=rng.uniform(0.5, 5))
+                completed_at = updated_at = preparing_at + timedelta(minutes=wait * rng.uniform(0.8, 1.5))
+
+            order = (
+                order_id, restaurant_id, rng.randint(1, tables), status, wait,
+                adapt_datetime(created_at + timedelta(minutes=wait)), adapt_total(total),
+                adapt_datetime(created_at), adapt_datetime(updated_at), adapt_datetime(preparing_at),
+                adapt_datetime(completed_at), adapt_datetime(cancelled_at), version,
+            )
+            yield order, lines
+            order_id += 1
+        day += timedelta(days=1)
+
+
+def write_orders(orders, chunk_size=10_000, progress=None):
+    """Insert (order row, line rows) pairs chunk_size orders at a time; returns (orders, lines) written."""
+    written_orders = written_lines = 0
+    order_rows, line_rows = [], []
+
+    def flush():
+        nonlocal written_orders, written_lines
+        with transaction.atomic():
+            insert_rows(Order, ORDER_FIELDS, order_rows)
+            insert_rows(OrderItem, LINE_FIELDS, line_rows)
+        written_orders += len(order_rows)
+        written_lines += len(line_rows)
+        order_rows.clear()
+        line_rows.clear()
+        if progress is not None:
+            progress(written_orders, written_lines)
+
+    for order, lines in orders:
+        order_rows.append(order)
+        line_rows.extend(lines)
+        if len(order_rows) >= chunk_size:
+            flush()
+    if order_rows:
+        flush()
+    return written_orders, written_lines
+
+
+def next_order_id():
+    """
+    The first id no order has ever had. Archived and deleted orders leave
+    their ids behind in ArchivedOrder, change feed tombstones and
+    idempotency keys, and the database's own sequence may be further
+    along still (SQLite's AUTOINCREMENT never hands an id out twice).
+    """
+    used = [
+        Order.objects.aggregate(last=Max("id"))["last"],
+        ArchivedOrder.objects.aggregate(last=Max("id"))["last"],
+        OrderChange.objects.aggregate(last=Max("order_id"))["last"],
+        OrderRequest.objects.aggregate(last=Max("order_id"))["last"],
+    ]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [Order._meta.db_table])
+            used.append((cursor.fetchone() or [None])[0])
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id'))", [Order._meta.db_table]
+            )
+            used.append(cursor.fetchone()[0])
+    return max((last for last in used if last is not None), default=0) + 1
+
+
+def generate(restaurants=1, days=90, orders_per_day=300, tables=20, staff=2, seed=0,
+             end=None, password="password", chunk_size=10_000, progress=None):
+    """
+    Create `restaurants` restaurants with `days` days of history ending
+    the day before `end` (default today). Returns (restaurant ids,
+    orders, order lines).
+
+    Order ids are handed out from next_order_id(), so nothing else may be
+    placing orders meanwhile.
+    """
+    rng = random.Random(seed)
+    last_day = (end or timezone.localdate()) - timedelta(days=1)
+    first_day = last_day - timedelta(days=days - 1)
+
+    restaurant_ids, total_orders, total_lines = [], 0, 0
+    for number in range(1, restaurants + 1):
+        restaurant = create_restaurant(rng, number, tables=tables, staff=staff, password=password)
+        items = list(MenuItem.objects.filter(restaurant=restaurant).order_by("id"))
+        first_id = next_order_id()
+        orders, lines = write_orders(
+            generate_orders(rng, restaurant.id, tables, items, first_day, last_day, orders_per_day, first_id),
+            chunk_size=chunk_size,
+            progress=progress and (lambda o, l: progress(total_orders + o, total_lines + l)),
+        )
+        restaurant_ids.append(restaurant.id)
+        total_orders += orders
+        total_lines += lines
+
+    # Move the id sequence past the ids used above (a no-op on SQLite,
+    # which tracks explicit ids itself)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+            cursor.execute(sql)
+    return restaurant_ids, total_orders, total_lines
@@ -1,3 +1,668 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import Restaurant, MenuCategory, MenuItem, Order, OrderItem, OrderRequest, Table
+from .events import get_broker, publish_order_event
+from .kitchen import get_scheduler
+from . import qr
+
+
+class RestaurantMenuViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        self.categories = [
+            MenuCategory.objects.create(restaurant=self.restaurant, name=f"Category {c}")
+            for c in range(5)
+        ]
+        for category in self.categories:
+            for i in range(3):
+                MenuItem.objects.create(
+                    restaurant=self.restaurant, category=category,
+                    name=f"{category.name} item {i}", price=Decimal("100.00")
+                )
+        self.url = f"/api/restaurants/{self.restaurant.id}/menu/"
+
+    def test_menu_query_count_is_constant(self):
+        # restaurant exists check + categories + prefetched items
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 5)
+        self.assertEqual(len(data[0]["items"]), 3)
+        self.assertEqual(data[0]["items"][0]["category"]["name"], "Category 0")
+
+    def test_cached_menu_needs_no_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_menu_cache_invalidated_on_change(self):
+        self.client.get(self.url)
+
+        item = MenuItem.objects.filter(restaurant=self.restaurant).first()
+        item.name = "Renamed"
+        item.save()
+        names = [i["name"] for c in self.client.get(self.url).json() for i in c["items"]]
+        self.assertIn("Renamed", names)
+
+        self.categories[0].delete()
+        self.assertEqual(len(self.client.get(self.url).json()), 4)
+
+    def test_menu_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        MenuItem.objects.filter(restaurant=self.restaurant).first().delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unknown_restaurant_returns_404(self):
+        response = self.client.get("/api/restaurants/999/menu/")
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch("restaurants.middleware.brotli", None)
+    def test_menu_is_gzipped_for_clients_that_accept_it(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+
+        # Either form of the ETag revalidates
+        for etag in (plain["ETag"], response["ETag"]):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(revalidated.status_code, 304)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get("/api/restaurants/999/menu/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", response)
+
+
+class GuestBootstrapViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Veronica's", cuisine="Bombay", address="Bandra", primary_color="#ff5a1f", font_choice="Outfit"
+        )
+        category = MenuCategory.objects.create(restaurant=self.restaurant, name="Mains")
+        MenuItem.objects.create(restaurant=self.restaurant, category=category, name="Thali", price=Decimal("250.00"))
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=n) for n in (1, 2)])
+        self.url = f"/api/restaurants/{self.restaurant.id}/tables/1/bootstrap/"
+
+    def test_bootstrap_has_restaurant_theme_and_menu(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data["restaurant"]["name"], "Veronica's")
+        self.assertEqual(data["theme"], {
+            "primary_color": "#ff5a1f", "secondary_color": "#1e40af",
+            "background_color": "#ffffff", "font_choice": "Outfit",
+        })
+        self.assertEqual(data["menu"], self.client.get(f"/api/restaurants/{self.restaurant.id}/menu/").json())
+
+    def test_cached_bootstrap_needs_no_queries(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_bootstrap_follows_theme_and_menu_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        self.restaurant.primary_color = "#000000"
+        self.restaurant.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["theme"]["primary_color"], "#000000")
+
+        MenuItem.objects.filter(restaurant=self.restaurant).update(name="Renamed")
+        MenuItem.objects.get(restaurant=self.restaurant).save()
+        self.assertEqual(self.client.get(self.url).json()["menu"][0]["items"][0]["name"], "Renamed")
+
+    def test_unknown_table_or_restaurant_returns_404(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(f"/api/restaurants/{self.restaurant.id}/tables/3/bootstrap/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/api/restaurants/999/tables/1/bootstrap/").status_code, 404)
+
+        Table.objects.get(restaurant=self.restaurant, number=1).delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class OrderDetailViewTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        category = MenuCategory.objects.create(restaurant=self.restaurant, name="Mains")
+        item = MenuItem.objects.create(restaurant=self.restaurant, category=category, name="Thali", price=Decimal("250.00"))
+        self.order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        OrderItem.objects.create(order=self.order, menu_item=item, quantity=2, item_price=item.price)
+        self.url = f"/api/restaurants/{self.restaurant.id}/orders/{self.order.id}/"
+
+    def test_unchanged_order_returns_304_with_one_query(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_lean_lines_load_in_one_query_whatever_the_order_size(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).json()
+        item = MenuItem.objects.get()
+        self.assertEqual(data["items"], [{"menu_item": item.id, "menu_item_name": "Thali", "quantity": 2, "price": "250.00"}])
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self.order, menu_item=item, quantity=1, item_price=item.price) for _ in range(5)
+        ])
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data["items"]), 6)
+
+    def test_status_change_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.order.status = "preparing"
+        self.order.save(update_fields=["status"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "preparing")
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class OrderCreateViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        self.items = [
+            MenuItem.objects.create(
+                restaurant=self.restaurant, name=f"Dish {i}",
+                price=Decimal("100.00") + i, cooking_time_minutes=5 + i
+            )
+            for i in range(12)
+        ]
+        # bulk_create skips Table.save(), so no QR image is written
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=1)])
+        self.url = f"/api/restaurants/{self.restaurant.id}/orders/"
+
+    def post_order(self, items, **headers):
+        return self.client.post(
+            self.url, {"table_number": 1, "items": items}, content_type="application/json", headers=headers
+        )
+
+    def test_create_order_in_bulk(self):
+        lines = [{"menu_item": item.id, "quantity": 2} for item in self.items]
+        response = self.post_order(lines)
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 12)
+        self.assertEqual(order.estimated_wait_time, 16)
+        self.assertEqual(order.items.get(menu_item=self.items[3]).item_price, Decimal("103.00"))
+
+    def test_query_count_does_not_grow_with_order_size(self):
+        self.post_order([{"menu_item": self.items[0].id, "quantity": 1}])  # warm the caches
+        with CaptureQueriesContext(connection) as small:
+            self.post_order([{"menu_item": self.items[0].id, "quantity": 1}])
+        with CaptureQueriesContext(connection) as large:
+            response = self.post_order([{"menu_item": item.id, "quantity": 1} for item in self.items])
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.json()["items"][11]["menu_item_name"], "Dish 11")
+
+    def test_foreign_and_unknown_items_are_rejected(self):
+        other = Restaurant.objects.create(name="Elsewhere", cuisine="Thai", address="Juhu")
+        foreign = MenuItem.objects.create(restaurant=other, name="Pad Thai", price=Decimal("300.00"))
+
+        response = self.post_order([
+            {"menu_item": self.items[0].id, "quantity": 1},
+            {"menu_item": foreign.id, "quantity": 1},
+            {"menu_item": 99999, "quantity": 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("items", response.json())
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_retries_with_the_same_idempotency_key_get_the_same_order(self):
+        lines = [{"menu_item": self.items[0].id, "quantity": 2}]
+        first = self.post_order(lines, idempotency_key="cart-1")
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first)
+
+        with CaptureQueriesContext(connection) as replay:
+            again = self.post_order(lines, idempotency_key="cart-1")
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse([q for q in replay if '"restaurants_order"' in q["sql"] or "orderitem" in q["sql"]])
+
+        # Another cart is another order; the same key for a different cart is refused
+        self.assertEqual(self.post_order(lines, idempotency_key="cart-2").status_code, 201)
+        response = self.post_order([{"menu_item": self.items[1].id, "quantity": 1}], idempotency_key="cart-1")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_duplicate_of_an_order_still_being_placed(self):
+        from .idempotency import fingerprint
+
+        lines = [{"menu_item": self.items[0].id, "quantity": 1}]
+        in_flight = OrderRequest.objects.create(
+            restaurant=self.restaurant, key="cart-1", fingerprint=fingerprint({"table_number": 1, "items": lines})
+        )
+        response = self.post_order(lines, idempotency_key="cart-1")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Order.objects.exists())
+
+        # A claim left behind by a worker that died is taken over
+        OrderRequest.objects.filter(pk=in_flight.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        placed = self.post_order(lines, idempotency_key="cart-1")
+        self.assertEqual(placed.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+        # One that died after committing the order, before storing the response
+        OrderRequest.objects.update(response=None)
+        response = self.post_order(lines, idempotency_key="cart-1")
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertEqual(response.json(), placed.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_rejected_orders_release_their_idempotency_key(self):
+        response = self.post_order([{"menu_item": 99999, "quantity": 1}], idempotency_key="cart-1")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post_order([{"menu_item": self.items[0].id, "quantity": 1}], idempotency_key="cart-1")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post_order([], idempotency_key="").status_code, 400)
+
+    def test_replays_expire(self):
+        lines = [{"menu_item": self.items[0].id, "quantity": 1}]
+        self.post_order(lines, idempotency_key="cart-1")
+        with override_settings(IDEMPOTENCY_KEY_TTL=0):
+            response = self.post_order(lines, idempotency_key="cart-1")
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class KitchenSchedulerTests(TestCase):
+    def setUp(self):
+        # Also drops the cached station layout, so the scheduler rebuilds
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        mains = MenuCategory.objects.create(restaurant=self.restaurant, name="Mains", stations=2)
+        self.curry = MenuItem.objects.create(
+            restaurant=self.restaurant, category=mains, name="Curry", price=Decimal("300.00"), cooking_time_minutes=20
+        )
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=1)])
+
+    def place_order(self, quantity=1):
+        response = self.client.post(
+            f"/api/restaurants/{self.restaurant.id}/orders/",
+            {"table_number": 1, "items": [{"menu_item": self.curry.id, "quantity": quantity}]},
+            content_type="application/json",
+        )
+        return Order.objects.get(id=response.json()["id"])
+
+    def test_orders_queue_behind_busy_stations(self):
+        waits = [self.place_order().estimated_wait_time for _ in range(5)]
+        self.assertEqual(waits, [20, 20, 40, 40, 60])
+
+    def test_finished_and_cancelled_orders_free_their_station(self):
+        first, second, third = self.place_order(), self.place_order(), self.place_order()
+        self.assertEqual(third.estimated_wait_time, 40)
+
+        # Both stations are busy until the first two are done or dropped
+        first.status = "completed"
+        first.save()
+        second.status = "cancelled"
+        second.save()
+        self.assertEqual(self.place_order().estimated_wait_time, 20)
+
+    def test_station_is_freed_when_the_order_finished(self):
+        self.curry.category.stations = 1
+        self.curry.category.save()
+        first, second = self.place_order(), self.place_order()
+        first.status = "completed"
+        first.save()
+
+        # Half an hour on, the second order has been cooking since the first
+        # was completed, and a new one waits for it
+        now = time.time() + 30 * 60
+        ready_at = get_scheduler(self.restaurant.id).estimate([(self.curry.category_id, 20)], now)
+        self.assertAlmostEqual((ready_at - now) / 60, 20, delta=1)
+
+    def test_cancelling_a_later_order_leaves_earlier_ones_in_place(self):
+        self.curry.category.stations = 1
+        self.curry.category.save()
+        scheduler = get_scheduler(self.restaurant.id)
+        first = self.place_order()
+        second = self.place_order()
+        scheduler.estimate([])
+
+        # The second is cancelled two minutes in, then the first is completed on time
+        second.status = "cancelled"
+        second.save()
+        first.status = "completed"
+        first.save()
+        Order.objects.filter(id=second.id).update(cancelled_at=first.created_at + timedelta(minutes=2))
+        Order.objects.filter(id=first.id).update(completed_at=first.created_at + timedelta(minutes=20))
+
+        now = first.created_at.timestamp() + 20 * 60
+        ready_at = scheduler.estimate([(self.curry.category_id, 20)], now)
+        self.assertAlmostEqual((ready_at - now) / 60, 20, delta=1)
+
+    def test_each_unit_takes_a_station(self):
+        # Four curries on two stations take two rounds
+        self.assertEqual(self.place_order(quantity=4).estimated_wait_time, 40)
+        self.assertEqual(self.place_order().estimated_wait_time, 60)
+
+    def test_station_changes_take_effect(self):
+        self.place_order()
+        self.place_order()
+        self.curry.category.stations = 3
+        self.curry.category.save()
+        self.assertEqual(self.place_order().estimated_wait_time, 20)
+
+    def test_estimates_are_incremental(self):
+        for _ in range(3):
+            self.place_order()
+        scheduler = get_scheduler(self.restaurant.id)
+        scheduler.estimate([(self.curry.category_id, 20)])
+
+        # Only the change feed is read when nothing has happened
+        with self.assertNumQueries(1):
+            scheduler.estimate([(self.curry.category_id, 20)])
+        self.assertEqual(scheduler.open_orders(), 3)
+
+    def test_estimate_is_serialized(self):
+        order = self.place_order()
+        data = self.client.get(f"/api/restaurants/{self.restaurant.id}/orders/{order.id}/").json()
+        self.assertEqual(data["estimated_wait_time"], 20)
+        self.assertIsNotNone(data["estimated_ready_at"])
+
+
+class OrderEventStreamViewTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        self.order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        self.url = f"/api/restaurants/{self.restaurant.id}/orders/{self.order.id}/events/"
+
+    @staticmethod
+    def parse(chunk):
+        data = chunk.decode().split("data: ", 1)[1]
+        return json.loads(data)
+
+    def set_status(self, status):
+        self.order.status = status
+        self.order.save(update_fields=["status"])
+        publish_order_event(self.order)
+
+    async def test_stream_pushes_status_changes_until_final(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = response.streaming_content
+
+        self.assertEqual(self.parse(await anext(events))["status"], "pending")
+
+        await sync_to_async(self.set_status)("preparing")
+        self.assertEqual(self.parse(await anext(events))["status"], "preparing")
+
+        await sync_to_async(self.set_status)("completed")
+        self.assertEqual(self.parse(await anext(events))["status"], "completed")
+
+        with self.assertRaises(StopAsyncIteration):
+            await anext(events)
+        self.assertFalse(get_broker()._subscribers)
+
+    async def test_unknown_order_returns_404(self):
+        response = await self.async_client.get(f"/api/restaurants/{self.restaurant.id}/orders/999/events/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(get_broker()._subscribers)
+
+
+@override_settings(FRONTEND_URL="https://menu.example.com")
+class TableQRCodeViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A fresh QR cache per test, so every test starts cold
+        qr_cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(qr_cache_dir.cleanup)
+        self.enterContext(override_settings(QR_CACHE_DIR=qr_cache_dir.name))
+        self.qr_cache_dir = qr_cache_dir.name
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        Table.objects.bulk_create([Table(restaurant=self.restaurant, number=7)])
+        self.url = f"/api/restaurants/{self.restaurant.id}/tables/7/qr/"
+
+    def test_code_is_rendered_once_and_revalidated_without_rendering(self):
+        with mock.patch.object(qr, "render_qr_png", wraps=qr.render_qr_png) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first["Content-Type"], "image/png")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_base_url_or_style_change_yields_a_new_code(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        self.assertNotEqual(self.client.get(self.url, {"fill": "#2563eb"})["ETag"], etag)
+        with self.settings(FRONTEND_URL="https://new-host.example.com"):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_table_and_bad_style(self):
+        self.assertEqual(self.client.get(f"/api/restaurants/{self.restaurant.id}/tables/8/qr/").status_code, 404)
+        self.assertEqual(self.client.get(self.url, {"fill": "red"}).status_code, 400)
+
+    def stored_codes(self):
+        return [name for _, _, names in os.walk(self.qr_cache_dir) for name in names if name.endswith(".png")]
+
+    def test_only_the_default_style_is_stored_on_disk(self):
+        self.client.get(self.url)
+        self.assertEqual(len(self.stored_codes()), 1)
+
+        with mock.patch.object(qr, "render_qr_png", wraps=qr.render_qr_png) as render:
+            for _ in range(2):
+                self.assertEqual(self.client.get(self.url, {"fill": "#2563eb", "size": 4}).status_code, 200)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(self.stored_codes()), 1)
+
+    def test_disk_store_evicts_least_recently_used(self):
+        codes = qr.QRCodeCache(self.qr_cache_dir, max_entries=1, max_files=10)
+        for n in range(10):
+            codes.put(f"{n:02d}" * 32, b"png")
+            os.utime(codes.path(f"{n:02d}" * 32), (n, n))
+        codes.get("00" * 32)  # read again, so it's kept
+
+        codes.put("ff" * 32, b"png")
+        stored = {name[:2] for name in self.stored_codes()}
+        self.assertEqual(len(stored), 9)
+        self.assertIn("00", stored)
+        self.assertNotIn("01", stored)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "SQLite connection tuning")
+class SQLiteConnectionTests(TestCase):
+    def test_connections_are_tuned_when_opened(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS["busy_timeout"])
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+class ORJSONRendererTests(TestCase):
+    def test_matches_drf_for_decimals_and_datetimes(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = {
+            "price": Decimal("120.50"),
+            "created_at": datetime(2025, 3, 1, 12, 30, 5, 250000, tzinfo=dt_timezone.utc),
+            "date": date(2025, 3, 1),
+            "items": [{"quantity": 2}],
+        }
+        rendered = json.loads(ORJSONRenderer().render(data))
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(rendered["created_at"], expected["created_at"])
+        self.assertEqual(rendered["created_at"], "2025-03-01T12:30:05.250000Z")
+        self.assertEqual(rendered["date"], "2025-03-01")
+        # Exact, unlike DRF's float
+        self.assertEqual(rendered["price"], "120.50")
+
+    def test_malformed_json_is_a_400(self):
+        restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        response = self.client.post(
+            f"/api/restaurants/{restaurant.id}/orders/", b"{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerateDataCommandTests(TestCase):
+    def generate(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        call_command(
+            "generate_data", restaurants=2, days=3, orders_per_day=20, seed=7,
+            end=date(2025, 3, 10), stdout=StringIO(),
+        )
+        restaurants = list(Restaurant.objects.order_by("-id")[:2])[::-1]
+        return [
+            list(Order.objects.filter(restaurant=restaurant).order_by("id").values_list(
+                "table_number", "status", "total_amount", "created_at", "items__menu_item__name", "items__quantity",
+            ))
+            for restaurant in restaurants
+        ]
+
+    def test_same_seed_same_history(self):
+        from .models import DailySales
+
+        first = self.generate()
+        self.assertTrue(all(first))
+        self.assertEqual(self.generate(), first)
+
+        order = Order.objects.order_by("id").last()
+        self.assertEqual(
+            order.total_amount, sum(line.item_price * line.quantity for line in order.items.all())
+        )
+        self.assertIn(order.status, ("completed", "cancelled"))
+        self.assertEqual(Order.objects.filter(created_at__date__gte=date(2025, 3, 10)).count(), 0)
+        # Rollups rebuilt for each generated day, and the id sequence moved on
+        self.assertEqual(DailySales.objects.filter(restaurant=order.restaurant).count(), 3)
+        self.assertGreater(Order.objects.create(restaurant=order.restaurant, table_number=1).id, order.id)
+
+    def test_ids_of_archived_orders_are_not_reused(self):
+        from .archive import archive_orders
+
+        restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        archived = Order.objects.create(restaurant=restaurant, table_number=1, status="completed")
+        archive_orders(restaurant.id)
+
+        self.generate()
+        self.assertGreater(Order.objects.order_by("id").first().id, archived.id)
+        # So the generated history can be archived in turn
+        archive_orders()
+        self.assertFalse(Order.objects.exists())
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        from .metrics import REGISTRY
+
+        REGISTRY.clear()
+        self.restaurant = Restaurant.objects.create(name="Veronica's", cuisine="Bombay", address="Bandra")
+        dosa = MenuItem.objects.create(restaurant=self.restaurant, name="Dosa", price=Decimal("120.00"))
+        self.order = Order.objects.create(restaurant=self.restaurant, table_number=1)
+        OrderItem.objects.create(order=self.order, menu_item=dosa, quantity=1, item_price=dosa.price)
+        self.url = f"/api/restaurants/{self.restaurant.id}/orders/{self.order.id}/"
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_requests_are_counted_per_route(self):
+        self.client.get(self.url)
+        self.client.get(self.url, HTTP_IF_NONE_MATCH=self.order.etag)
+        self.client.get(f"/api/restaurants/{self.restaurant.id}/orders/999/")
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+
+        labels = 'method="GET",route="api/restaurants/<int:restaurant_id>/orders/<int:order_id>/"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', text)
+        self.assertIn(f'http_requests_total{{{labels},status="304"}} 1', text)
+        self.assertIn(f'http_requests_total{{{labels},status="404"}} 1', text)
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 3", text)
+        # The full response reads the order and its lines; the 304 and the 404 only the order
+        self.assertIn(f"http_request_queries_sum{{{labels}}} 4", text)
+        self.assertIn(f'http_request_queries_bucket{{{labels},le="1"}} 2', text)
+        self.assertIn(f"http_request_render_seconds_total{{{labels}}} ", text)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer nope").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    def test_nothing_is_served_without_a_token_unless_debugging(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    async def test_async_requests_are_counted_without_thread_hops(self):
+        import logging
+        from django.core.handlers.asgi import ASGIHandler
+        from .metrics import REGISTRY
+
+        # Django logs each middleware it has to adapt between sync and async
+        logger = logging.getLogger("django.request")
+        level = logger.level
+        logger.setLevel(logging.DEBUG)
+        try:
+            with self.assertNoLogs("django.request", "DEBUG"):
+                ASGIHandler()
+        finally:
+            logger.setLevel(level)
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        labels = 'method="GET",route="api/restaurants/<int:restaurant_id>/orders/<int:order_id>/"'
+        self.assertIn(f"http_request_queries_sum{{{labels}}} 2", REGISTRY.render())
+
+    def test_slow_requests_log_their_sql(self):
+        with self.assertNoLogs("restaurants.slow_requests"):
+            self.client.get(self.url)
+
+        with override_settings(SLOW_REQUEST_MS=0.001), self.assertLogs("restaurants.slow_requests", "WARNING") as logs:
+            self.client.get(self.url)
+        message = logs.output[0]
+        self.assertIn(f"GET {self.url}", message)
+        self.assertIn("2 queries", message)
+        self.assertIn('FROM "restaurants_orderitem"', message)
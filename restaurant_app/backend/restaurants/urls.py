@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import RestaurantMenuView, OrderCreateView, OrderDetailView
+from .views import (
+    RestaurantMenuView, GuestBootstrapView, OrderCreateView, OrderDetailView, OrderEventStreamView, TableQRCodeView,
+    MenuImageVariantView,
+)
 
 urlpatterns = [
     path('restaurants/<int:restaurant_id>/menu/', RestaurantMenuView.as_view()),
+    path('restaurants/<int:restaurant_id>/tables/<int:number>/bootstrap/', GuestBootstrapView.as_view()),
+    path('restaurants/<int:restaurant_id>/tables/<int:number>/qr/', TableQRCodeView.as_view()),
     path('restaurants/<int:restaurant_id>/orders/', OrderCreateView.as_view()),
     path('restaurants/<int:restaurant_id>/orders/<int:order_id>/', OrderDetailView.as_view()),
+    path('restaurants/<int:restaurant_id>/orders/<int:order_id>/events/', OrderEventStreamView.as_view()),
+    path('images/<str:filename>', MenuImageVariantView.as_view()),
 ]
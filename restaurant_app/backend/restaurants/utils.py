@@ -1,2 +1,30 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
 def calculate_longest_cooking_time(order_items):
     return max(item.menu_item.cooking_time_minutes for item in order_items)
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Attach ETag / Last-Modified to a response. `no-cache` makes browsers
+    revalidate on every fetch, so polling clients get 304s transparently.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 response if the client's If-None-Match / If-Modified-Since
+    already matches, otherwise None. `last_modified` is a unix timestamp,
+    or None for resources that only have an ETag.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -1,4 +1,10 @@
+import asyncio
+import re
+
 from django.shortcuts import render
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,42 +15,75 @@ from .serializers import (
     MenuItemSerializer,
     MenuCategorySerializer,
     OrderSerializer,
-    OrderCreateSerializer
+    OrderCreateSerializer,
+    prefetch_order_lines,
 )
+from .cache import get_menu_document, get_bootstrap_document, get_table_numbers
+from .qr import DEFAULT_STYLE, table_menu_url, qr_cache_key, get_qr_cache
+from .images import VARIANT_DIR, VARIANT_NAME, VARIANT_CACHE_CONTROL
+from .middleware import serve_precompressed
+from .utils import not_modified, set_validators
+from .events import get_broker, order_event, format_sse, FINAL_STATUSES
+from . import idempotency
+
+
+HEX_COLOR = re.compile(r"^#[0-9a-fA-F]{6}$")
 
 
 # Create your views here.
 class RestaurantMenuView(APIView):
     def get(self, request, restaurant_id):
 
-        # Validate restaurant exists
-        try:
-            restaurant = Restaurant.objects.get(id=restaurant_id)
-        except Restaurant.DoesNotExist:
+        # Served from the per-restaurant menu cache (see restaurants/cache.py)
+        menu = get_menu_document(restaurant_id)
+        if menu is None:
             return Response(
                 {"error": "Restaurant not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Fetch all categories for this restaurant
-        categories = MenuCategory.objects.filter(restaurant=restaurant)
+        response = not_modified(request, menu["etag"], menu["last_modified"])
+        if response is not None:
+            return response
 
-        # For each category, fetch its items
-        response_data = []
-        for category in categories:
-            items = MenuItem.objects.filter(category=category)
+        response = HttpResponse(menu["document"], content_type="application/json")
+        set_validators(response, menu["etag"], menu["last_modified"])
+        return serve_precompressed(request, response, menu["encodings"])
+
+
+class GuestBootstrapView(APIView):
+    """
+    Everything the menu page needs after a QR scan, in one request: the
+    restaurant's details, its theme and its menu. A 200 also confirms the
+    table; an unknown table is a 404, like an unknown restaurant.
+
+    The body doesn't depend on the table, so every table of a restaurant
+    shares one cached document and ETag.
+    """
+    def get(self, request, restaurant_id, number):
+        bootstrap = get_bootstrap_document(restaurant_id)
+        if bootstrap is None:
+            return Response(
+                {"error": "Restaurant not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-            category_data = {
-                "id": category.id,
-                "name": category.name,
-                "items": MenuItemSerializer(items, many=True).data
-            }
+        # Checked before revalidating, so a 304 never vouches for a table
+        # removed since the guest scanned it
+        if number not in get_table_numbers(restaurant_id):
+            return Response(
+                {"error": f"Invalid table number: {number}. This table is not registered."},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-            response_data.append(category_data)
+        response = not_modified(request, bootstrap["etag"], bootstrap["last_modified"])
+        if response is not None:
+            return response
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        response = HttpResponse(bootstrap["document"], content_type="application/json")
+        set_validators(response, bootstrap["etag"], bootstrap["last_modified"])
+        return serve_precompressed(request, response, bootstrap["encodings"])
 
-from .serializers import OrderCreateSerializer, OrderSerializer
 from .models import Order
 
 class OrderCreateView(APIView):
@@ -59,6 +98,22 @@ class OrderCreateView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Retries carrying the same Idempotency-Key get the first attempt's
+        # order back (see restaurants/idempotency.py)
+        order_request = None
+        key = request.headers.get(idempotency.HEADER)
+        if key is not None:
+            order_request, response = idempotency.claim(restaurant, key, request.data)
+            if response is not None:
+                return response
+
+        try:
+            return self.place_order(request, restaurant, order_request)
+        finally:
+            if order_request is not None and order_request.order_id is None:
+                idempotency.release(order_request)
+
+    def place_order(self, request, restaurant, order_request):
         # Validate table exists for this restaurant
         table_number = request.data.get('table_number')
         if not Table.objects.filter(restaurant=restaurant, number=table_number).exists():
@@ -69,25 +124,152 @@ class OrderCreateView(APIView):
 
         serializer = OrderCreateSerializer(
             data=request.data,
-            context={"restaurant": restaurant}
+            context={"restaurant": restaurant, "order_request": order_request}
         )
 
         if serializer.is_valid():
             order = serializer.save()
+            prefetch_order_lines([order])
+            data = OrderSerializer(order).data
+            if order_request is not None:
+                idempotency.complete(order_request, data)
 
             # Return full order details
-            return Response(
-                OrderSerializer(order).data,
-                status=status.HTTP_201_CREATED
-            )
+            return Response(data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TableQRCodeView(APIView):
+    """
+    The table's QR code as a PNG, rendered on first request and then served
+    from the content-addressed QR cache. Optional ?fill=, ?back= (hex
+    colours) and ?size= (box size in pixels) change the style; such codes
+    are only cached in memory, never on disk.
+    """
+
+    def get(self, request, restaurant_id, number):
+        if number not in get_table_numbers(restaurant_id):
+            return Response({"error": "Table not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        style = dict(DEFAULT_STYLE)
+        for param in ("fill", "back"):
+            value = request.query_params.get(param)
+            if value is not None:
+                if not HEX_COLOR.match(value):
+                    return Response({"error": f"{param} must be a #rrggbb colour"}, status=status.HTTP_400_BAD_REQUEST)
+                style[param] = value.lower()
+        if "size" in request.query_params:
+            try:
+                style["box_size"] = int(request.query_params["size"])
+            except ValueError:
+                style["box_size"] = 0
+            if not 2 <= style["box_size"] <= 40:
+                return Response({"error": "size must be between 2 and 40"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The ETag is the cache key, so revalidation never renders anything
+        data = table_menu_url(restaurant_id, number)
+        etag = f'"{qr_cache_key(data, style)}"'
+        response = not_modified(request, etag, None)
+        if response is not None:
+            return response
+
+        png = get_qr_cache().get_or_render(data, style)
+        return set_validators(HttpResponse(png, content_type="image/png"), etag, None)
+
+
+class MenuImageVariantView(View):
+    """
+    A resized menu photo. Filenames are hashes of the file contents, so
+    the response never changes and browsers and CDNs may keep it forever.
+    """
+
+    CONTENT_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+    def get(self, request, filename):
+        match = VARIANT_NAME.match(filename)
+        if match is None:
+            raise Http404
+
+        try:
+            image = default_storage.open(f"{VARIANT_DIR}/{filename}", "rb")
+        except FileNotFoundError:
+            raise Http404
+
+        response = FileResponse(image, content_type=self.CONTENT_TYPES[match.group(1)])
+        response["Cache-Control"] = VARIANT_CACHE_CONTROL
+        return response
+
+
 class OrderDetailView(APIView):
     def get(self, request, restaurant_id, order_id):
         try:
             order = Order.objects.get(id=order_id, restaurant_id=restaurant_id)
-            return Response(OrderSerializer(order).data)
         except Order.DoesNotExist:
             return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Pollers usually already have the current version; answer with a 304
+        # before the nested items are loaded or serialized
+        etag = order.etag
+        last_modified = int(order.updated_at.timestamp())
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        prefetch_order_lines([order])
+        response = Response(OrderSerializer(order).data)
+        return set_validators(response, etag, last_modified)
+
+
+# -------------------------------
+# ORDER STATUS STREAM (Server-Sent Events)
+# -------------------------------
+SSE_HEARTBEAT_SECONDS = 15
+
+
+class OrderEventStreamView(View):
+    """
+    Pushes order status changes to the guest as they happen.
+
+    Runs as an async view, so it needs the ASGI entry point to hold many
+    open streams cheaply. OrderDetailView stays available for clients
+    that cannot use EventSource.
+    """
+
+    async def get(self, request, restaurant_id, order_id):
+        broker = get_broker()
+
+        # Subscribe before reading the order so no update can slip in between
+        subscription = broker.subscribe(order_id)
+        try:
+            order = await Order.objects.aget(id=order_id, restaurant_id=restaurant_id)
+        except Order.DoesNotExist:
+            broker.unsubscribe(subscription)
+            return JsonResponse({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(
+            self.stream(broker, subscription, order_event(order)),
+            content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, broker, subscription, snapshot):
+        try:
+            yield format_sse(snapshot)
+            if snapshot["status"] in FINAL_STATUSES:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_sse(event)
+                if event["status"] in FINAL_STATUSES:
+                    return
+        finally:
+            broker.unsubscribe(subscription)